@@ -1,8 +1,36 @@
 import streamlit as st
 import os
+import subprocess
+import sys
+import time
+from harmonium import PROGRAM
+from headless import send_command
 
 st.title("🎵 Hand Tracking MIDI Instrument")
 st.write("Play virtual instruments using hand gestures")
 
+# The tracker runs as a long-lived headless service in harmonium mode (what
+# "rohit (1).py" used to play); the app only sends it commands
+SERVICE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "headless.py")
+
+def service_command(command):
+    try:
+        return send_command(command)
+    except OSError:
+        subprocess.Popen([sys.executable, SERVICE, "--mode", "harmonium"])
+        for _ in range(50):  # Wait for the service to open MIDI and start listening
+            time.sleep(0.2)
+            try:
+                return send_command(command)
+            except OSError:
+                continue
+        return "error service did not start"
+
+left = st.number_input("Left hand instrument", 0, 127, PROGRAM)
+right = st.number_input("Right hand instrument", 0, 127, PROGRAM)
+
 if st.button("Start Hand Tracking"):
-    os.system('python "rohit (1).py"')
\ No newline at end of file
+    st.write(service_command(f"start {left} {right}"))
+
+if st.button("Stop Hand Tracking"):
+    st.write(service_command("stop"))
@@ -0,0 +1,340 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from finger_state import hand_masks
+from mapping import FINGER_NAMES, HANDS
+from midi_backend import RecordingBackend
+from midi_out import HAND_CHANNELS
+
+# --------------------------
+# End-to-end latency benchmark
+# --------------------------
+# Drives main.start_hand_tracking exactly as a performance would run it
+# (capture thread, detection thread, debouncer, decisions, voices, async MIDI
+# sender) with the camera replaced by a fixture source and the hand model by
+# a fixture detector, and MIDI going to the loopback sink. Frames arrive at
+# --fps like a camera (a slow pipeline drops frames); --detect-ms stands in
+# for the model's inference time.
+#
+# A "gesture" is a finger going up in the fixture. Its expected notes come
+# from running the same decision logic (ChordTracker / SongSequencer) on the
+# raw fixture fingers, and its latency is the time from the frame in which
+# it appeared to that note-on reaching the sink.
+#
+# Each mode runs in a fresh interpreter so peak RSS is per mode. Output is
+# JSON; --compare BASE.json prints the change of every metric against a
+# previous run.
+
+MODES = ("chord", "song", "harmonium")
+SONG = "ode_to_joy.json"   # The longest of songs/
+
+
+def fixture_hand(side, mask, x):
+    """A cvzone-style hand dict whose fingers read as `mask` (hand size 100 px)."""
+    lm = np.zeros((21, 3), dtype=np.int32)
+    lm[:, :2] = (x, 200)
+    lm[0] = (x, 300, 0)            # wrist; middle knuckle (9) stays at (x, 200)
+    direction = 1 if side == "right" else -1
+    lm[4, 0] = x + direction * (40 if mask & 1 else -40)
+    for i, tip in enumerate((8, 12, 16, 20), start=1):
+        lm[tip, 1] = 130 if mask & (1 << i) else 240
+    xs, ys = lm[:, 0], lm[:, 1]
+    return {"lmList": lm.tolist(), "bbox": (int(xs.min()), int(ys.min()), int(np.ptp(xs)), int(np.ptp(ys))),
+            "center": (int(xs.mean()), int(ys.mean())), "type": side.capitalize()}
+
+
+def synthetic_fixture(mode, frames=900, seed=0):
+    """
+    Per-frame {"left"/"right": mask}. Song mode plays the song's steps once
+    (raise the expected finger, hold, lower), then rests; the other modes raise
+    random single fingers, and now and then two, on both hands.
+    """
+    rng = np.random.default_rng(seed)
+    masks = [{hand: 0 for hand in HANDS} for _ in range(frames)]
+    if mode == "song":
+        from sequencer import load_song
+
+        f = 0
+        for hand, finger, _ in load_song(SONG).steps:
+            hold = int(rng.integers(6, 12))
+            bit = 1 << FINGER_NAMES.index(finger)
+            for i in range(f, min(f + hold, frames)):
+                masks[i][hand] = bit
+            f += hold + int(rng.integers(4, 8))
+        return masks
+    for hand in HANDS:
+        f = int(rng.integers(0, 10))
+        while f < frames:
+            hold = int(rng.integers(6, 20))
+            mask = 1 << int(rng.integers(0, 5))
+            if rng.random() < 0.2:
+                mask |= 1 << int(rng.integers(0, 5))
+            for i in range(f, min(f + hold, frames)):
+                masks[i][hand] = mask
+            f += hold + int(rng.integers(4, 15))
+    return masks
+
+
+def trace_fixture(path):
+    # A recorded landmark trace: the hands of every frame, as recorded
+    from gestures import hand_side
+    from landmark_trace import TraceReplay
+
+    frames = []
+    for _, hands in TraceReplay(path).frames():
+        frames.append(({hand_side(hand): mask for hand, mask in zip(hands, hand_masks(hands))}, hands))
+    return frames
+
+
+class FixtureSource:
+    """
+    Capture source (see capture.GrabSource) that "exposes" frame i at
+    start + i / fps and hands over the newest one, like a camera. Each frame
+    is a tiny image carrying its index for FixtureDetector.
+    """
+
+    def __init__(self, count, fps=30.0):
+        self.count = count
+        self.fps = fps
+        self.captured_at = np.full(count, np.nan)
+        self.threads = []
+        self.delivered = 0
+        self.dropped = 0
+        self._start = None
+        self._last = -1
+
+    def read(self, image=None):
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        index = max(int((now - self._start) * self.fps), self._last + 1)
+        due = self._start + index / self.fps
+        if due > now:
+            time.sleep(due - now)
+        if index >= self.count:
+            self._last = self.count
+            return False, None
+        self.dropped += index - self._last - 1
+        self._last = index
+        self.captured_at[index] = due
+        self.delivered += 1
+        self.threads.append(threading.active_count())
+        frame = image if image is not None else np.zeros((1, 1, 3), dtype=np.uint8)
+        frame[0, 0] = (index & 0xFF, (index >> 8) & 0xFF, (index >> 16) & 0xFF)
+        return True, frame
+
+    def isOpened(self):
+        return self._last < self.count
+
+    def release(self):
+        pass
+
+    def report(self):
+        return {"source": "fixture", "delivered": self.delivered, "dropped": self.dropped}
+
+
+class FixtureDetector:
+    """Stands in for cvzone's HandDetector: returns the fixture's hands for the frame's index."""
+
+    def __init__(self, hands_per_frame, detect_ms=0.0):
+        self.hands_per_frame = hands_per_frame
+        self.detect_s = detect_ms / 1000
+
+    def findHands(self, img, draw=False):
+        b, g, r = (int(v) for v in img[0, 0])
+        if self.detect_s:
+            time.sleep(self.detect_s)  # Inference releases the GIL, as MediaPipe does
+        return [dict(hand) for hand in self.hands_per_frame[b | g << 8 | r << 16]]
+
+
+def expected_notes(mode, masks, times):
+    # (capture time, channel, notes) the decision logic plays for the raw fixture fingers
+    from gestures import ChordTracker
+    from sequencer import SongSequencer, load_song
+
+    expected = []
+    now = [0.0]
+
+    def play(hand, notes):
+        expected.append((now[0], HAND_CHANNELS[hand], tuple(notes)))
+
+    if mode == "song":
+        tracker = SongSequencer(load_song(SONG), play, lambda *args: None)
+    elif mode == "harmonium":
+        from harmonium import harmonium_options
+
+        options = harmonium_options()
+        tracker = ChordTracker(options["mapping"], play, lambda *args: None, latch=options["latch"])
+    else:
+        from main import chords
+
+        tracker = ChordTracker(chords, play, lambda *args: None)
+    for frame_masks, t in zip(masks, times):
+        if np.isnan(t):
+            continue  # Never captured (dropped before the camera "saw" it)
+        now[0] = t
+        tracker.update(frame_masks)
+    return expected
+
+
+def match_latencies(expected, received, window=1.0):
+    # First note-on of each expected chord on its channel, at or after the gesture
+    arrivals = {}
+    for t, (status, *data) in received:
+        if status & 0xF0 == 0x90 and data[1] > 0:
+            arrivals.setdefault((status & 0x0F, data[0]), []).append(t)
+    latencies = []
+    missed = 0
+    for t, channel, notes in expected:
+        found = None
+        for note in notes:
+            times = arrivals.get((channel, note), [])
+            i = int(np.searchsorted(times, t))
+            if i < len(times) and times[i] - t <= window:
+                found = times[i] if found is None else min(found, times[i])
+        if found is None:
+            missed += 1
+        else:
+            latencies.append(found - t)
+    return np.array(latencies), missed
+
+
+def run_mode(mode, frames=900, fps=30.0, detect_ms=15.0, trace=None, predictive=False, seed=0):
+    import resource
+
+    import main
+    from harmonium import PROGRAM, harmonium_options
+
+    if trace:
+        recorded = trace_fixture(trace)[:frames]
+        masks = [m for m, _ in recorded]
+        hands_per_frame = [hands for _, hands in recorded]
+    else:
+        masks = synthetic_fixture(mode, frames, seed)
+        hands_per_frame = [[fixture_hand(hand, mask, 150 if hand == "left" else 450)
+                            for hand, mask in frame_masks.items()] for frame_masks in masks]
+    source = FixtureSource(len(masks), fps)
+    runtime = main.runtime
+    runtime.midi_device = RecordingBackend()   # Keeps arrival times for the latency match
+    runtime.detector = FixtureDetector(hands_per_frame, detect_ms)
+
+    options = {}
+    if mode == "harmonium":
+        options = dict(harmonium_options(), instruments={"left": PROGRAM, "right": PROGRAM})
+    elif mode == "song":
+        options = {"song": SONG}
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = os.path.join(tmp, "stats.json")
+        start = time.perf_counter()
+        main.start_hand_tracking(headless=True, use_roi=False, source=source, stats_path=stats_path,
+                                 predictive=predictive, release_midi=False, **options)
+        elapsed = time.perf_counter() - start
+        with open(stats_path) as f:
+            stages = json.load(f)
+    received = list(runtime.player.backend.received)
+    runtime.close()
+
+    expected = expected_notes(mode, masks, source.captured_at)
+    latencies, missed = match_latencies(expected, received)
+    gestures = sum(bin(frame_masks.get(hand, 0) & ~previous.get(hand, 0)).count("1")
+                   for previous, frame_masks in zip([{}] + masks[:-1], masks) for hand in HANDS)
+    percentiles = np.percentile(latencies, (50, 90, 99)) * 1000 if len(latencies) else (0.0, 0.0, 0.0)
+    return {
+        "mode": mode,
+        "frames": len(masks),
+        "frames_per_sec": stages.get("decide", {}).get("count", 0) / elapsed,   # Frames that reached the decisions
+        "capture_fps": source.delivered / elapsed,
+        "dropped_frames": source.dropped,
+        "gestures": gestures,
+        "notes_expected": len(expected),
+        "notes_missed": missed,
+        "latency_p50_ms": float(percentiles[0]),
+        "latency_p90_ms": float(percentiles[1]),
+        "latency_p99_ms": float(percentiles[2]),
+        "latency_max_ms": float(latencies.max() * 1000) if len(latencies) else 0.0,
+        "midi_messages": len(received),
+        "messages_per_gesture": len(received) / gestures if gestures else 0.0,
+        "threads_min": min(source.threads[1:]),   # The detect thread starts after the first read
+        "threads_max": max(source.threads[1:]),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages_p50_ms": {stage: s["p50_ms"] for stage, s in stages.items() if isinstance(s, dict) and s.get("count")},
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(base, current):
+    # Relative change of every numeric metric; latency/RSS/threads/misses going up is a regression
+    lines = []
+    for mode, result in current["modes"].items():
+        old = base.get("modes", {}).get(mode)
+        if not old:
+            continue
+        for key, value in result.items():
+            if isinstance(value, (int, float)) and isinstance(old.get(key), (int, float)) and old[key]:
+                change = (value - old[key]) / abs(old[key]) * 100
+                lines.append(f"{mode:<10} {key:<22} {old[key]:>10.2f} -> {value:>10.2f}  {change:+6.1f}%")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end gesture-to-MIDI benchmark (no camera or MIDI device)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--frames", type=int, default=900)
+    parser.add_argument("--fps", type=float, default=30.0, help="fixture frame rate; raise it to find where frames start dropping")
+    parser.add_argument("--detect-ms", type=float, default=15.0, help="simulated hand-model inference time")
+    parser.add_argument("--trace", metavar="TRACE.npy", help="recorded landmarks instead of synthetic gestures")
+    parser.add_argument("--predictive", action="store_true")
+    parser.add_argument("--out", metavar="RESULTS.json", help="also write the results here")
+    parser.add_argument("--compare", metavar="BASE.json", help="print changes against an earlier --out")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        import logging
+
+        logging.basicConfig(level=logging.WARNING)
+        result = run_mode(args.modes[0], args.frames, args.fps, args.detect_ms, args.trace, args.predictive)
+        print(json.dumps(result))
+        return
+
+    settings = {"frames": args.frames, "fps": args.fps, "detect_ms": args.detect_ms, "trace": args.trace,
+                "predictive": args.predictive}
+    results = {"commit": _commit(), "settings": settings, "modes": {}}
+    for mode in args.modes:
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--modes", mode, "--frames", str(args.frames),
+                   "--fps", str(args.fps), "--detect-ms", str(args.detect_ms)]
+        if args.trace:
+            command += ["--trace", args.trace]
+        if args.predictive:
+            command.append("--predictive")
+        proc = subprocess.run(command, capture_output=True, text=True)
+        if proc.returncode != 0:
+            results["modes"][mode] = {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+            continue
+        results["modes"][mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), results))
+
+
+if __name__ == "__main__":
+    main()
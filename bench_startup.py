@@ -0,0 +1,70 @@
+import argparse
+import json
+import subprocess
+import sys
+
+# --------------------------
+# Startup benchmark: time-to-first-window and time-to-first-note
+# --------------------------
+# Each scenario runs in a fresh interpreter so import caches don't skew it.
+# "window" is the point where a GUI could create its Tk window.
+
+LEGACY = r"""
+import json, time
+t0 = time.perf_counter()
+import tkinter
+import pygame.midi
+from cvzone.HandTrackingModule import HandDetector
+pygame.midi.init()
+player = {player}
+t_window = time.perf_counter() - t0
+detector = HandDetector(detectionCon=0.8, maxHands=2)
+import numpy as np
+detector.findHands(np.zeros((240, 320, 3), dtype=np.uint8), draw=False)
+player.write([[[0x90, 60, 127], 0]])
+t_note = time.perf_counter() - t0
+print(json.dumps({{"first_window_s": t_window, "first_note_s": t_note}}))
+"""
+
+LAZY = r"""
+import json, time
+t0 = time.perf_counter()
+import tkinter
+from runtime import get_runtime
+runtime = get_runtime(midi_device={device})
+runtime.warm_up(preload=("main",))
+t_window = time.perf_counter() - t0
+runtime.wait()
+runtime.midi.note_on(0, 60)
+runtime.midi.flush()
+t_note = time.perf_counter() - t0
+print(json.dumps({{"first_window_s": t_window, "first_note_s": t_note, "warm_up": runtime.timings}}))
+"""
+
+
+def run(code):
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure GUI startup cost")
+    parser.add_argument("--null-midi", action="store_true", help="use a loopback sink instead of MIDI device 0")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    player = "__import__('midi_out').NullOutput()" if args.null_midi else "pygame.midi.Output(0)"
+    device = '"null"' if args.null_midi else "0"
+    results = {"legacy": [], "lazy": []}
+    for _ in range(args.repeat):
+        results["legacy"].append(run(LEGACY.format(player=player)))
+        results["lazy"].append(run(LAZY.format(device=device)))
+    # gui1 (1).py used to hold its splash for a fixed 3 s on top of this
+    results["legacy_splash_s"] = 3.0
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
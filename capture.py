@@ -0,0 +1,353 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from instrumentation import RingHistogram
+
+log = logging.getLogger(__name__)
+
+# --------------------------
+# Capture sources with a dedicated grab thread
+# --------------------------
+# cap.read() hands back the oldest frame the driver has queued, so a loop that
+# falls behind shows (and plays) stale frames, and a failing camera makes
+# `if not success: continue` spin. Here a grab thread keeps pulling frames off
+# the device with grab(), which only dequeues them, and read() decodes the
+# newest one with retrieve(). Frames nobody read in time are counted as
+# dropped. Failed grabs back off exponentially, and the device is reopened
+# after a few of them.
+#
+# Sources look like cv2.VideoCapture to their callers: read(image=None)
+# (decodes into `image` when given, so RingCapture can wrap them),
+# isOpened() and release(). read() waits for a frame newer than the last one
+# it returned and gives up after `timeout`.
+
+
+def default_api():
+    # V4L2 on Linux, DirectShow on Windows, AVFoundation on macOS
+    if sys.platform.startswith("linux"):
+        return cv2.CAP_V4L2
+    if sys.platform == "win32":
+        return cv2.CAP_DSHOW
+    if sys.platform == "darwin":
+        return cv2.CAP_AVFOUNDATION
+    return cv2.CAP_ANY
+
+
+def fourcc_name(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4)) if value > 0 else ""
+
+
+class GrabSource:
+    """
+    Shared grab thread, freshest-frame read() and stats. Subclasses implement
+    _open() -> bool, _grab() -> bool, _retrieve(image) -> (ok, frame) and
+    _close(); _grab() returning None means the source has ended.
+    """
+
+    def __init__(self, name, timeout=0.5, backoff=(0.05, 2.0), reopen_after=5):
+        self.name = name
+        self.timeout = timeout
+        self.backoff = backoff
+        self.reopen_after = reopen_after
+        self.grabbed = 0
+        self.delivered = 0
+        self.dropped = 0      # grabbed but replaced by a newer frame before anyone read it
+        self.failures = 0
+        self.reopens = 0
+        self.latency = RingHistogram()   # grab -> frame decoded for the reader
+        self._device = threading.Lock()  # grab() and retrieve() never overlap
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._read_seq = 0
+        self._grabbed_at = 0.0
+        self._readers = 0
+        self._ended = False
+        self._stop = threading.Event()
+        self._thread = None
+        self.lossless = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._grab_loop, name=f"grab-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _grab_loop(self):
+        delay = self.backoff[0]
+        failed = 0
+        while not self._stop.is_set():
+            with self._device:
+                ok = self._grab()
+                if ok:
+                    with self._cond:
+                        self._seq += 1
+                        self._grabbed_at = time.perf_counter()
+                        self.grabbed += 1
+                        self._cond.notify_all()
+            if self._stop.is_set():
+                return
+            if ok is None:
+                with self._cond:
+                    self._ended = True
+                    self._cond.notify_all()
+                return
+            if ok:
+                if failed:
+                    log.info("%s: capturing again after %d failed grabs", self.name, failed)
+                failed = 0
+                delay = self.backoff[0]
+                # A reader already waiting gets this frame before the next grab replaces it;
+                # lossless sources wait for a reader every time
+                with self._cond:
+                    self._cond.wait_for(lambda: self._read_seq >= self._seq or self._stop.is_set()
+                                        or not (self._readers or self.lossless),
+                                        timeout=None if self.lossless else self.timeout)
+                continue
+
+            self.failures += 1
+            failed += 1
+            if failed == 1:
+                log.warning("%s: grab failed, retrying with backoff", self.name)
+            if failed % self.reopen_after == 0:
+                log.warning("%s: reopening after %d failed grabs", self.name, failed)
+                with self._device:
+                    self._close()
+                    self._open()
+                self.reopens += 1
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.backoff[1])
+
+    def read(self, image=None):
+        with self._cond:
+            self._readers += 1  # Until retrieved, the grab thread stays off the device
+            self._cond.wait_for(lambda: self._seq > self._read_seq or self._ended or self._stop.is_set(), self.timeout)
+            if self._seq == self._read_seq:
+                self._readers -= 1
+                self._cond.notify_all()
+                return False, None
+        try:
+            with self._device:
+                with self._cond:
+                    seq, grabbed_at = self._seq, self._grabbed_at
+                ok, frame = self._retrieve(image)
+        finally:
+            with self._cond:
+                if self.delivered:
+                    self.dropped += seq - self._read_seq - 1
+                self._read_seq = seq
+                self._readers -= 1
+                self._cond.notify_all()
+        if ok:
+            self.delivered += 1
+            self.latency.add(time.perf_counter() - grabbed_at)
+        return ok, frame
+
+    def isOpened(self):
+        # False once the source ended (end of file) and its last frame was read
+        return not self._stop.is_set() and not (self._ended and self._seq == self._read_seq)
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        with self._device:
+            self._close()
+
+    def report(self):
+        summary = self.latency.summary()
+        return {"source": self.name, "grabbed": self.grabbed, "delivered": self.delivered, "dropped": self.dropped,
+                "failures": self.failures, "reopens": self.reopens,
+                "latency_p50_ms": summary["p50_ms"], "latency_p99_ms": summary["p99_ms"]}
+
+
+class CameraSource(GrabSource):
+    """
+    A camera by index. Asks for the first pixel format in `formats` the
+    driver accepts (MJPG needs far less USB bandwidth than YUYV at 640x480
+    and above), then the size and frame rate, and keeps one driver buffer.
+    `negotiated` holds what the driver actually agreed to.
+    """
+
+    def __init__(self, index=0, width=640, height=480, fps=30, formats=("MJPG", "YUYV"), api=None, **options):
+        super().__init__(f"camera {index}", **options)
+        self.index = index
+        self.requested = {"width": width, "height": height, "fps": fps, "formats": formats}
+        self.api = default_api() if api is None else api
+        self.negotiated = {}
+        self._cap = None
+        if not self._open():
+            log.warning("%s: could not be opened; will keep retrying", self.name)
+        self.start()
+
+    def _open(self):
+        cap = cv2.VideoCapture(self.index, self.api)
+        if not cap.isOpened() and self.api != cv2.CAP_ANY:
+            cap = cv2.VideoCapture(self.index)
+        self._cap = cap
+        if cap.isOpened():
+            self.negotiated = self._negotiate(cap)
+        return cap.isOpened()
+
+    def _negotiate(self, cap):
+        wanted = self.requested
+        # The format goes first: V4L2 offers different sizes and rates per format
+        for name in wanted["formats"]:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*name))
+            if fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)) == name:
+                break
+        if wanted["width"] and wanted["height"]:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, wanted["width"])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, wanted["height"])
+        if wanted["fps"]:
+            cap.set(cv2.CAP_PROP_FPS, wanted["fps"])
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Fewer stale frames queued in the driver
+        negotiated = {"backend": cap.getBackendName(), "format": fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)),
+                      "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                      "fps": cap.get(cv2.CAP_PROP_FPS)}
+        log.info("%s: %s", self.name, negotiated)
+        return negotiated
+
+    def _grab(self):
+        return self._cap is not None and self._cap.isOpened() and self._cap.grab()
+
+    def _retrieve(self, image):
+        return self._cap.retrieve(image)
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+
+    def report(self):
+        report = super().report()
+        report["negotiated"] = self.negotiated
+        return report
+
+
+class VideoFileSource(GrabSource):
+    """
+    A video file behind the same interface, e.g. to rehearse or benchmark
+    without a camera. With realtime=True frames come at the file's frame
+    rate, like a camera (a slow reader drops frames); otherwise as fast as
+    they are read, without drops. loop=True starts over at the end.
+    """
+
+    def __init__(self, path, realtime=True, loop=False, **options):
+        super().__init__(os.path.basename(path), **options)
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.lossless = not realtime
+        self._cap = None
+        if not self._open():
+            raise FileNotFoundError(f"Cannot open video {path}")
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._next_at = None
+        self.start()
+
+    def _open(self):
+        self._cap = cv2.VideoCapture(self.path)
+        return self._cap.isOpened()
+
+    def _grab(self):
+        if self.realtime:
+            now = time.perf_counter()
+            if self._next_at is None:
+                self._next_at = now
+            elif self._stop.wait(max(self._next_at - now, 0.0)):
+                return False
+            self._next_at += 1.0 / self.fps
+        if self._cap.grab():
+            return True
+        if self.loop and self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+            return self._cap.grab()
+        return None
+
+    def _retrieve(self, image):
+        return self._cap.retrieve(image)
+
+    def _close(self):
+        if self._cap is not None:
+            self._cap.release()
+
+
+def open_capture(source=0, **options):
+    """
+    A camera index (int or digit string) or a video file path -> capture
+    source. Anything that already has read() (a source, a test fixture) is
+    returned as is.
+    """
+    if hasattr(source, "read"):
+        return source
+    if isinstance(source, int) or str(source).isdigit():
+        return CameraSource(int(source), **options)
+    return VideoFileSource(str(source), **options)
+
+
+# --------------------------
+# Freshness check: slow reader on a real-time source
+# --------------------------
+def _plain_lag(path, seconds, work):
+    # Today's loop on the same file, paced like a camera: how old is each frame when read?
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    lags = []
+    start = time.perf_counter()
+    index = 0
+    while time.perf_counter() - start < seconds:
+        due = start + index / fps
+        if due > time.perf_counter():
+            time.sleep(due - time.perf_counter())
+        success, _ = cap.read()
+        if not success:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        lags.append(time.perf_counter() - due)
+        index += 1
+        time.sleep(work)
+    cap.release()
+    return {"frames": len(lags), "age_p50_ms": float(np.percentile(lags, 50) * 1000),
+            "age_max_ms": float(np.max(lags) * 1000)}
+
+
+def measure(source, seconds=5.0, work_ms=0.0, compare=False):
+    """Reads for `seconds`, spending work_ms per frame as detection would; returns the source's report."""
+    cap = open_capture(source, **({} if str(source).isdigit() else {"loop": True}))
+    buffer = None
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < seconds and cap.isOpened():
+            success, frame = cap.read(buffer)
+            if success:
+                buffer = frame  # Decode into the same array from now on
+                time.sleep(work_ms / 1000)
+    finally:
+        cap.release()
+    report = cap.report()
+    if compare and not str(source).isdigit():
+        report["plain_read"] = _plain_lag(source, seconds, work_ms / 1000)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a capture source: negotiation, latency and drops")
+    parser.add_argument("source", nargs="?", default="0", help="camera index or video file")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--work-ms", type=float, default=0.0, help="simulated per-frame processing time")
+    parser.add_argument("--compare", action="store_true", help="video files: also measure frame age with plain cap.read()")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(json.dumps(measure(args.source, args.seconds, args.work_ms, args.compare), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import math
+
+import numpy as np
+
+from finger_state import finger_extension
+
+# --------------------------
+# One-Euro filter (Casiez et al.) over landmark arrays
+# --------------------------
+class OneEuroFilter:
+    """Speed-adaptive low-pass filter: smooth when still, responsive when moving."""
+
+    def __init__(self, min_cutoff=1.0, beta=0.02, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._x = None
+        self._dx = None
+        self._t = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, timestamp):
+        x = np.asarray(x, dtype=np.float32)
+        if self._x is None or self._x.shape != x.shape:
+            self._x, self._dx, self._t = x, np.zeros_like(x), timestamp
+            return x
+        dt = max(timestamp - self._t, 1e-6)
+        dx = (x - self._x) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        self._dx = a_d * dx + (1 - a_d) * self._dx
+        cutoff = self.min_cutoff + self.beta * np.abs(self._dx)
+        a = self._alpha(cutoff, dt)
+        self._x = a * x + (1 - a) * self._x
+        self._t = timestamp
+        return self._x
+
+
+# --------------------------
+# Hysteresis + minimum-hold finger state machine
+# --------------------------
+HAND_SIDES = ("left", "right")
+
+
+class FingerDebouncer:
+    """
+    Turns landmark frames into finger states without threshold flicker.
+
+    Extensions are measured in hand-size units (see finger_extension). A finger
+    goes up only above up_threshold and comes down only below down_threshold,
+    and after a transition it must stay put for min_hold seconds before it may
+    flip again. Thresholds are (thumb, other fingers) pairs.
+    """
+
+    def __init__(self, up_threshold=(0.05, 0.15), down_threshold=(0.0, 0.05), min_hold=0.06, smoothing=True):
+        self.up = np.array([up_threshold[0]] + [up_threshold[1]] * 4, dtype=np.float32)
+        self.down = np.array([down_threshold[0]] + [down_threshold[1]] * 4, dtype=np.float32)
+        self.min_hold = min_hold
+        self.filters = [OneEuroFilter() if smoothing else None for _ in HAND_SIDES]
+        self.reset()
+
+    def reset(self):
+        self.states = np.zeros((2, 5), dtype=np.uint8)
+        self.changed_at = np.full((2, 5), -np.inf)
+        self.raw_states = np.zeros((2, 5), dtype=np.uint8)
+        self.raw_transitions = 0
+        self.transitions = 0
+        for f in self.filters:
+            if f:
+                f.reset()
+
+    @property
+    def suppressed(self):
+        return self.raw_transitions - self.transitions
+
+    def lost(self, side):
+        # Hand left the frame: restart smoothing so it doesn't blend across the gap
+        f = self.filters[side]
+        if f:
+            f.reset()
+
+    def update(self, lm, is_right, timestamp):
+        """Returns (N, 5) debounced states aligned with the input hands."""
+        lm = np.asarray(lm, dtype=np.float32)
+        is_right = np.asarray(is_right, dtype=bool)
+        out = np.zeros((len(lm), 5), dtype=np.uint8)
+        seen = set()
+        for i in range(len(lm)):
+            side = int(is_right[i])
+            seen.add(side)
+            hand_lm = lm[i:i + 1]
+            raw = (finger_extension(hand_lm, is_right[i:i + 1], normalize=True)[0] > 0).astype(np.uint8)
+            self.raw_transitions += int(np.count_nonzero(raw != self.raw_states[side]))
+            self.raw_states[side] = raw
+
+            f = self.filters[side]
+            if f:
+                hand_lm = f(hand_lm, timestamp)
+            ext = finger_extension(hand_lm, is_right[i:i + 1], normalize=True)[0]
+
+            state = self.states[side]
+            settled = timestamp - self.changed_at[side] >= self.min_hold
+            rise = (state == 0) & (ext > self.up) & settled
+            fall = (state == 1) & (ext < self.down) & settled
+            flip = rise | fall
+            if flip.any():
+                state[flip] ^= 1
+                self.changed_at[side][flip] = timestamp
+                self.transitions += int(np.count_nonzero(flip))
+            out[i] = state
+        for side in range(2):
+            if side not in seen:
+                self.lost(side)
+        return out
+
+    def report(self, duration=None):
+        report = {
+            "raw_transitions": self.raw_transitions,
+            "transitions": self.transitions,
+            "suppressed": self.suppressed,
+        }
+        if duration:
+            report["raw_per_minute"] = self.raw_transitions * 60.0 / duration
+            report["per_minute"] = self.transitions * 60.0 / duration
+        return report
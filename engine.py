@@ -0,0 +1,257 @@
+import threading
+import time
+from collections import deque
+
+
+# --------------------------
+# Latest-frame-wins queue
+# --------------------------
+class LatestQueue:
+    """
+    Bounded queue that drops the oldest item instead of blocking the producer.
+    on_drop(item), if set, is called with every item dropped that way.
+    """
+
+    def __init__(self, maxsize=1, on_drop=None):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def put(self, item):
+        dropped = None
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+                dropped = self._items[0]
+            self._items.append(item)
+            self._cond.notify()
+        if dropped is not None and self.on_drop:
+            self.on_drop(dropped)
+
+    def get(self, timeout=None):
+        # Returns None on timeout or once the queue is closed and drained
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def drain(self):
+        # Everything still queued, emptying the queue
+        with self._cond:
+            items = list(self._items)
+            self._items.clear()
+            return items
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+# --------------------------
+# Per-stage timing counters
+# --------------------------
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.mean * 1000,
+            "max_ms": self.max * 1000,
+            "last_ms": self.last * 1000,
+        }
+
+
+class Packet:
+    __slots__ = ("frame_id", "captured_at", "frame", "result")
+
+    def __init__(self, frame_id, captured_at, frame):
+        self.frame_id = frame_id
+        self.captured_at = captured_at
+        self.frame = frame
+        self.result = None
+
+
+# --------------------------
+# Synthetic frame source (camera-free runs)
+# --------------------------
+class SyntheticSource:
+    """Stands in for cv2.VideoCapture.read(); raises EOFError after num_frames."""
+
+    def __init__(self, num_frames=None, fps=None, make_frame=None):
+        self.num_frames = num_frames
+        self.interval = 1.0 / fps if fps else 0.0
+        self.make_frame = make_frame or (lambda i: i)
+        self.index = 0
+        self._next_at = None
+
+    def read(self):
+        if self.num_frames is not None and self.index >= self.num_frames:
+            raise EOFError
+        if self.interval:
+            now = time.perf_counter()
+            if self._next_at is None:
+                self._next_at = now
+            elif now < self._next_at:
+                time.sleep(self._next_at - now)
+            self._next_at += self.interval
+        frame = self.make_frame(self.index)
+        self.index += 1
+        return True, frame
+
+
+# --------------------------
+# Pipelined capture -> detect -> output engine
+# --------------------------
+class FrameEngine:
+    """
+    Runs capture and detection on their own threads and the output stage on the
+    calling thread (so cv2.imshow stays on the thread that owns the window).
+
+    read()          -> (success, frame); raise EOFError to end the stream
+    detect(frame)   -> any result, handed to output together with the frame
+    output(frame, result) -> return False to stop the engine
+    on_latency(seconds)   -> optional, capture-to-output-done time of each frame
+    release(frame)        -> optional, called once per frame when it leaves the
+                             pipeline: output done, dropped by a queue, or left
+                             over at stop (e.g. RingCapture.release_frame)
+
+    Pass an instrumentation.Metrics to also get capture/detect histograms.
+    """
+
+    def __init__(self, read, detect, output, queue_size=1, retry_delay=0.01, on_latency=None, metrics=None,
+                 release=None):
+        self.read = read
+        self.detect = detect
+        self.output = output
+        self.on_latency = on_latency
+        self.metrics = metrics
+        self.release = release
+        self.retry_delay = retry_delay
+        on_drop = (lambda packet: release(packet.frame)) if release else None
+        self.captured = LatestQueue(queue_size, on_drop)
+        self.detected = LatestQueue(queue_size, on_drop)
+        self.stats = {name: StageStats(name) for name in ("capture", "detect", "output", "latency")}
+        self.capture_failures = 0
+        self._stop = threading.Event()
+        self._threads = []
+
+    def stop(self):
+        self._stop.set()
+        self.captured.close()
+        self.detected.close()
+
+    @property
+    def running(self):
+        return not self._stop.is_set()
+
+    def _capture_loop(self):
+        stats = self.stats["capture"]
+        frame_id = 0
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    success, frame = self.read()
+                except EOFError:
+                    break
+                if not success:
+                    self.capture_failures += 1
+                    time.sleep(self.retry_delay)
+                    continue
+                now = time.perf_counter()
+                stats.add(now - start)
+                if self.metrics:
+                    self.metrics.record("capture", now - start)
+                self.captured.put(Packet(frame_id, now, frame))
+                frame_id += 1
+        finally:
+            self.captured.close()
+
+    def _detect_loop(self):
+        stats = self.stats["detect"]
+        try:
+            while not self._stop.is_set():
+                packet = self.captured.get()
+                if packet is None:
+                    if self.captured.closed:
+                        break
+                    continue
+                start = time.perf_counter()
+                packet.result = self.detect(packet.frame)
+                elapsed = time.perf_counter() - start
+                stats.add(elapsed)
+                if self.metrics:
+                    self.metrics.record("detect", elapsed)
+                self.detected.put(packet)
+        finally:
+            self.detected.close()
+
+    def run(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._detect_loop, name="detect", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        output_stats = self.stats["output"]
+        latency = self.stats["latency"]
+        try:
+            while not self._stop.is_set():
+                packet = self.detected.get()
+                if packet is None:
+                    if self.detected.closed:
+                        break
+                    continue
+                start = time.perf_counter()
+                try:
+                    keep_going = self.output(packet.frame, packet.result)
+                finally:
+                    if self.release:
+                        self.release(packet.frame)
+                end = time.perf_counter()
+                output_stats.add(end - start)
+                latency.add(end - packet.captured_at)
+                if self.on_latency:
+                    self.on_latency(end - packet.captured_at)
+                if keep_going is False:
+                    break
+        finally:
+            self.stop()
+            for thread in self._threads:
+                thread.join(timeout=1.0)
+            if self.release:
+                for packet in self.captured.drain() + self.detected.drain():
+                    self.release(packet.frame)
+
+    def report(self):
+        report = {name: stats.as_dict() for name, stats in self.stats.items()}
+        report["dropped"] = {"captured": self.captured.dropped, "detected": self.detected.dropped}
+        report["capture_failures"] = self.capture_failures
+        return report
@@ -0,0 +1,363 @@
+import argparse
+import json
+import multiprocessing as mp
+import threading
+import time
+import tracemalloc
+from multiprocessing import shared_memory
+from multiprocessing.reduction import ForkingPickler
+
+import numpy as np
+
+# --------------------------
+# Shared-memory frame ring
+# --------------------------
+# A fixed set of frame buffers allocated once in one shared-memory block:
+#
+#   [control: latest, reading][header per slot: seq, frame_id, time][pixels...]
+#
+# The producer writes a frame straight into a free slot (cv2 can decode into
+# it) and publishes the slot index; consumers read the pixels in place. Only
+# indices and sequence numbers change hands, never pixels. A slot's seq is odd
+# while it is being written, so a reader can check with valid() that the frame
+# it used was not overwritten underneath it.
+#
+# Single producer, single consumer. The producer never writes the slot that
+# was published last or the one the consumer has claimed.
+
+CONTROL_DTYPE = np.dtype([("latest", "<i8"), ("reading", "<i8")])
+SLOT_DTYPE = np.dtype([("seq", "<u8"), ("frame_id", "<i8"), ("time", "<f8")])
+_ALIGN = 64
+
+
+def _round_up(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class FrameRing:
+    def __init__(self, shape, slots=6, dtype=np.uint8, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        header_size = _round_up(CONTROL_DTYPE.itemsize + SLOT_DTYPE.itemsize * slots)
+        size = header_size + _round_up(self.frame_bytes) * slots
+
+        create = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        buf = self.shm.buf
+        self.control = np.ndarray((), dtype=CONTROL_DTYPE, buffer=buf)
+        self.header = np.ndarray((slots,), dtype=SLOT_DTYPE, buffer=buf, offset=CONTROL_DTYPE.itemsize)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=buf, offset=header_size,
+                                 strides=(_round_up(self.frame_bytes),) + self._strides())
+        if create:
+            self.header[:] = 0
+            self.header["frame_id"] = -1
+            self.control["latest"] = -1
+            self.control["reading"] = -1
+        self._owner = create
+        self._next = 0
+        self._frame_id = 0
+
+    def _strides(self):
+        return np.empty(self.shape, dtype=self.dtype).strides if self.shape else ()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def spec(self):
+        # Everything another process needs to attach: FrameRing(**ring.spec())
+        return {"shape": self.shape, "slots": self.slots, "dtype": self.dtype.str, "name": self.name}
+
+    def frame(self, index):
+        return self.frames[index]
+
+    # Producer side
+    def acquire(self, busy=()):
+        """
+        Index of a slot that is free to overwrite, also skipping the slots in
+        `busy`; its seq goes odd until commit(). None if every slot is taken.
+        """
+        busy = {int(self.control["latest"]), int(self.control["reading"]), *busy}
+        for offset in range(self.slots):
+            index = (self._next + offset) % self.slots
+            if index not in busy:
+                break
+        else:
+            return None
+        self._next = (index + 1) % self.slots
+        self.header["seq"][index] += 1
+        return index
+
+    def commit(self, index, timestamp=None):
+        slot = self.header[index:index + 1]
+        slot["frame_id"] = self._frame_id
+        slot["time"] = time.perf_counter() if timestamp is None else timestamp
+        slot["seq"] += 1
+        self.control["latest"] = index
+        self._frame_id += 1
+
+    def abort(self, index):
+        # Give the slot back without publishing it (e.g. a failed camera read)
+        self.header["seq"][index] += 1
+
+    # Consumer side
+    def claim(self, after=-1):
+        """
+        Claim the newest published frame with frame_id > after. Returns
+        (index, frame_id) or None if there is nothing newer. The slot stays
+        reserved until release().
+        """
+        index = int(self.control["latest"])
+        if index < 0:
+            return None
+        self.control["reading"] = index
+        seq = int(self.header["seq"][index])
+        frame_id = int(self.header["frame_id"][index])
+        if seq & 1 or frame_id <= after:
+            self.control["reading"] = -1
+            return None
+        return index, frame_id
+
+    def valid(self, index, frame_id):
+        # True if the slot still holds frame_id, i.e. what was read was not torn
+        return int(self.header["frame_id"][index]) == frame_id and not int(self.header["seq"][index]) & 1
+
+    def release(self):
+        self.control["reading"] = -1
+
+    def close(self):
+        del self.control, self.header, self.frames
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # A frame view is still alive somewhere; the mapping goes with it
+        if self._owner:
+            self.shm.unlink()
+
+
+class RingCapture:
+    """
+    Drop-in for cap.read() that decodes every frame into a ring slot instead
+    of a freshly allocated array. The ring is sized from the first frame.
+
+    Every frame read() returns keeps its slot reserved until release_frame()
+    is called with it (FrameEngine does that through its `release` hook once
+    a frame has been output or dropped), so a frame is never overwritten
+    while detection or output still use it. With no free slot read() waits
+    up to `timeout` for one and then fails like a camera read would.
+    FrameEngine with queue_size=1 has at most five frames in flight.
+    """
+
+    def __init__(self, cap, slots=6, timeout=0.5):
+        self.cap = cap
+        self.slots = slots
+        self.timeout = timeout
+        self.ring = None
+        self.copies = 0      # frames the backend would not decode in place
+        self.waits = 0       # reads that had to wait for a slot to be released
+        self._views = []     # One view per slot, so release_frame() can match by identity
+        self._held = set()
+        self._cond = threading.Condition()
+
+    def _acquire(self):
+        with self._cond:
+            index = self.ring.acquire(self._held)
+            if index is None:
+                self.waits += 1
+                self._cond.wait_for(lambda: len(self._held | {int(self.ring.control["latest"])}) < self.slots,
+                                    self.timeout)
+                index = self.ring.acquire(self._held)
+            if index is not None:
+                self._held.add(index)
+            return index
+
+    def release_frame(self, frame):
+        # Frees the slot behind a frame returned by read(); other arrays are ignored
+        with self._cond:
+            for index, view in enumerate(self._views):
+                if view is frame:
+                    self._held.discard(index)
+                    self._cond.notify()
+                    return
+
+    def _give_back(self, index):
+        self.ring.abort(index)
+        with self._cond:
+            self._held.discard(index)
+            self._cond.notify()
+
+    def read(self):
+        if self.ring is None:
+            success, frame = self.cap.read()
+            if not success:
+                return success, frame
+            self.ring = FrameRing(frame.shape, self.slots, frame.dtype)
+            self._views = [self.ring.frame(index) for index in range(self.slots)]
+            index = self._acquire()
+            np.copyto(self._views[index], frame)
+            self.ring.commit(index)
+            return True, self._views[index]
+
+        index = self._acquire()
+        if index is None:
+            return False, None  # Everything still in use downstream; the caller retries
+        buffer = self._views[index]
+        success, frame = self.cap.read(buffer)
+        if not success:
+            self._give_back(index)
+            return success, frame
+        if frame is not buffer and frame.shape == buffer.shape:
+            # Backend returned a new array (e.g. a format change): fall back to a copy
+            np.copyto(buffer, frame)
+            self.copies += 1
+        elif frame is not buffer:
+            self._give_back(index)
+            return True, frame
+        self.ring.commit(index)
+        return True, buffer
+
+    def release(self):
+        self.cap.release()
+        if self.ring:
+            self._views = []
+            self.ring.close()
+            self.ring = None
+
+
+# --------------------------
+# Benchmark: bytes copied and allocated per frame
+# --------------------------
+# A simulated camera keeps a decoded frame in its driver buffer; "reading" it
+# means writing those pixels into the application's array, which every variant
+# has to do once. What differs is what happens around it:
+#   loop           today's loop: cap.read() allocates a new array per frame
+#   ring           same thread, frame written into a reused ring slot
+#   queue-process  capture in another process, frames sent over mp.Queue
+#   ring-process   capture in another process, frames in a shared FrameRing
+
+def _touch(frame):
+    # Stand-in for detection reading the pixels
+    return int(frame[::32, ::32, 0].sum())
+
+
+def _queue_producer(queue, shape, frames):
+    src = np.random.default_rng(0).integers(0, 255, size=shape, dtype=np.uint8)
+    for _ in range(frames):
+        queue.put(src.copy())
+    queue.put(None)
+
+
+def _ring_producer(spec, stop):
+    ring = FrameRing(**spec)
+    src = np.random.default_rng(0).integers(0, 255, size=ring.shape, dtype=np.uint8)
+    try:
+        while not stop.is_set():
+            index = ring.acquire()
+            np.copyto(ring.frame(index), src)
+            ring.commit(index)
+            time.sleep(0.001)
+    finally:
+        ring.shm.close()
+
+
+def _measure(step, frames, frame_bytes):
+    # Throughput untraced first, then per-frame bytes newly allocated
+    # (tracemalloc peak over the step) and the number of frame-sized allocations
+    start = time.perf_counter()
+    for _ in range(frames):
+        step()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    allocated = 0
+    large = 0
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        step()
+        grown = tracemalloc.get_traced_memory()[1] - before
+        allocated += grown
+        large += grown // frame_bytes
+    tracemalloc.stop()
+    return {
+        "allocated_bytes_per_frame": allocated / frames,
+        "frame_allocations_per_frame": large / frames,
+        "fps": frames / elapsed,
+    }
+
+
+def _benchmark(shape=(480, 640, 3), frames=300):
+    frame_bytes = int(np.prod(shape))
+    src = np.random.default_rng(0).integers(0, 255, size=shape, dtype=np.uint8)
+    results = {}
+
+    results["loop"] = _measure(lambda: _touch(src.copy()), frames, frame_bytes)
+    results["loop"]["bytes_copied_per_frame"] = 0
+
+    ring = FrameRing(shape)
+
+    def ring_step():
+        index = ring.acquire()
+        np.copyto(ring.frame(index), src)
+        ring.commit(index)
+        index, _ = ring.claim()
+        _touch(ring.frame(index))
+        ring.release()
+
+    results["ring"] = _measure(ring_step, frames, frame_bytes)
+    results["ring"]["bytes_copied_per_frame"] = 0
+    ring.close()
+
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue(maxsize=4)
+    proc = ctx.Process(target=_queue_producer, args=(queue, shape, 2 * frames + 1), daemon=True)
+    proc.start()
+    _touch(queue.get())  # Wait for the producer to start
+    results["queue-process"] = _measure(lambda: _touch(queue.get()), frames, frame_bytes)
+    proc.join(timeout=5.0)
+    # Pickled on put, pushed through the pipe, unpickled on get
+    results["queue-process"]["bytes_copied_per_frame"] = 3 * len(ForkingPickler.dumps(src))
+
+    ring = FrameRing(shape)
+    stop = ctx.Event()
+    proc = ctx.Process(target=_ring_producer, args=(ring.spec(), stop), daemon=True)
+    proc.start()
+    last = [-1]
+    torn = [0]
+
+    def ring_process_step():
+        claimed = None
+        while claimed is None:
+            claimed = ring.claim(last[0])
+        index, frame_id = claimed
+        _touch(ring.frame(index))
+        if not ring.valid(index, frame_id):
+            torn[0] += 1
+        ring.release()
+        last[0] = frame_id
+
+    ring_process_step()  # Wait for the producer to start
+    results["ring-process"] = _measure(ring_process_step, frames, frame_bytes)
+    results["ring-process"]["bytes_copied_per_frame"] = 0
+    results["ring-process"]["torn_reads"] = torn[0]
+    stop.set()
+    proc.join(timeout=5.0)
+    ring.close()
+
+    results["frame_bytes"] = frame_bytes
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame ring vs. per-frame allocation benchmark")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+    print(json.dumps(_benchmark((args.height, args.width, 3), args.frames), indent=2))
+
+
+if __name__ == "__main__":
+    main()
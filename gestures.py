@@ -0,0 +1,147 @@
+from mapping import HANDS, MASK_FINGERS, as_mapping, fingers_to_mask
+from settings import HAND_LOST_TIME
+
+# --------------------------
+# Finger / chord decision logic shared by the live loop and trace replay
+# --------------------------
+
+TIP_IDS = [4, 8, 12, 16, 20]
+
+
+def hand_side(hand):
+    return "left" if hand["type"] == "Left" else "right"
+
+
+def fingers_up(hand):
+    # Same rule as cvzone's HandDetector.fingersUp, but it only needs the hand
+    # dict, so it also works on replayed hands and off the detection thread.
+    lm_list = hand["lmList"]
+    fingers = []
+    thumb_tip = lm_list[TIP_IDS[0]][0]
+    thumb_ip = lm_list[TIP_IDS[0] - 1][0]
+    if hand["type"] == "Right":
+        fingers.append(1 if thumb_tip > thumb_ip else 0)
+    else:
+        fingers.append(1 if thumb_tip < thumb_ip else 0)
+    for tip in TIP_IDS[1:]:
+        fingers.append(1 if lm_list[tip][1] < lm_list[tip - 2][1] else 0)
+    return fingers
+
+
+class ChordTracker:
+    """
+    Edge detection on finger bitmasks: on_play(hand_type, notes) fires when a
+    mapped finger goes up, on_release(hand_type, notes) when it comes down.
+    While the whole-hand mask matches a pattern chord, that chord plays
+    instead of the single-finger chords. Hands missing from a frame keep
+    their previous state, and an unchanged mask costs one comparison.
+
+    Hands listed in `latch` toggle instead: raising a finger starts its chord,
+    raising it again stops it, and lowering it does nothing (a drone that
+    keeps sounding while the hand rests). Patterns don't apply to them.
+
+    `chords` is a CompiledMapping, a mapping file, or an old-style chords dict.
+    """
+
+    def __init__(self, chords, on_play, on_release, latch=()):
+        self.mapping = as_mapping(chords)
+        self.on_play = on_play
+        self.on_release = on_release
+        self.latched = [hand_type in latch for hand_type in HANDS]
+        self.masks = [0] * len(HANDS)
+        self.sounding = [0] * len(HANDS)     # fingers whose own chord is playing
+        self.patterns = [None] * len(HANDS)  # pattern chord playing per hand
+
+    def update(self, fingers_by_hand):
+        # fingers_by_hand: {"left"/"right": [thumb, ..., pinky] or a bitmask}
+        for h, hand_type in enumerate(HANDS):
+            fingers = fingers_by_hand.get(hand_type)
+            if fingers is None:
+                continue
+            if not isinstance(fingers, int):
+                fingers = fingers_to_mask(fingers)
+            self.update_hand(h, fingers)
+
+    def update_hand(self, h, mask):
+        old = self.masks[h]
+        if mask == old:
+            return
+        self.masks[h] = mask
+        hand_type = HANDS[h]
+        finger_notes = self.mapping.finger_notes[h]
+        if self.latched[h]:
+            raised = mask & ~old & self.mapping.mapped[h]
+            for i in MASK_FINGERS[raised]:
+                if self.sounding[h] & (1 << i):
+                    self.on_release(hand_type, finger_notes[i])
+                else:
+                    self.on_play(hand_type, finger_notes[i])
+            self.sounding[h] ^= raised
+            return
+        pattern = self.mapping.pattern_notes[h][mask]
+
+        playing = self.patterns[h]
+        if playing is not None and playing is not pattern:
+            self.patterns[h] = None
+            self.on_release(hand_type, playing)
+
+        # Fingers whose chord must start or stop, in thumb-to-pinky order. A
+        # pattern chord replaces every finger chord; leaving it restarts the
+        # chords of fingers that are still up.
+        sounding = self.sounding[h]
+        if pattern is None:
+            changes = (sounding & ~mask) | (mask & ~sounding & self.mapping.mapped[h])
+        else:
+            changes = sounding
+        for i in MASK_FINGERS[changes]:
+            bit = 1 << i
+            if sounding & bit:
+                self.on_release(hand_type, finger_notes[i])
+            else:
+                self.on_play(hand_type, finger_notes[i])
+        self.sounding[h] = sounding ^ changes
+
+        if pattern is not None and self.patterns[h] is None:
+            self.patterns[h] = pattern
+            self.on_play(hand_type, pattern)
+
+    def reset(self):
+        # Forget what is sounding without releasing it: the notes were already
+        # silenced elsewhere (e.g. by the voice watchdog). Latched drones are off
+        # again, and fingers still up replay their chords on the next update.
+        self.masks = [0] * len(HANDS)
+        self.sounding = [0] * len(HANDS)
+        self.patterns = [None] * len(HANDS)
+
+    def release_all(self):
+        # Release every sounding chord, e.g. when the hands leave the frame
+        for h, hand_type in enumerate(HANDS):
+            if self.patterns[h] is not None:
+                self.on_release(hand_type, self.patterns[h])
+                self.patterns[h] = None
+            for i in MASK_FINGERS[self.sounding[h]]:
+                self.on_release(hand_type, self.mapping.finger_notes[h][i])
+            self.sounding[h] = 0
+            self.masks[h] = 0
+
+
+class HandLossTimer:
+    """
+    ChordTracker keeps a missing hand's state, so a hand that leaves the frame
+    with fingers up would hold its chords forever. apply(masks, now) fills in
+    mask 0 for every hand unseen for longer than lost_time; a hand that drops
+    out for a frame or two keeps playing. `now` is any clock in seconds (wall
+    time live, trace timestamps on replay).
+    """
+
+    def __init__(self, lost_time=HAND_LOST_TIME, now=None):
+        self.lost_time = lost_time
+        self.last_seen = dict.fromkeys(HANDS, now)
+
+    def apply(self, masks, now):
+        for hand_type, seen in self.last_seen.items():
+            if hand_type in masks or seen is None:
+                self.last_seen[hand_type] = now
+            elif now - seen > self.lost_time:
+                masks[hand_type] = 0  # Hand dropped out: release its chords
+        return masks
@@ -0,0 +1,99 @@
+import time
+from collections import deque
+
+# --------------------------
+# Workload levels, cheapest last
+# --------------------------
+# scale:        frame is resized by this factor before detection. The camera
+#               keeps capturing at its negotiated size: renegotiating a V4L2
+#               camera restarts its stream (hundreds of ms without frames) and
+#               the frame ring is sized to the capture, so the governor scales
+#               the copy handed to the detector instead
+# detect_every: run hand detection on every n-th frame, reuse hands otherwise
+# overlay:      draw landmarks and text on the preview
+DEFAULT_LEVELS = [
+    {"scale": 1.0, "detect_every": 1, "overlay": True},
+    {"scale": 1.0, "detect_every": 1, "overlay": False},
+    {"scale": 0.75, "detect_every": 1, "overlay": False},
+    {"scale": 0.5, "detect_every": 1, "overlay": False},
+    {"scale": 0.5, "detect_every": 2, "overlay": False},
+    {"scale": 0.5, "detect_every": 3, "overlay": False},
+]
+
+
+class LatencyGovernor:
+    """
+    Keeps gesture-to-note latency inside a budget by stepping through
+    workload levels. observe() takes each iteration's end-to-end latency; the
+    governor degrades one level once the smoothed latency has been over budget
+    for `patience` frames and recovers one level after `recover` frames
+    comfortably under it (below headroom * budget).
+    """
+
+    def __init__(self, budget=0.040, levels=None, patience=5, recover=60, headroom=0.6, smoothing=0.2):
+        self.budget = budget
+        self.levels = levels or DEFAULT_LEVELS
+        self.patience = patience
+        self.recover = recover
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.level = 0
+        self.ewma = None
+        self._over = 0
+        self._under = 0
+        self._frame = 0
+        self.frames_over_budget = 0
+        self.observed = 0
+        self.level_changes = 0
+        self.decisions = deque(maxlen=64)   # Latest (time, old level, new level, smoothed latency)
+        self.on_change = None    # called with the new settings dict
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def should_detect(self):
+        # Called once per captured frame
+        self._frame += 1
+        return self._frame % self.settings["detect_every"] == 0
+
+    def observe(self, latency):
+        self.observed += 1
+        if latency > self.budget:
+            self.frames_over_budget += 1
+        if self.ewma is None:
+            self.ewma = latency
+        else:
+            self.ewma += self.smoothing * (latency - self.ewma)
+
+        if self.ewma > self.budget:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.patience and self.level < len(self.levels) - 1:
+                self._set_level(self.level + 1)
+        elif self.ewma < self.budget * self.headroom:
+            self._under += 1
+            self._over = 0
+            if self._under >= self.recover and self.level > 0:
+                self._set_level(self.level - 1)
+        else:
+            self._over = self._under = 0
+
+    def _set_level(self, level):
+        self.level_changes += 1
+        self.decisions.append((time.time(), self.level, level, self.ewma))
+        self.level = level
+        self._over = self._under = 0
+        if self.on_change:
+            self.on_change(self.settings)
+
+    def metrics(self):
+        return {
+            "budget_ms": self.budget * 1000,
+            "level": self.level,
+            "settings": dict(self.settings),
+            "smoothed_latency_ms": (self.ewma or 0.0) * 1000,
+            "frames_over_budget": self.frames_over_budget,
+            "frames_observed": self.observed,
+            "level_changes": self.level_changes,
+        }
@@ -2,9 +2,11 @@ import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
 import threading
-print("GUI script started")
-from main import start_hand_tracking
-print("Import successful")
+from runtime import FAILED, READY, get_runtime
+
+# Open MIDI and load the hand model in the background while the window comes up
+runtime = get_runtime()
+runtime.warm_up(preload=("main",))
 
 # Initialize the main window
 window = tk.Tk()
@@ -51,11 +53,26 @@ def start_tracking():
     left_inst = int(left_text.split(":")[0].strip())
     right_inst = int(right_text.split(":")[0].strip())
     print(f"Selected - Left: {left_inst}, Right: {right_inst}")
+    from main import start_hand_tracking  # Already imported by the warm-up thread
     threading.Thread(target=start_hand_tracking, args=(left_inst, right_inst), daemon=True).start()
 
-# Start button
-start_button = tk.Button(window, text="Start Hand Tracking", command=start_tracking, font=("Arial", 14))
+# Start button (enabled once the runtime is ready)
+start_button = tk.Button(window, text="Start Hand Tracking", command=start_tracking, font=("Arial", 14), state="disabled")
 start_button.pack(pady=20)
 
+status_label = tk.Label(window, text="Loading hand tracker...", font=("Arial", 11), bg="white")
+status_label.pack()
+
+def check_ready():
+    if runtime.state == READY:
+        status_label.config(text=f"Ready in {runtime.timings['ready']:.1f}s")
+        start_button.config(state="normal")
+    elif runtime.state == FAILED:
+        status_label.config(text=f"Could not start: {runtime.error}")
+    else:
+        window.after(100, check_ready)
+
+check_ready()
+
 # Run the GUI
 window.mainloop()
\ No newline at end of file
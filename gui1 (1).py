@@ -2,12 +2,16 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from PIL import Image, ImageTk
 import threading
-import pygame.midi
 import random
-from main import start_hand_tracking
+from runtime import FAILED, READY, get_runtime
 
+# MIDI and the hand model load in the background while the splash is up
+runtime = get_runtime()
+runtime.warm_up(preload=("main",))
 
-pygame.midi.init()
+# Splash stays up until the runtime is ready, but at least / at most this long (ms)
+SPLASH_MIN_TIME = 500
+SPLASH_MAX_TIME = 15000
 
 def main_window():
     root = tk.Tk()
@@ -90,7 +94,14 @@ def main_window():
         left_inst = instrument_options.get(left_text, 0)
         right_inst = instrument_options.get(right_text, 0)
 
+        if runtime.state == FAILED:
+            messagebox.showerror("Error", f"Hand tracking could not start: {runtime.error}")
+            return
+        if runtime.state != READY:
+            messagebox.showinfo("Loading", "The hand tracker is still loading, please try again in a moment.")
+            return
         messagebox.showinfo("Starting", f"Left: {left_text} | Right: {right_text}")
+        from main import start_hand_tracking  # Already imported by the warm-up thread
         threading.Thread(target=start_hand_tracking, args=(left_inst, right_inst), daemon=True).start()
 
     start_button = ttk.Button(panel, text="Start Hand Tracking", command=start_tracking, style="TButton")
@@ -118,5 +129,14 @@ def load_main():
     splash_root.destroy()
     main_window()
 
-splash_root.after(3000, load_main)
+waited = [0]
+
+def wait_for_runtime():
+    waited[0] += 100
+    if waited[0] >= SPLASH_MIN_TIME and (runtime.state in (READY, FAILED) or waited[0] >= SPLASH_MAX_TIME):
+        load_main()
+    else:
+        splash_root.after(100, wait_for_runtime)
+
+splash_root.after(100, wait_for_runtime)
 splash_root.mainloop()
@@ -0,0 +1,132 @@
+import argparse
+import functools
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# --------------------------
+# Harmonium mode
+# --------------------------
+# The harmonium runs on the same tracking loop as the chord mode
+# (main.start_hand_tracking); only the mapping and the note lifetime differ:
+#   - mappings/harmonium.json: one note per finger, right hand melody
+#     (Sa Re Ga Ma Pa, two-finger patterns for Dha Ni Sa'), left hand drone
+#   - a note sounds exactly as long as its finger is up, plus a short
+#     bellows release, instead of a fixed 0.6 s sleep on a thread per note
+#   - with drone=True the left hand latches: raise a finger to start its
+#     drone, raise it again to stop it, so that hand can rest meanwhile
+# Notes go through runtime.voices, so no thread is started per note.
+
+HARMONIUM_MAPPING = "harmonium.json"
+PROGRAM = 19          # The old harmonium script's set_instrument(19)
+RELEASE_TIME = 0.15   # Seconds a note rings on after its finger comes down
+
+
+def harmonium_options(drone=True, release=RELEASE_TIME, mapping=HARMONIUM_MAPPING):
+    """Keyword arguments for main.start_hand_tracking that make it a harmonium."""
+    return {"mapping": mapping, "sustain": release, "latch": ("left",) if drone else (),
+            "title": "Virtual Harmonium"}
+
+
+def start_harmonium(program=PROGRAM, drone=True, release=RELEASE_TIME, **options):
+    import main
+
+    instruments = options.pop("instruments", None) or {"left": program, "right": program}
+    main.start_hand_tracking(instruments=instruments, **harmonium_options(drone, release), **options)
+
+
+# --------------------------
+# Thread check on recorded traces
+# --------------------------
+def check_threads(trace, drone=True, release=RELEASE_TIME, speed=10.0):
+    """
+    Replays a trace through the harmonium decisions, voices and an async
+    loopback MIDI sink, paced at `speed` x real time (release scaled to
+    match), sampling threading.active_count() every frame. Fingers go through
+    a FingerDebouncer and lost hands are released, as in start_harmonium's
+    tracking loop. Also reports how many threads the old thread-per-note
+    script would have had alive at once.
+    """
+    from debounce import FingerDebouncer
+    from finger_state import finger_masks, hands_to_arrays
+    from gestures import ChordTracker, HandLossTimer, hand_side
+    from landmark_trace import TraceReplay
+    from midi_backend import AsyncMidiDevice, RecordingBackend
+    from midi_out import HAND_CHANNELS, MidiOutput
+    from voices import VoiceAllocator
+
+    device = AsyncMidiDevice(RecordingBackend())
+    midi = MidiOutput(device, clock=device.clock)
+    voices = VoiceAllocator(midi)
+    debouncer = FingerDebouncer()
+    hand_loss = HandLossTimer()
+    note_ons = []   # trace time of every note-on
+
+    def play(hand_type, notes, at):
+        for note in notes:
+            voices.press(HAND_CHANNELS[hand_type], note)
+            note_ons.append(at)
+
+    def stop(hand_type, notes):
+        for note in notes:
+            voices.release(HAND_CHANNELS[hand_type], note, release / speed)
+
+    tracker = ChordTracker(HARMONIUM_MAPPING, functools.partial(play, at=0.0), stop, latch=("left",) if drone else ())
+    replay = TraceReplay(trace)
+    counts = np.zeros(len(replay), dtype=np.int32)
+    start = time.perf_counter()
+    for frame, (now, hands) in enumerate(replay.frames()):
+        wait = start + now / speed - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        lm, is_right = hands_to_arrays(hands)
+        masks = finger_masks(debouncer.update(lm, is_right, now)).tolist()
+        tracker.on_play = functools.partial(play, at=now)   # Note-ons are stamped with this frame's time
+        tracker.update(hand_loss.apply({hand_side(hand): mask for hand, mask in zip(hands, masks)}, now))
+        midi.flush()
+        counts[frame] = threading.active_count()
+    tracker.release_all()
+    midi.flush()
+    time.sleep(release / speed + 0.05)
+    report = voices.report()
+    voices.close()
+    device.close()
+
+    starts = np.array(note_ons)
+    # Old script: every note-on kept a thread alive for 0.6 s
+    legacy = int((np.searchsorted(starts, starts + 0.6) - np.arange(len(starts))).max()) if len(starts) else 0
+    return {"frames": len(counts), "note_ons": len(starts), "threads_min": int(counts.min()) if len(counts) else 0,
+            "threads_max": int(counts.max()) if len(counts) else 0, "hanging_voices": report["active"],
+            "peak_voices": report["peak"], "legacy_threads_started": len(starts), "legacy_peak_threads": legacy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual harmonium: right-hand melody, left-hand drone")
+    parser.add_argument("--check-trace", metavar="TRACE.npy", help="replay a trace and report thread counts instead")
+    parser.add_argument("--speed", type=float, default=10.0, help="replay speed for --check-trace")
+    parser.add_argument("--no-drone", action="store_true", help="left-hand notes follow the fingers too")
+    parser.add_argument("--release", type=float, default=RELEASE_TIME, help="seconds a note rings after its finger drops")
+    parser.add_argument("--program", type=int, default=PROGRAM, help="GM program for both hands")
+    parser.add_argument("--predictive", action="store_true", help="early, velocity-sensitive note-ons")
+    parser.add_argument("--midi", metavar="SPEC", help='MIDI output: device id, "null", "udp://HOST:PORT" or "osc://HOST:PORT"')
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(message)s")
+    if args.check_trace:
+        print(json.dumps(check_threads(args.check_trace, not args.no_drone, args.release, args.speed), indent=2))
+        return
+    if args.midi is not None:
+        from runtime import get_runtime
+
+        get_runtime().midi_device = args.midi
+    log.info("Harmonium started - press Q to quit")
+    start_harmonium(args.program, drone=not args.no_drone, release=args.release, predictive=args.predictive)
+
+
+if __name__ == "__main__":
+    main()
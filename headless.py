@@ -0,0 +1,184 @@
+import argparse
+import logging
+import socketserver
+import sys
+import threading
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PORT = 5077
+
+# --------------------------
+# Long-lived tracking service
+# --------------------------
+# Line protocol (stdin or TCP), one command per line, one reply line each:
+#   start [LEFT RIGHT]       start tracking, optionally with both programs
+#   stop                     stop tracking (MIDI device stays open)
+#   instrument left|right N  change a hand's program while running
+#   status                   "ok running|stopped left=N right=N"
+#   quit                     stop and shut the service down
+HELP = "commands: start [LEFT RIGHT] | stop | instrument left|right N | status | quit"
+
+
+class HandMidiService:
+    def __init__(self, preview_path=None, preview_interval=1.0, midi_device=None, **tracking_options):
+        import main
+
+        self._main = main
+        if midi_device is not None:
+            main.runtime.midi_device = midi_device
+        main.runtime.warm_up()  # Open MIDI and load the model once for the life of the service
+        self.preview_path = preview_path
+        self.preview_interval = preview_interval
+        self.tracking_options = tracking_options
+        self.instruments = {"left": main.default_instrument_left, "right": main.default_instrument_right}
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.shutdown_requested = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return False
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="tracking", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self):
+        try:
+            self._main.start_hand_tracking(
+                headless=True,
+                preview_path=self.preview_path,
+                preview_interval=self.preview_interval,
+                stop_event=self._stop_event,
+                instruments=self.instruments,
+                release_midi=False,
+                **self.tracking_options,
+            )
+        except Exception:
+            log.exception("Tracking stopped with an error")
+
+    def stop(self):
+        with self._lock:
+            self._stop_event.set()
+            thread = self._thread
+        if thread:
+            thread.join(timeout=5.0)
+        return thread is not None
+
+    def close(self):
+        self.stop()
+        self._main.runtime.close()
+
+    def handle(self, line):
+        parts = line.split()
+        if not parts:
+            return "error empty command; " + HELP
+        command, args = parts[0].lower(), parts[1:]
+        try:
+            if command == "start":
+                if len(args) == 2:
+                    self.instruments["left"], self.instruments["right"] = int(args[0]), int(args[1])
+                return "ok started" if self.start() else "ok already running"
+            if command == "stop":
+                self.stop()
+                return "ok stopped"
+            if command == "instrument":
+                hand, program = args[0].lower(), int(args[1])
+                if hand not in self.instruments or not 0 <= program <= 127:
+                    return "error usage: instrument left|right 0-127"
+                self.instruments[hand] = program
+                return f"ok {hand}={program}"
+            if command == "status":
+                state = "running" if self.running else "stopped"
+                return f"ok {state} left={self.instruments['left']} right={self.instruments['right']}"
+            if command == "quit":
+                self.shutdown_requested.set()
+                return "ok bye"
+        except (IndexError, ValueError):
+            pass
+        return "error " + HELP
+
+
+# --------------------------
+# Transports
+# --------------------------
+def serve_stdin(service):
+    for line in sys.stdin:
+        print(service.handle(line), flush=True)
+        if service.shutdown_requested.is_set():
+            break
+
+
+def serve_tcp(service, port, host="127.0.0.1"):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                reply = service.handle(raw.decode("utf-8", "replace"))
+                self.wfile.write((reply + "\n").encode("utf-8"))
+                if service.shutdown_requested.is_set():
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+                    break
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer((host, port), Handler)
+    server.daemon_threads = True
+    log.info("Listening on %s:%d", host, port)
+    with server:
+        server.serve_forever()
+
+
+def send_command(command, port=DEFAULT_PORT, host="127.0.0.1", timeout=2.0):
+    # Client helper used by app.py
+    import socket
+
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall((command + "\n").encode("utf-8"))
+        return conn.makefile("r", encoding="utf-8").readline().strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless hand-tracking MIDI service")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port on 127.0.0.1")
+    parser.add_argument("--stdin", action="store_true", help="read commands from stdin instead of TCP")
+    parser.add_argument("--preview", metavar="PATH", help="write a preview JPEG here while running")
+    parser.add_argument("--preview-interval", type=float, default=1.0, help="seconds between preview writes")
+    parser.add_argument("--autostart", action="store_true", help="start tracking immediately")
+    parser.add_argument("--mode", choices=("chords", "harmonium"), default="chords", help="what the fingers play")
+    parser.add_argument("--midi", metavar="SPEC", help='MIDI output: device id, "null", "udp://HOST:PORT" or "osc://HOST:PORT"')
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args()
+    # Logs go to stderr so stdout stays a clean reply channel
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    options = {}
+    if args.mode == "harmonium":
+        from harmonium import PROGRAM, harmonium_options
+
+        options = harmonium_options()
+    service = HandMidiService(preview_path=args.preview, preview_interval=args.preview_interval, midi_device=args.midi,
+                              **options)
+    if args.mode == "harmonium":
+        service.instruments.update(left=PROGRAM, right=PROGRAM)
+    if args.autostart:
+        service.start()
+    try:
+        if args.stdin:
+            serve_stdin(service)
+        else:
+            serve_tcp(service, args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
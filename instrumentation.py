@@ -0,0 +1,104 @@
+import json
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+STAGES = ("capture", "detect", "decide", "midi", "render")
+
+
+# --------------------------
+# Fixed-size latency histogram
+# --------------------------
+class RingHistogram:
+    """Keeps the last `size` samples in a preallocated array; add() is O(1)."""
+
+    def __init__(self, size=1024):
+        self._values = np.zeros(size, dtype=np.float64)
+        self._index = 0
+        self.count = 0
+
+    def add(self, value):
+        self._values[self._index] = value
+        self._index = (self._index + 1) % len(self._values)
+        self.count += 1
+
+    @property
+    def values(self):
+        return self._values[:min(self.count, len(self._values))]
+
+    def percentiles(self, *ps):
+        values = self.values
+        if not len(values):
+            return [0.0] * len(ps)
+        return np.percentile(values, ps).tolist()
+
+    def summary(self):
+        p50, p99 = self.percentiles(50, 99)
+        values = self.values
+        return {
+            "count": self.count,
+            "p50_ms": p50 * 1000,
+            "p99_ms": p99 * 1000,
+            "max_ms": float(values.max()) * 1000 if len(values) else 0.0,
+        }
+
+
+# --------------------------
+# Hot-path metrics
+# --------------------------
+class Metrics:
+    """Per-stage histograms plus an FPS counter fed by tick() once per displayed frame."""
+
+    def __init__(self, stages=STAGES, size=1024):
+        self.size = size
+        self.histograms = {stage: RingHistogram(size) for stage in stages}
+        self._frame_times = RingHistogram(120)
+        self._hud_lines = []
+        self._hud_at = 0.0
+
+    def record(self, stage, seconds):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = RingHistogram(self.size)
+        histogram.add(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def tick(self):
+        self._frame_times.add(time.perf_counter())
+
+    @property
+    def fps(self):
+        stamps = np.sort(self._frame_times.values)
+        if len(stamps) < 2 or stamps[-1] == stamps[0]:
+            return 0.0
+        return (len(stamps) - 1) / (stamps[-1] - stamps[0])
+
+    def summary(self):
+        report = {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+        report["fps"] = self.fps
+        return report
+
+    def dump_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def hud_lines(self, refresh=0.5):
+        # Percentiles are recomputed at most every `refresh` seconds, not per frame;
+        # the same list object is returned in between
+        now = time.perf_counter()
+        if now - self._hud_at >= refresh:
+            self._hud_at = now
+            self._hud_lines = [f"FPS {self.fps:5.1f}"]
+            for stage, histogram in self.histograms.items():
+                if histogram.count:
+                    p50, p99 = histogram.percentiles(50, 99)
+                    self._hud_lines.append(f"{stage:<8} p50 {p50 * 1000:5.1f}  p99 {p99 * 1000:5.1f} ms")
+        return self._hud_lines
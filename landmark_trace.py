@@ -0,0 +1,195 @@
+import argparse
+import time
+
+import numpy as np
+
+from debounce import FingerDebouncer
+from finger_state import finger_masks, fingers_up_batch
+from gestures import ChordTracker, HandLossTimer
+from mapping import DEFAULT_MAPPING
+
+# --------------------------
+# Trace format
+# --------------------------
+# One record per detected hand (or one "present=0" record for a frame with no
+# hands), saved as a plain .npy structured array so it can be memory-mapped.
+TRACE_DTYPE = np.dtype([
+    ("frame", "<u4"),
+    ("time", "<f8"),          # seconds since the first recorded frame
+    ("present", "u1"),        # 0 marks an empty frame
+    ("right", "u1"),          # hand["type"] == "Right"
+    ("bbox", "<i2", (4,)),
+    ("center", "<i2", (2,)),
+    ("lm", "<i2", (21, 3)),
+])
+
+
+class TraceRecorder:
+    """Collects the hands list returned by HandDetector.findHands, frame by frame."""
+
+    def __init__(self, path, capacity=4096):
+        self.path = path
+        self._records = np.zeros(capacity, dtype=TRACE_DTYPE)
+        self._size = 0
+        self._frame = 0
+        self._start = None
+
+    def _reserve(self, extra):
+        if self._size + extra > len(self._records):
+            grown = np.zeros(max(len(self._records) * 2, self._size + extra), dtype=TRACE_DTYPE)
+            grown[:self._size] = self._records[:self._size]
+            self._records = grown
+
+    def add(self, hands, timestamp=None):
+        now = time.perf_counter() if timestamp is None else timestamp
+        if self._start is None:
+            self._start = now
+        self._reserve(max(len(hands), 1))
+        if not hands:
+            rec = self._records[self._size]
+            rec["frame"] = self._frame
+            rec["time"] = now - self._start
+            self._size += 1
+        for hand in hands:
+            rec = self._records[self._size]
+            rec["frame"] = self._frame
+            rec["time"] = now - self._start
+            rec["present"] = 1
+            rec["right"] = hand["type"] == "Right"
+            rec["bbox"] = hand["bbox"]
+            rec["center"] = hand["center"]
+            rec["lm"] = hand["lmList"]
+            self._size += 1
+        self._frame += 1
+
+    @property
+    def records(self):
+        return self._records[:self._size]
+
+    def close(self):
+        np.save(self.path, self.records)
+
+
+def load_trace(path, mmap=True):
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def record_to_hand(rec):
+    return {
+        "lmList": rec["lm"].tolist(),
+        "bbox": tuple(int(v) for v in rec["bbox"]),
+        "center": tuple(int(v) for v in rec["center"]),
+        "type": "Right" if rec["right"] else "Left",
+    }
+
+
+# --------------------------
+# Replay
+# --------------------------
+class TraceReplay:
+    """
+    Iterates a recorded trace as (timestamp, hands) per frame, either as fast
+    as possible or paced to the recorded timestamps (realtime=True).
+    read() mirrors cv2.VideoCapture.read() so a trace can drive FrameEngine.
+    """
+
+    def __init__(self, trace, realtime=False):
+        self.trace = load_trace(trace) if isinstance(trace, str) else trace
+        self.realtime = realtime
+        frames = self.trace["frame"]
+        # Index of the first record of every frame after the first
+        self.frame_bounds = np.flatnonzero(np.diff(frames)) + 1 if len(frames) else np.zeros(0, dtype=np.intp)
+        self._iter = None
+
+    def __len__(self):
+        return len(self.frame_bounds) + 1 if len(self.trace) else 0
+
+    def frames(self):
+        start = time.perf_counter()
+        for chunk in np.split(self.trace, self.frame_bounds) if len(self.trace) else ():
+            timestamp = float(chunk["time"][0])
+            if self.realtime:
+                wait = start + timestamp - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            hands = [record_to_hand(rec) for rec in chunk if rec["present"]]
+            yield timestamp, hands
+
+    def read(self):
+        if self._iter is None:
+            self._iter = self.frames()
+        try:
+            _, hands = next(self._iter)
+        except StopIteration:
+            raise EOFError
+        return True, hands
+
+
+def replay_events(trace, chords=DEFAULT_MAPPING, realtime=False, debouncer=None):
+    """
+    Runs a trace through the finger/chord logic; returns (events, frames/sec).
+    With a FingerDebouncer the frames are classified one by one through it,
+    otherwise the whole trace is classified in one batch. As in the live loop,
+    a hand missing for HAND_LOST_TIME (in trace time) releases its chords.
+    """
+    events = []
+    frame_index = [0]
+    tracker = ChordTracker(
+        chords,
+        on_play=lambda hand_type, notes: events.append((frame_index[0], "on", hand_type, tuple(notes))),
+        on_release=lambda hand_type, notes: events.append((frame_index[0], "off", hand_type, tuple(notes))),
+    )
+    hand_loss = HandLossTimer()
+    replay = TraceReplay(trace, realtime=realtime)
+    records = replay.trace
+    start = time.perf_counter()
+    # Classify every recorded hand in one batch, then walk the frames
+    if debouncer is None:
+        states = finger_masks(fingers_up_batch(records["lm"], records["right"])).tolist()
+    present = records["present"].tolist()
+    sides = ["right" if right else "left" for right in records["right"].tolist()]
+    times = records["time"]
+    bounds = [0] + replay.frame_bounds.tolist() + [len(records)]
+    for frame in range(len(bounds) - 1):
+        frame_index[0] = frame
+        lo, hi = bounds[frame], bounds[frame + 1]
+        if realtime:
+            wait = start + float(times[lo]) - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+        if debouncer is not None:
+            rows = [i for i in range(lo, hi) if present[i]]
+            frame_states = debouncer.update(records["lm"][rows], records["right"][rows], float(times[lo])).tolist()
+            masks = {sides[i]: s for i, s in zip(rows, frame_states)}
+        else:
+            masks = {sides[i]: states[i] for i in range(lo, hi) if present[i]}
+        tracker.update(hand_loss.apply(masks, float(times[lo])))
+    elapsed = time.perf_counter() - start
+    return events, len(replay) / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a landmark trace through the chord logic")
+    parser.add_argument("trace")
+    parser.add_argument("--realtime", action="store_true", help="pace frames to the recorded timestamps")
+    parser.add_argument("--events", help="write MIDI decisions to this file (one per line, diffable)")
+    parser.add_argument("--mapping", default=DEFAULT_MAPPING, help="chord mapping file")
+    parser.add_argument("--debounce", action="store_true", help="apply hysteresis/hold/smoothing to finger states")
+    args = parser.parse_args()
+
+    debouncer = FingerDebouncer() if args.debounce else None
+    events, fps = replay_events(args.trace, chords=args.mapping, realtime=args.realtime, debouncer=debouncer)
+    trace = load_trace(args.trace)
+    duration = float(trace["time"][-1]) if len(trace) else 0.0
+    per_minute = len(events) * 60.0 / duration if duration else 0.0
+    print(f"{len(TraceReplay(trace))} frames, {len(events)} events ({per_minute:.0f}/min), {fps:.0f} frames/sec")
+    if debouncer is not None:
+        print(f"Debouncer: {debouncer.report(duration)}")
+    if args.events:
+        with open(args.events, "w") as f:
+            for frame, kind, hand_type, notes in events:
+                f.write(f"{frame} {kind} {hand_type} {' '.join(map(str, notes))}\n")
+
+
+if __name__ == "__main__":
+    main()
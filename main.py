@@ -1,113 +1,279 @@
+import argparse
 import cv2
+import logging
+import os
 import threading
-import pygame.midi
 import time
-from cvzone.HandTrackingModule import HandDetector
-
-# Initialize Pygame MIDI
-pygame.midi.init()
-player = pygame.midi.Output(0)
-
-default_instrument_left = 0  # Default Acoustic Grand Piano
-default_instrument_right = 24  # Default Acoustic Guitar (nylon)
-
-# Define chord mappings
-chords = {
-    "left": {
-        "thumb": {"notes": [60, 64]},  # Sa & Ma (C & F#)
-        "index": {"notes": [62, 67]},  # Re & Pa (D & G)
-        "middle": {"notes": [64, 71]}, # Ga & Ni (E & B)
-        "ring": {"notes": [65, 69]},  # Ma & Dha (F# & A)
-        "pinky": {"notes": [67, 72]}  # Pa & Sa (G & C)
-    },
-    "right": {
-        "thumb": {"notes": [60, 64, 67]},  # Sa Ma Pa (C F# G)
-        "index": {"notes": [62, 66, 71]},  # Re Ma Ni (D F# B)
-        "middle": {"notes": [64, 69, 74]}, # Ga Dha Re (E A D)
-        "ring": {"notes": [65, 70, 76]},  # Ma Ni Ga (F# B E)
-        "pinky": {"notes": [67, 72, 79]}  # Pa Sa Ga (G C E)
-    }
-}
-
-# Sargam Mapping
-sargam_map = {60: "Sa", 62: "Re", 64: "Ga", 65: "Ma", 67: "Pa", 69: "Dha", 71: "Ni", 72: "Sa"}
-
-# Sustain time
-SUSTAIN_TIME = 2.0
-SARGAM_DISPLAY_TIME = 3.5  # Increased display time
-prev_states = {hand: {finger: 0 for finger in chords[hand]} for hand in chords}
+from debounce import FingerDebouncer
+from engine import FrameEngine
+from finger_state import finger_masks, hand_masks, hands_to_arrays
+from capture import open_capture
+from frame_ring import RingCapture
+from gestures import ChordTracker, HandLossTimer, hand_side
+from governor import LatencyGovernor
+from instrumentation import Metrics
+from landmark_trace import TraceRecorder
+from mapping import DEFAULT_MAPPING, as_mapping, load_mapping
+from midi_out import HAND_CHANNELS
+from overlay import OverlayCompositor
+from performance_log import PerformanceLog, export_midi
+from predictive import PredictiveTrigger
+from roi import RoiTracker, find_hands
+from runtime import get_runtime
+from sequencer import SongSequencer, load_song
+from settings import CAMERA_TIMEOUT, DEFAULT_INSTRUMENT_LEFT, DEFAULT_INSTRUMENT_RIGHT, SUSTAIN_TIME
+
+log = logging.getLogger(__name__)
+
+# MIDI device, note-off scheduler and detector are opened lazily and shared
+runtime = get_runtime()
 
+default_instrument_left = DEFAULT_INSTRUMENT_LEFT  # Default Acoustic Grand Piano
+default_instrument_right = DEFAULT_INSTRUMENT_RIGHT  # Default Acoustic Guitar (nylon)
+
+# Chord and Sargam mappings, compiled from mappings/main.json (shared with trace replay)
+chords = load_mapping(DEFAULT_MAPPING)
+
+SARGAM_DISPLAY_TIME = 3.5  # Increased display time
 sargam_text = "-"
 sargam_timestamp = time.time()
 
-def play_chord(instrument, chord_notes):
-    player.set_instrument(instrument)
+# Events are queued here and sent in one batch per frame by runtime.midi.flush().
+# runtime.voices reference-counts every (channel, note), so chords that share a
+# note don't cut each other off, and caps polyphony.
+def play_chord(instrument, chord_notes, channel=0, velocity=127):
+    runtime.midi.set_program(channel, instrument)  # Only sent when the program changes
     for note in chord_notes:
-        player.note_on(note, 127)
-    print(f"Playing chord {chord_notes} on instrument {instrument}")
+        runtime.voices.press(channel, note, velocity)
+    log.debug("Playing chord %s on instrument %s", chord_notes, instrument)
 
-def stop_chord_after_delay(chord_notes):
-    time.sleep(SUSTAIN_TIME)
+def stop_chord_after_delay(chord_notes, channel=0, sustain=SUSTAIN_TIME):
     for note in chord_notes:
-        player.note_off(note, 127)
-    print(f"Stopped chord {chord_notes}")
+        runtime.voices.release(channel, note, sustain)
+    log.debug("Stopping chord %s in %ss", chord_notes, sustain)
 
-def start_hand_tracking(left_instrument=default_instrument_left, right_instrument=default_instrument_right):
+def start_hand_tracking(left_instrument=default_instrument_left, right_instrument=default_instrument_right, record_path=None, debounce=True, use_roi=True,
+                        latency_budget=None, hud=False, stats_path=None, headless=False, preview_path=None,
+                        preview_interval=1.0, stop_event=None, instruments=None, release_midi=True, mapping=None,
+                        save_midi=None, predictive=False, preview_scale=0.5, sustain=SUSTAIN_TIME, latch=(),
+                        title="Hand Tracking MIDI Chords", source=0, song=None):
+    """
+    Runs the tracking loop until 'q' is pressed, the camera closes or
+    stop_event is set. headless=True skips all drawing and the window; a
+    preview JPEG is then written to preview_path at most every
+    preview_interval seconds. A caller-owned `instruments` dict
+    ({"left": program, "right": program}) can be changed while running.
+    `mapping` is a mapping file or CompiledMapping (defaults to mappings/main.json).
+    With save_midi every message is logged (TAKE.events, written as you play)
+    and exported to that .mid file on exit. predictive=True fires note-ons
+    a frame early from finger velocity and maps strike speed to MIDI velocity.
+    The window shows a copy of the frame scaled by preview_scale; nothing is
+    drawn on the capture buffer. Notes ring for `sustain` seconds after their
+    finger comes down; hands in `latch` toggle their chords (see ChordTracker).
+    `source` is a camera index or a video file (see capture.open_capture).
+    With `song` (a songs/ file or Song) the fingers step through that song
+    instead of playing chords freely.
+    """
     global sargam_text, sargam_timestamp
-    instruments = {"left": left_instrument, "right": right_instrument}
-    cap = cv2.VideoCapture(0)
-    detector = HandDetector(detectionCon=0.8, maxHands=2)
-    prev_states = {hand: {finger: 0 for finger in chords[hand]} for hand in chords}
-    
-    while cap.isOpened():
-        success, img = cap.read()
-        if not success:
-            print("❌ Camera not capturing frames")
-            continue
-
-        hands, img = detector.findHands(img, draw=True)
+    if instruments is None:
+        instruments = {"left": left_instrument, "right": right_instrument}
+    runtime.wait()  # Opens MIDI and loads the detector model unless already warmed up
+    midi = runtime.midi
+    detector = runtime.detector
+    # A grab thread keeps the newest frame ready; it is decoded into reused buffers
+    cap = RingCapture(open_capture(source))
+    recorder = TraceRecorder(record_path) if record_path else None
+    debouncer = FingerDebouncer() if debounce else None
+    if predictive:
+        # Same update() interface; early note-ons on top of the debounced states
+        debouncer = PredictiveTrigger(debouncer=debouncer)
+    velocities = {}  # hand -> MIDI velocity of its latest strike
+    roi = RoiTracker(detector, max_hands=2) if use_roi else None
+    governor = LatencyGovernor(latency_budget) if latency_budget else None
+    metrics = Metrics()
+    perf_log = PerformanceLog(os.path.splitext(save_midi)[0] + ".events") if save_midi else None
+    midi.event_log = perf_log
+    detect_scale = [1.0]  # Scale of the frames the ROI tracker last saw (detect thread only)
+
+    active_mapping = as_mapping(mapping) if mapping else chords
+    if song is not None:
+        song = load_song(song) if isinstance(song, str) else song
+        active_mapping = as_mapping(mapping or song.mapping)
+
+    def on_play(hand_type, chord_notes):
+        global sargam_text, sargam_timestamp
+        play_chord(instruments[hand_type], chord_notes, HAND_CHANNELS[hand_type], velocities.get(hand_type, 127))
+        sargam_text = active_mapping.label(chord_notes)
+        sargam_timestamp = time.time()
+
+    def on_release(hand_type, chord_notes):
+        stop_chord_after_delay(chord_notes, HAND_CHANNELS[hand_type], sustain)
+
+    def on_step_release(hand_type, chord_notes, delay):
+        stop_chord_after_delay(chord_notes, HAND_CHANNELS[hand_type], delay)
+
+    if song is not None:
+        tracker = SongSequencer(song, on_play, on_step_release, mapping=active_mapping)
+    else:
+        tracker = ChordTracker(active_mapping, on_play, on_release, latch=latch)
+    compositor = None if headless else OverlayCompositor(preview_scale, mapping=active_mapping)
+
+    last_preview = [0.0]
+    hand_loss = HandLossTimer(now=time.perf_counter())  # Hands gone too long release their chords
+    watchdog_fired = threading.Event()
+    runtime.voices.on_watchdog = watchdog_fired.set
+
+    def read_frame():
+        if not cap.cap.isOpened() or (stop_event and stop_event.is_set()):
+            raise EOFError
+        return cap.read()
+
+    def detect(img):
+        settings = governor.settings if governor else None
+        if settings and roi and settings["scale"] != detect_scale[0]:
+            # The governor changed the scale: the ROI's bboxes are in the old frame size.
+            # Reset here, on the thread that owns the tracker, not from the output stage
+            roi.reset()
+            detect_scale[0] = settings["scale"]
+        if settings and settings["scale"] != 1.0:
+            img = cv2.resize(img, None, fx=settings["scale"], fy=settings["scale"], interpolation=cv2.INTER_AREA)
+        if governor and not governor.should_detect():
+            return None, img  # Skipped: finger states carry over from the last detection
+
+        if roi:
+            # Search around the last known hands, full frame only every few frames
+            hands = roi.find(img)
+        else:
+            hands = find_hands(detector, img)
+        if recorder:
+            recorder.add(hands)
+        # Finger bitmask per hand (debounced unless disabled)
+        if debouncer:
+            lm, is_right = hands_to_arrays(hands)
+            masks = finger_masks(debouncer.update(lm, is_right, time.perf_counter())).tolist()
+        else:
+            masks = hand_masks(hands)
         detected_hands = {}
-        
-        for hand in hands:
-            hand_type = "left" if hand["type"] == "Left" else "right"
-            detected_hands[hand_type] = hand  # Store detected hands
-
-        # Display hand labels *only once per hand type*
-        for hand_type, hand in detected_hands.items():
-            cv2.putText(img, f"{hand_type.capitalize()} Hand", (hand["bbox"][0], hand["bbox"][1] - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-        
-        current_sargam = "-"
-        for hand_type in ["left", "right"]:
-            if hand_type in detected_hands:
-                fingers_state = detector.fingersUp(detected_hands[hand_type])
-                finger_names = ["thumb", "index", "middle", "ring", "pinky"]
-
-                for i, finger in enumerate(finger_names):
-                    if finger in chords[hand_type]:
-                        chord_notes = chords[hand_type][finger]["notes"]
-                        instrument = instruments[hand_type]
-
-                        if fingers_state[i] == 1 and prev_states[hand_type][finger] == 0:
-                            play_chord(instrument, chord_notes)
-                            current_sargam = sargam_map.get(chord_notes[0], "-")
-                            sargam_text = current_sargam
-                            sargam_timestamp = time.time()
-                        elif fingers_state[i] == 0 and prev_states[hand_type][finger] == 1:
-                            threading.Thread(target=stop_chord_after_delay, args=(chord_notes,), daemon=True).start()
-                        prev_states[hand_type][finger] = fingers_state[i]
-                
-        if time.time() - sargam_timestamp < SARGAM_DISPLAY_TIME:
-            cv2.putText(img, sargam_text, (50, 100),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 0, 0), 3)
-
-        cv2.imshow("Hand Tracking MIDI Chords", img)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+        for hand, mask in zip(hands, masks):
+            velocity = debouncer.strike_velocity(int(hand["type"] == "Right")) if predictive else 127
+            detected_hands[hand_side(hand)] = (hand, mask, velocity)  # Store detected hands
+        return detected_hands, img
+
+    # Output stage: chord decisions, overlay and display
+    def output(frame, result):
+        detected_hands, img = result
+        overlay = (governor.settings["overlay"] if governor else True) and not headless
+
+        runtime.voices.watchdog(CAMERA_TIMEOUT)
+        if watchdog_fired.is_set() and song is None:
+            # Frames stopped and the voices released everything: clear the tracker
+            # too, or a latched drone would be toggled off by its next raise
+            watchdog_fired.clear()
+            tracker.reset()
+        if detected_hands is not None:
+            with metrics.timer("decide"):
+                velocities.update((hand_type, velocity) for hand_type, (_, _, velocity) in detected_hands.items())
+                fingers_by_hand = {hand_type: mask for hand_type, (_, mask, _) in detected_hands.items()}
+                tracker.update(hand_loss.apply(fingers_by_hand, time.perf_counter()))
+            with metrics.timer("midi"):
+                midi.flush()
+
+        if headless:
+            # Nothing on the critical path but an occasional preview file
+            now = time.time()
+            if preview_path and now - last_preview[0] >= preview_interval:
+                last_preview[0] = now
+                cv2.imwrite(preview_path, img)
+            metrics.tick()
+            return not (stop_event and stop_event.is_set())
 
+        render_start = time.perf_counter()
+
+        # Labels and sargam names are cached sprites, composited onto a downscaled copy
+        overlay_hands = {hand_type: hand for hand_type, (hand, _, _) in (detected_hands or {}).items()} if overlay else None
+        sargam = sargam_text if overlay and time.time() - sargam_timestamp < SARGAM_DISPLAY_TIME else None
+        preview = compositor.render(img, overlay_hands, sargam, metrics.hud_lines() if hud else None,
+                                    prompt=tracker.prompt() if song is not None else None)
+
+        cv2.imshow(title, preview)
+        quit_pressed = cv2.waitKey(1) & 0xFF == ord('q')
+        metrics.record("render", time.perf_counter() - render_start)
+        metrics.tick()
+        return not quit_pressed
+
+    # Ring slots stay reserved until their frame has been output or dropped
+    engine = FrameEngine(read_frame, detect, output, on_latency=governor.observe if governor else None,
+                         metrics=metrics, release=cap.release_frame)
+    engine.run()
+    log.info("Engine stats: %s", engine.report())
+    if debouncer:
+        log.info("%s: %s", type(debouncer).__name__, debouncer.report())
+    log.info("Capture: %s", cap.cap.report())
+    if roi:
+        log.info("ROI tracker: %s", roi.report())
+    if compositor:
+        log.info("Overlay: %s", compositor.report())
+    if governor:
+        log.info("Latency governor: %s", governor.metrics())
+    if stats_path:
+        metrics.dump_json(stats_path)
+        log.info("Saved latency stats to %s", stats_path)
+
+    runtime.voices.on_watchdog = None
+    log.info("Voices: %s", runtime.voices.report())
+    log.info("MIDI sender: %s", runtime.player.metrics())
+    if runtime.quantize is not None:
+        log.info("Quantizer: %s", midi.report())
+    runtime.voices.panic()
+    midi.flush()
+    if perf_log:
+        midi.event_log = None
+        perf_log.close()
+        count = export_midi(perf_log.path, save_midi)
+        log.info("Saved %d MIDI events to %s (%s)", count, save_midi, perf_log.report())
+        if perf_log.dropped:
+            log.warning("%d MIDI events were dropped from the take: the disk could not keep up", perf_log.dropped)
+    if recorder:
+        recorder.close()
+        log.info("Saved landmark trace to %s", record_path)
     cap.release()
-    cv2.destroyAllWindows()
-    pygame.midi.quit()
+    if not headless:
+        cv2.destroyAllWindows()
+    if release_midi:
+        runtime.close()
 
 if __name__ == "__main__":
-    start_hand_tracking()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Hand Tracking MIDI Chords")
+    parser.add_argument("--source", default="0", help="camera index or a video file to play along to")
+    parser.add_argument("--record", metavar="TRACE.npy", help="save detected landmarks for replay with landmark_trace.py")
+    parser.add_argument("--raw-fingers", action="store_true", help="disable finger-state debouncing")
+    parser.add_argument("--predictive", action="store_true",
+                        help="fire note-ons early from finger velocity, with velocity-sensitive strikes")
+    parser.add_argument("--full-frame", action="store_true", help="run hand detection on the full frame every time")
+    parser.add_argument("--latency-budget", type=float, metavar="MS",
+                        help="scale resolution, detection rate and overlay to keep latency under MS milliseconds")
+    parser.add_argument("--hud", action="store_true", help="show p50/p99 stage latency and FPS on the preview")
+    parser.add_argument("--preview-scale", type=float, default=0.5, help="size of the preview window relative to the camera")
+    parser.add_argument("--stats-json", metavar="PATH", help="write latency histograms as JSON on exit")
+    parser.add_argument("--mapping", metavar="FILE", help="chord mapping file (see mappings/)")
+    parser.add_argument("--song", metavar="FILE", help="step through a song from songs/ instead of free chords")
+    parser.add_argument("--save-midi", metavar="TAKE.mid", help="log every MIDI message and export a .mid on exit")
+    parser.add_argument("--midi", metavar="SPEC", help='MIDI output: device id, "null", "udp://HOST:PORT" or "osc://HOST:PORT"')
+    parser.add_argument("--quantize", type=int, metavar="STEPS", help="snap notes to a grid of STEPS per beat (4 = sixteenths)")
+    parser.add_argument("--bpm", type=float, default=100.0, help="tempo for --quantize")
+    parser.add_argument("--midi-clock", action="store_true", help="with --quantize, also send MIDI clock at that tempo")
+    parser.add_argument("--log-level", default="INFO", help="e.g. DEBUG to log every chord")
+    args = parser.parse_args()
+    if args.midi is not None:
+        runtime.midi_device = args.midi
+    if args.quantize:
+        from quantize import TempoClock
+
+        runtime.quantize = TempoClock(args.bpm, args.quantize)
+        runtime.quantize_options = {"midi_clock": args.midi_clock}
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(message)s")
+    start_hand_tracking(record_path=args.record, debounce=not args.raw_fingers, use_roi=not args.full_frame,
+                        latency_budget=args.latency_budget / 1000 if args.latency_budget else None,
+                        hud=args.hud, stats_path=args.stats_json, mapping=args.mapping,
+                        save_midi=args.save_midi, predictive=args.predictive, preview_scale=args.preview_scale,
+                        source=args.source, song=args.song)
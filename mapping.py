@@ -0,0 +1,103 @@
+import json
+import os
+
+# --------------------------
+# Chord/scale mapping compiler
+# --------------------------
+# Mapping files (mappings/*.json) look like:
+#   {
+#     "name": "...",
+#     "fingers":  {"left": {"thumb": [60, 64], ...}, "right": {...}},
+#     "patterns": {"right": {"index+middle": [69, 72, 76]}},
+#     "sargam":   {"60": "Sa", ...}
+#   }
+# "fingers" gives the chord a single raised finger plays. "patterns" gives a
+# chord for an exact whole-hand finger combination; while the hand holds that
+# combination the pattern chord plays instead of the individual finger chords.
+#
+# Compiling turns this into flat tables indexed by hand (0 = left, 1 = right),
+# finger (0-4) and finger bitmask (bit i set = FINGER_NAMES[i] up), so the
+# per-frame work is a few list lookups.
+
+FINGER_NAMES = ["thumb", "index", "middle", "ring", "pinky"]
+HANDS = ["left", "right"]
+NUM_MASKS = 1 << len(FINGER_NAMES)
+
+MAPPINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mappings")
+DEFAULT_MAPPING = os.path.join(MAPPINGS_DIR, "main.json")
+
+# Finger indices set in each bitmask, precomputed once
+MASK_FINGERS = [tuple(i for i in range(len(FINGER_NAMES)) if mask >> i & 1) for mask in range(NUM_MASKS)]
+
+
+def fingers_to_mask(fingers):
+    mask = 0
+    for i, up in enumerate(fingers):
+        if up:
+            mask |= 1 << i
+    return mask
+
+
+def pattern_to_mask(pattern):
+    mask = 0
+    for finger in pattern.split("+"):
+        finger = finger.strip().lower()
+        if finger not in FINGER_NAMES:
+            raise ValueError(f"Unknown finger {finger!r} in pattern {pattern!r}")
+        mask |= 1 << FINGER_NAMES.index(finger)
+    return mask
+
+
+class CompiledMapping:
+    def __init__(self, name, finger_notes, pattern_notes, sargam):
+        self.name = name
+        self.finger_notes = finger_notes    # [hand][finger] -> tuple of notes or None
+        self.pattern_notes = pattern_notes  # [hand][mask] -> tuple of notes or None
+        self.sargam = sargam                # note -> label
+        # [hand] -> bitmask of fingers that have a chord
+        self.mapped = [fingers_to_mask([notes is not None for notes in hand]) for hand in finger_notes]
+
+    def notes_for(self, hand, finger):
+        return self.finger_notes[HANDS.index(hand)][FINGER_NAMES.index(finger)]
+
+    def label(self, notes, default="-"):
+        return self.sargam.get(notes[0], default) if notes else default
+
+
+def _notes(value):
+    # Accept both [60, 64] and the old {"notes": [60, 64]} form
+    if isinstance(value, dict):
+        value = value["notes"]
+    return tuple(int(note) for note in value)
+
+
+def compile_mapping(config):
+    finger_notes = [[None] * len(FINGER_NAMES) for _ in HANDS]
+    pattern_notes = [[None] * NUM_MASKS for _ in HANDS]
+    fingers = config.get("fingers", config)
+    for h, hand in enumerate(HANDS):
+        for finger, notes in fingers.get(hand, {}).items():
+            finger_notes[h][FINGER_NAMES.index(finger)] = _notes(notes)
+        for pattern, notes in config.get("patterns", {}).get(hand, {}).items():
+            mask = pattern_to_mask(pattern)
+            if bin(mask).count("1") < 2:
+                raise ValueError(f"Pattern {pattern!r} needs at least two fingers; use 'fingers' for one")
+            pattern_notes[h][mask] = _notes(notes)
+    sargam = {int(note): label for note, label in config.get("sargam", {}).items()}
+    return CompiledMapping(config.get("name", ""), finger_notes, pattern_notes, sargam)
+
+
+def load_mapping(path=DEFAULT_MAPPING):
+    if not os.path.exists(path) and not os.path.isabs(path):
+        path = os.path.join(MAPPINGS_DIR, path)
+    with open(path, encoding="utf-8") as f:
+        return compile_mapping(json.load(f))
+
+
+def as_mapping(chords):
+    # CompiledMapping, mapping file path, or an old-style chords dict
+    if isinstance(chords, CompiledMapping):
+        return chords
+    if isinstance(chords, str):
+        return load_mapping(chords)
+    return compile_mapping({"fingers": chords})
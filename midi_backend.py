@@ -0,0 +1,306 @@
+import argparse
+import logging
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+from instrumentation import RingHistogram
+from midi_out import NullOutput, _default_clock
+
+log = logging.getLogger(__name__)
+
+# --------------------------
+# MIDI backends
+# --------------------------
+# A backend is anything with the pygame.midi.Output-style
+#   write([[[status, data1, data2], timestamp], ...])
+# plus close() and a `clock` returning milliseconds for those timestamps.
+# MidiOutput batches into it; AsyncMidiDevice moves the actual sending off
+# the frame loop. open_backend() builds one from a short spec:
+#   0, "2", "pygame", "pygame:2"     pygame.midi output (default device if no id)
+#   "null"                           silent sink that only counts messages
+# A backend object (e.g. a RecordingBackend in a benchmark) is used as is.
+#   "udp://127.0.0.1:9000"           raw MIDI bytes, one datagram per batch
+#   "osc://127.0.0.1:9000"           one OSC bundle of /midi messages per batch
+
+
+class MidiUnavailable(RuntimeError):
+    pass
+
+
+class PygameBackend:
+    """
+    pygame.midi output. With latency > 0 (ms) PortMidi plays each event at
+    its timestamp + latency instead of right away, which the quantizer's
+    lookahead scheduler relies on.
+    """
+
+    def __init__(self, device_id=None, latency=0):
+        import pygame.midi
+
+        self._midi = pygame.midi
+        pygame.midi.init()
+        if device_id is None:
+            device_id = pygame.midi.get_default_output_id()
+        if device_id is None or device_id < 0 or device_id >= pygame.midi.get_count():
+            pygame.midi.quit()
+            raise MidiUnavailable(f"No MIDI output device {device_id}")
+        self.device_id = device_id
+        self.latency = latency
+        self.output = pygame.midi.Output(device_id, latency=latency)
+        self.clock = pygame.midi.time
+
+    def write(self, events):
+        self.output.write(events)
+
+    def close(self):
+        self.output.close()
+        self._midi.quit()
+
+
+class NullBackend:
+    """Silent sink that keeps nothing but counts, so it can run unattended for days."""
+
+    clock = staticmethod(_default_clock)
+
+    def __init__(self):
+        self.writes = 0
+        self.messages = 0
+
+    def write(self, events):
+        self.writes += 1
+        self.messages += len(events)
+
+    def close(self):
+        pass
+
+
+class RecordingBackend(NullOutput):
+    """
+    Loopback sink that keeps every batch and (arrival time, message) for every
+    event written. Memory grows with every message: benchmarks and checks only.
+    """
+
+    clock = staticmethod(_default_clock)
+
+    def __init__(self):
+        super().__init__()
+        self.received = []
+
+    def write(self, events):
+        super().write(events)
+        now = time.perf_counter()
+        self.received.extend((now, message) for message, _ in events)
+
+
+def _osc_string(value):
+    data = value.encode() + b"\0"
+    return data + b"\0" * (-len(data) % 4)
+
+
+class UdpBackend:
+    """
+    Sends each batch as one UDP datagram to a local synth or bridge: raw MIDI
+    bytes, or with osc=True an OSC bundle of "/midi" messages using the OSC
+    'm' (4-byte MIDI message) type.
+    """
+
+    clock = staticmethod(_default_clock)
+
+    def __init__(self, host="127.0.0.1", port=9000, osc=False, address="/midi"):
+        self.target = (host, port)
+        self.osc = osc
+        self._prefix = _osc_string(address) + _osc_string(",m")
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sent = 0
+
+    def _encode(self, events):
+        if not self.osc:
+            return b"".join(bytes(message) for message, _ in events)
+        bundle = [b"#bundle\0", struct.pack(">Q", 1)]  # Time tag 1: "immediately"
+        for message, _ in events:
+            status, data1, data2 = (list(message) + [0, 0])[:3]
+            element = self._prefix + bytes((0, status, data1, data2))
+            bundle.append(struct.pack(">i", len(element)) + element)
+        return b"".join(bundle)
+
+    def write(self, events):
+        self.sock.sendto(self._encode(events), self.target)
+        self.sent += 1
+
+    def close(self):
+        self.sock.close()
+
+
+def open_backend(spec=None, fallback=True, latency=0):
+    """
+    Builds a backend from a spec (see above). With fallback=True a missing or
+    broken pygame device logs a warning and returns a NullBackend, so the
+    app still runs without MIDI hardware. `latency` goes to PygameBackend.
+    """
+    if hasattr(spec, "write"):
+        return spec
+    spec = "pygame" if spec is None else str(spec)
+    if spec == "null":
+        return NullBackend()
+    for scheme in ("udp", "osc"):
+        if spec.startswith(scheme + "://"):
+            host, _, port = spec[len(scheme) + 3:].rpartition(":")
+            return UdpBackend(host or "127.0.0.1", int(port), osc=scheme == "osc")
+    device = spec.partition(":")[2] if spec.startswith("pygame") else spec
+    try:
+        return PygameBackend(int(device) if device else None, latency)
+    except Exception as e:
+        if not fallback:
+            raise
+        log.warning("MIDI output %s unavailable (%s); using a silent sink", spec, e)
+        return NullBackend()
+
+
+# --------------------------
+# Non-blocking sends
+# --------------------------
+class AsyncMidiDevice:
+    """
+    Wraps a backend so write() only appends to a queue; one sender thread
+    drains it in order. Exposes the queue depth (messages waiting) and the
+    enqueue-to-sent latency of every batch.
+    """
+
+    def __init__(self, backend, name="midi-sender"):
+        self.backend = backend
+        self.clock = getattr(backend, "clock", _default_clock)
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._depth = 0
+        self._closed = False
+        self.max_depth = 0
+        self.sent = 0
+        self.errors = 0
+        self.latency = RingHistogram(1024)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self):
+        return self._depth
+
+    def write(self, events):
+        with self._cond:
+            self._queue.append((time.perf_counter(), events))
+            self._depth += len(events)
+            self.max_depth = max(self.max_depth, self._depth)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                queued_at, events = self._queue.popleft()
+            try:
+                self.backend.write(events)
+            except Exception:
+                self.errors += 1
+                log.exception("MIDI send failed")
+            self.latency.add(time.perf_counter() - queued_at)
+            with self._cond:
+                self._depth -= len(events)
+                self.sent += len(events)
+                self._cond.notify_all()
+
+    def drain(self, timeout=1.0):
+        # Wait until everything queued so far has been sent
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._depth, timeout)
+
+    def close(self):
+        self.drain()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        self.backend.close()
+
+    def metrics(self):
+        summary = self.latency.summary()
+        return {"queue_depth": self._depth, "max_depth": self.max_depth, "sent": self.sent,
+                "errors": self.errors, "latency_p50_ms": summary["p50_ms"], "latency_p99_ms": summary["p99_ms"]}
+
+
+# --------------------------
+# Benchmark: frame-loop stall with a slow device
+# --------------------------
+class _SlowBackend(RecordingBackend):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def write(self, events):
+        time.sleep(self.delay)
+        super().write(events)
+
+
+def _benchmark(frames=120, fps=60.0, delay=0.004, notes=6):
+    from midi_out import MidiOutput
+
+    for mode in ("direct", "async"):
+        backend = _SlowBackend(delay)
+        device = backend if mode == "direct" else AsyncMidiDevice(backend)
+        midi = MidiOutput(device)
+        worst = total = 0.0
+        for i in range(frames):
+            for n in range(notes):
+                midi.note_on(0, 60 + (i + n) % 24)
+            start = time.perf_counter()
+            midi.flush()
+            elapsed = time.perf_counter() - start
+            total += elapsed
+            worst = max(worst, elapsed)
+            time.sleep(max(1.0 / fps - elapsed, 0.0))
+        result = {"mode": mode, "flush_mean_ms": total / frames * 1000, "flush_max_ms": worst * 1000}
+        if mode == "async":
+            device.drain()
+            result.update(device.metrics())
+            device.close()
+        print(result)
+
+
+def _udp_check(osc):
+    # Sends one batch to a local socket and decodes what arrived
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(1.0)
+    port = receiver.getsockname()[1]
+    device = AsyncMidiDevice(open_backend(f"{'osc' if osc else 'udp'}://127.0.0.1:{port}"))
+    device.write([[[0x90, 60, 100], 0], [[0xC1, 24], 0]])
+    data = receiver.recv(4096)
+    device.close()
+    receiver.close()
+    print("osc" if osc else "udp", len(data), "bytes:", data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MIDI backend checks")
+    parser.add_argument("--list", action="store_true", help="list pygame.midi output devices")
+    args = parser.parse_args()
+    if args.list:
+        import pygame.midi
+
+        pygame.midi.init()
+        for i in range(pygame.midi.get_count()):
+            interface, name, _, is_output, _ = pygame.midi.get_device_info(i)
+            if is_output:
+                print(i, interface.decode(), name.decode())
+        pygame.midi.quit()
+        return
+    _benchmark()
+    _udp_check(osc=False)
+    _udp_check(osc=True)
+
+
+if __name__ == "__main__":
+    main()
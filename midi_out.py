@@ -0,0 +1,144 @@
+import threading
+import time
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+PROGRAM_CHANGE = 0xC0
+
+# One channel per hand so each keeps its own program (channel 9 is drums in GM)
+HAND_CHANNELS = {"left": 0, "right": 1}
+
+# pygame.midi.Output.write accepts at most 1024 events per call
+MAX_EVENTS_PER_WRITE = 1024
+
+
+def _default_clock():
+    return int(time.perf_counter() * 1000)
+
+
+# --------------------------
+# Batched MIDI output
+# --------------------------
+class MidiOutput:
+    """
+    Queues note and program events and sends everything queued since the last
+    flush() in one Output.write call, with pygame.midi timestamps.
+
+    Program changes are only queued when the channel's program actually
+    changes. The device is anything with a pygame.midi.Output-style
+    write([[[status, data1, data2], timestamp], ...]) method. If event_log
+    (a performance_log.PerformanceLog) is set, every message is also logged.
+    """
+
+    def __init__(self, device, clock=_default_clock):
+        self.device = device
+        self.clock = clock
+        self.programs = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.messages = 0
+        self.event_log = None
+
+    def _queue(self, message):
+        # Caller holds the lock
+        self._pending.append([message, self.clock()])
+        if self.event_log is not None:
+            self.event_log.append(*message)
+
+    def set_program(self, channel, program):
+        with self._lock:
+            if self.programs.get(channel) == program:
+                return
+            self.programs[channel] = program
+            self._queue([PROGRAM_CHANGE | channel, program])
+
+    def note_on(self, channel, note, velocity=127):
+        with self._lock:
+            self._queue([NOTE_ON | channel, note, velocity])
+
+    def note_off(self, channel, note, velocity=127, flush=False):
+        with self._lock:
+            self._queue([NOTE_OFF | channel, note, velocity])
+        if flush:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return 0
+            events, self._pending = self._pending, []
+            for start in range(0, len(events), MAX_EVENTS_PER_WRITE):
+                self.device.write(events[start:start + MAX_EVENTS_PER_WRITE])
+                self.writes += 1
+            self.messages += len(events)
+            return len(events)
+
+    def all_notes_off(self):
+        # Control change 123 on every channel we've used
+        with self._lock:
+            for channel in set(self.programs) | set(HAND_CHANNELS.values()):
+                self._queue([0xB0 | channel, 123, 0])
+        self.flush()
+
+
+class NullOutput:
+    """Loopback stand-in for pygame.midi.Output: records every write() call."""
+
+    def __init__(self):
+        self.batches = []
+
+    def write(self, events):
+        self.batches.append(list(events))
+
+    @property
+    def writes(self):
+        return len(self.batches)
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+    def close(self):
+        pass
+
+
+# --------------------------
+# Per-frame cost: batched output vs. one call per message
+# --------------------------
+class _CountingOutput(NullOutput):
+    # What play_chord used to do: set_instrument + note_on, one write each
+    def set_instrument(self, program, channel=0):
+        self.write([[[PROGRAM_CHANGE | channel, program], 0]])
+
+    def note_on(self, note, velocity, channel=0):
+        self.write([[[NOTE_ON | channel, note, velocity], 0]])
+
+
+def _benchmark(frames=1000):
+    chords = {"left": [60, 64], "right": [60, 64, 67]}
+    programs = {"left": 0, "right": 24}
+
+    old = _CountingOutput()
+    for _ in range(frames):
+        for hand_type, notes in chords.items():
+            old.set_instrument(programs[hand_type])
+            for note in notes:
+                old.note_on(note, 127)
+
+    device = NullOutput()
+    midi = MidiOutput(device)
+    for _ in range(frames):
+        for hand_type, notes in chords.items():
+            channel = HAND_CHANNELS[hand_type]
+            midi.set_program(channel, programs[hand_type])
+            for note in notes:
+                midi.note_on(channel, note)
+        midi.flush()
+
+    print(f"per-call: {len(old.events) / frames:.1f} messages, {old.writes / frames:.1f} writes per frame")
+    print(f"batched:  {midi.messages / frames:.1f} messages, {midi.writes / frames:.1f} writes per frame")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,319 @@
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from finger_state import hand_masks
+from gestures import ChordTracker, HandLossTimer, hand_side
+from mapping import DEFAULT_MAPPING, HANDS, load_mapping
+from settings import CAMERA_TIMEOUT, DEFAULT_INSTRUMENT_LEFT, DEFAULT_INSTRUMENT_RIGHT, HAND_LOST_TIME, SUSTAIN_TIME
+from voices import VoiceAllocator
+
+log = logging.getLogger(__name__)
+
+# --------------------------
+# Shared finger-state board
+# --------------------------
+# One slot per performer in a shared-memory array. Workers publish only the
+# finger bitmask of each hand (a few bytes per frame, never pixels). Each
+# slot is guarded by a sequence number: odd while being written, even when
+# stable, so the mixer can read without locks and retry torn reads.
+SLOT_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("time", "<f8"),
+    ("frames", "<u8"),
+    ("present", "u1", (2,)),   # [left, right]
+    ("mask", "u1", (2,)),
+])
+
+
+class StateBoard:
+    def __init__(self, performers, name=None):
+        create = name is None
+        size = SLOT_DTYPE.itemsize * performers
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.slots = np.ndarray((performers,), dtype=SLOT_DTYPE, buffer=self.shm.buf)
+        if create:
+            self.slots[:] = 0
+        self._owner = create
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, index, present, masks, timestamp):
+        slot = self.slots[index:index + 1]
+        slot["seq"] += 1          # odd: write in progress
+        slot["present"] = present
+        slot["mask"] = masks
+        slot["time"] = timestamp
+        slot["frames"] += 1
+        slot["seq"] += 1          # even: stable
+
+    def read(self, index):
+        # Returns (seq, present, masks) or None if the slot is mid-write
+        slot = self.slots[index]
+        seq = int(slot["seq"])
+        if seq & 1:
+            return None
+        present = slot["present"].tolist()
+        masks = slot["mask"].tolist()
+        if int(self.slots[index]["seq"]) != seq:
+            return None
+        return seq, present, masks
+
+    def close(self):
+        del self.slots
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _publish_hands(board, index, hands):
+    present = [0, 0]
+    masks = [0, 0]
+    if hands:
+        for hand, mask in zip(hands, hand_masks(hands)):
+            h = HANDS.index(hand_side(hand))
+            present[h] = 1
+            masks[h] = mask
+    board.publish(index, present, masks, time.perf_counter())
+
+
+# --------------------------
+# Worker processes
+# --------------------------
+def camera_worker(index, board_name, performers, camera_id, stop):
+    from cvzone.HandTrackingModule import HandDetector
+
+    from capture import open_capture
+    from roi import find_hands
+
+    board = StateBoard(performers, board_name)
+    cap = open_capture(camera_id)
+    detector = HandDetector(detectionCon=0.8, maxHands=2)
+    try:
+        while not stop.is_set() and cap.isOpened():
+            success, img = cap.read()  # Waits for a fresh frame; failures back off in the grab thread
+            if not success:
+                continue
+            _publish_hands(board, index, find_hands(detector, img))
+    finally:
+        cap.release()
+        board.shm.close()
+
+
+def synthetic_worker(index, board_name, performers, work_ms, stop):
+    # Stands in for capture + detection: burns work_ms of CPU per frame, then
+    # classifies random landmarks exactly like a camera worker would
+    board = StateBoard(performers, board_name)
+    rng = np.random.default_rng(index)
+    try:
+        while not stop.is_set():
+            deadline = time.perf_counter() + work_ms / 1000.0
+            while time.perf_counter() < deadline:
+                pass
+            lm = rng.integers(0, 480, size=(2, 21, 3)).tolist()
+            hands = [{"lmList": lm[0], "type": "Left"}, {"lmList": lm[1], "type": "Right"}]
+            _publish_hands(board, index, hands)
+    finally:
+        board.shm.close()
+
+
+# --------------------------
+# Central mixer
+# --------------------------
+# Two channels per performer, skipping the GM drum channel 9
+PERFORMER_CHANNELS = [c for c in range(16) if c != 9]
+MAX_PERFORMERS = len(PERFORMER_CHANNELS) // 2
+
+
+def performer_channels(index):
+    if not 0 <= index < MAX_PERFORMERS:
+        # Wrapping around would put this performer's notes and programs on someone else's channels
+        raise ValueError(f"At most {MAX_PERFORMERS} performers fit on one MIDI port (got performer {index + 1})")
+    return {"left": PERFORMER_CHANNELS[2 * index], "right": PERFORMER_CHANNELS[2 * index + 1]}
+
+
+class Mixer:
+    """
+    Reads every performer's slot and drives one ChordTracker per performer into
+    one MidiOutput. Notes go through a VoiceAllocator (`voices`, or one of the
+    mixer's own), so chords that share a note don't cut each other off.
+
+    As in the live loop, a hand missing for lost_time releases its chords, and
+    a performer whose slot hasn't changed for camera_timeout (camera stalled or
+    worker died) has every note on its channels released. Both are timed on
+    `clock`.
+    """
+
+    def __init__(self, board, performers, midi, mapping=DEFAULT_MAPPING,
+                 programs=(DEFAULT_INSTRUMENT_LEFT, DEFAULT_INSTRUMENT_RIGHT), sustain=None, voices=None,
+                 lost_time=HAND_LOST_TIME, camera_timeout=CAMERA_TIMEOUT, clock=time.perf_counter):
+        if performers > MAX_PERFORMERS:
+            raise ValueError(f"At most {MAX_PERFORMERS} performers fit on one MIDI port, got {performers}")
+        self.board = board
+        self.midi = midi
+        self._own_voices = voices is None
+        self.voices = VoiceAllocator(midi) if voices is None else voices
+        self.sustain = sustain or 0.0
+        self.camera_timeout = camera_timeout
+        self.clock = clock
+        self.last_seq = [0] * performers
+        self.last_change = [clock()] * performers
+        self.stalled = [False] * performers
+        self.hand_loss = [HandLossTimer(lost_time) for _ in range(performers)]
+        self.updates = 0
+        self.stalls = 0
+        compiled = load_mapping(mapping)
+        self.channels = []
+        self.trackers = []
+        for p in range(performers):
+            channels = performer_channels(p)
+            for hand, program in zip(HANDS, programs):
+                midi.set_program(channels[hand], program)
+            self.channels.append(channels)
+            self.trackers.append(ChordTracker(compiled, self._player(channels, True), self._player(channels, False)))
+        midi.flush()
+
+    def _player(self, channels, on):
+        def send(hand_type, notes):
+            channel = channels[hand_type]
+            for note in notes:
+                if on:
+                    self.voices.press(channel, note)
+                else:
+                    self.voices.release(channel, note, self.sustain)
+        return send
+
+    def poll(self):
+        now = self.clock()
+        for p, tracker in enumerate(self.trackers):
+            snapshot = self.board.read(p)
+            if snapshot is None or snapshot[0] == self.last_seq[p]:
+                if not self.stalled[p] and now - self.last_change[p] > self.camera_timeout:
+                    self._stall(p)
+                continue
+            seq, present, masks = snapshot
+            self.last_seq[p] = seq
+            self.last_change[p] = now
+            self.stalled[p] = False
+            self.updates += 1
+            tracker.update(self.hand_loss[p].apply({hand: masks[h] for h, hand in enumerate(HANDS) if present[h]}, now))
+        self.midi.flush()
+
+    def _stall(self, p):
+        # No new frame from this performer: silence its channels like the voice
+        # watchdog does for the live loop, and forget what its tracker held, so
+        # fingers still up replay their chords once frames come back
+        self.stalled[p] = True
+        if self.last_seq[p]:
+            self.stalls += 1
+            log.warning("Performer %d sent no frames for %.1fs: releasing its notes", p + 1, self.camera_timeout)
+        self.trackers[p].reset()
+        self.voices.release_all(channels=self.channels[p].values())
+
+    def run(self, stop, interval=0.001, duration=None):
+        end = time.perf_counter() + duration if duration else None
+        while not stop.is_set() and (end is None or time.perf_counter() < end):
+            self.poll()
+            time.sleep(interval)
+
+    def close(self):
+        # Silences the mixer's own voices; shared ones belong to the runtime
+        if self._own_voices:
+            self.voices.close()
+
+
+def start_workers(target, performers, board, stop, args_for):
+    ctx = mp.get_context("spawn")
+    workers = []
+    for p in range(performers):
+        proc = ctx.Process(target=target, args=(p, board.name, performers) + args_for(p) + (stop,), daemon=True)
+        proc.start()
+        workers.append(proc)
+    return workers
+
+
+# --------------------------
+# Scaling benchmark
+# --------------------------
+def benchmark(max_performers, work_ms=15.0, duration=3.0):
+    from midi_out import MidiOutput, NullOutput
+
+    results = []
+    ctx = mp.get_context("spawn")
+    for n in range(1, max_performers + 1):
+        board = StateBoard(n)
+        stop = ctx.Event()
+        workers = start_workers(synthetic_worker, n, board, stop, lambda p: (work_ms,))
+        time.sleep(1.0)  # Let workers start up before measuring
+        start_frames = int(board.slots["frames"].sum())
+        device = NullOutput()
+        mixer = Mixer(board, n, MidiOutput(device))
+        start = time.perf_counter()
+        mixer.run(stop, duration=duration)
+        elapsed = time.perf_counter() - start
+        frames = int(board.slots["frames"].sum()) - start_frames
+        mixer.close()
+        stop.set()
+        for proc in workers:
+            proc.join(timeout=2.0)
+        results.append({
+            "performers": n,
+            "frames_per_sec": frames / elapsed,
+            "per_performer_fps": frames / elapsed / n,
+            "mixer_updates_per_sec": mixer.updates / elapsed,
+            "midi_messages": len(device.events),
+        })
+        board.close()
+        print(json.dumps(results[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Several performers, one camera each, one shared synth")
+    parser.add_argument("--cameras", type=int, nargs="+", default=[0], help="camera ids, one per performer")
+    parser.add_argument("--mapping", default=DEFAULT_MAPPING)
+    parser.add_argument("--bench", type=int, metavar="N", help="scaling benchmark with 1..N synthetic performers")
+    parser.add_argument("--work-ms", type=float, default=15.0, help="simulated detection cost per frame (bench)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if len(args.cameras) > MAX_PERFORMERS or (args.bench or 0) > MAX_PERFORMERS:
+        parser.error(f"at most {MAX_PERFORMERS} performers (two MIDI channels each, channel 10 is drums)")
+
+    if args.bench:
+        log.info("%d CPUs available", os.cpu_count() or 1)
+        benchmark(args.bench, work_ms=args.work_ms)
+        return
+
+    from runtime import get_runtime
+
+    runtime = get_runtime()
+    runtime.load_detector = False  # Only the camera workers detect, each with its own model
+    runtime.wait()
+    performers = len(args.cameras)
+    board = StateBoard(performers)
+    stop = mp.get_context("spawn").Event()
+    workers = start_workers(camera_worker, performers, board, stop, lambda p: (args.cameras[p],))
+    mixer = Mixer(board, performers, runtime.midi, mapping=args.mapping, sustain=SUSTAIN_TIME,
+                  voices=runtime.voices)
+    try:
+        mixer.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for proc in workers:
+            proc.join(timeout=2.0)
+        board.close()
+        runtime.close()
+
+
+if __name__ == "__main__":
+    main()
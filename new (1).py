@@ -1,16 +1,25 @@
 import cv2
+import logging
 import threading
-import pygame.midi
-import time
 import tkinter as tk
 from tkinter import ttk
 from cvzone.HandTrackingModule import HandDetector  # type: ignore
+from capture import open_capture
+from finger_state import hand_masks
+from gestures import ChordTracker, hand_side
+from mapping import load_mapping
+from midi_backend import AsyncMidiDevice, open_backend
+from midi_out import HAND_CHANNELS, MidiOutput
+from voices import VoiceAllocator
+
+log = logging.getLogger(__name__)
 
 # --------------------------
-# Initialize Pygame MIDI
+# Initialize MIDI (device 0; a silent sink if it is missing). Sends run on
+# their own thread so a slow device never holds up the camera loop.
 # --------------------------
-pygame.midi.init()
-player = pygame.midi.Output(0)
+player = AsyncMidiDevice(open_backend(0))
+midi = MidiOutput(player, clock=player.clock)
 
 # --------------------------
 # General MIDI Instrument Options
@@ -51,48 +60,35 @@ instrument_options = {
 }
 
 # --------------------------
-# Fixed Chord Mapping for Fingers (D Major Scale)
+# Fixed Chord Mapping for Fingers (D Major Scale), compiled from mappings/d_major.json
 # --------------------------
-chords = {
-    "left": {
-        "thumb": {"notes": [62, 66, 69]},   # D Major (D, F#, A)
-        "index": {"notes": [64, 67, 71]},   # E Minor (E, G, B)
-        "middle": {"notes": [66, 69, 73]},  # F# Minor (F#, A, C#)
-        "ring": {"notes": [67, 71, 74]},    # G Major (G, B, D)
-        "pinky": {"notes": [69, 73, 76]}     # A Major (A, C#, E)
-    },
-    "right": {
-        "thumb": {"notes": [62, 66, 69]},
-        "index": {"notes": [64, 67, 71]},
-        "middle": {"notes": [66, 69, 73]},
-        "ring": {"notes": [67, 71, 74]},
-        "pinky": {"notes": [69, 73, 76]}
-    }
-}
+chords = load_mapping("d_major.json")
 
 # Sustain time (seconds) after finger is lowered
 SUSTAIN_TIME = 2.0
 
-# Track previous finger states for state changes
-prev_states = {hand: {finger: 0 for finger in chords[hand]} for hand in chords}
-
 
 # --------------------------
 # Function to Play and Stop Chords
 # --------------------------
-def play_chord(instrument, chord_notes):
-    # Set instrument and play each note
-    player.set_instrument(instrument)
+# Reference-counted voices: chords that share notes (D and F#m share F# and A) don't cut
+# each other off, and one scheduler thread owns every pending note-off
+voices = VoiceAllocator(midi)
+
+
+def play_chord(instrument, chord_notes, channel=0):
+    # Set instrument (only if it changed) and queue each note; a release still
+    # pending for it is cancelled. midi.flush() sends the frame's batch.
+    midi.set_program(channel, instrument)
     for note in chord_notes:
-        player.note_on(note, 127)
-    print(f"Playing chord {chord_notes} on instrument {instrument}")
+        voices.press(channel, note, 127)
+    log.debug("Playing chord %s on instrument %s", chord_notes, instrument)
 
 
-def stop_chord_after_delay(chord_notes):
-    time.sleep(SUSTAIN_TIME)
+def stop_chord_after_delay(chord_notes, channel=0):
     for note in chord_notes:
-        player.note_off(note, 127)
-    print(f"Stopped chord {chord_notes}")
+        voices.release(channel, note, SUSTAIN_TIME)
+    log.debug("Stopping chord %s in %ss", chord_notes, SUSTAIN_TIME)
 
 
 # --------------------------
@@ -100,56 +96,45 @@ def stop_chord_after_delay(chord_notes):
 # --------------------------
 def start_hand_tracking(left_instrument, right_instrument):
     instruments = {"left": left_instrument, "right": right_instrument}
-    cap = cv2.VideoCapture(0)
+    cap = open_capture(0)  # Newest frame from a grab thread; waits instead of spinning on failure
     detector = HandDetector(detectionCon=0.8)
 
-    global prev_states
-    prev_states = {hand: {finger: 0 for finger in chords[hand]} for hand in chords}
+    # Tracks finger state changes and plays/releases the mapped chords
+    tracker = ChordTracker(
+        chords,
+        on_play=lambda hand_type, notes: play_chord(instruments[hand_type], notes, HAND_CHANNELS[hand_type]),
+        on_release=lambda hand_type, notes: stop_chord_after_delay(notes, HAND_CHANNELS[hand_type]),
+    )
 
     while True:
         success, img = cap.read()
         if not success:
-            print("❌ Camera not capturing frames")
+            log.debug("❌ Camera not capturing frames")
             continue
 
         # Detect hands and draw landmarks
         hands, img = detector.findHands(img, draw=True)
-        # Debug: print whether a hand was detected
+        # Debug: log whether a hand was detected (free unless DEBUG is enabled)
         if hands:
-            print("Hand(s) detected.")
-            for hand in hands:
-                hand_type = "left" if hand["type"] == "Left" else "right"
-                fingers_state = detector.fingersUp(hand)
-                finger_names = ["thumb", "index", "middle", "ring", "pinky"]
-
-                for i, finger in enumerate(finger_names):
-                    if finger in chords[hand_type]:
-                        chord_notes = chords[hand_type][finger]["notes"]
-                        instrument = instruments[hand_type]
-
-                        # If finger is raised and was previously down, play chord
-                        if fingers_state[i] == 1 and prev_states[hand_type][finger] == 0:
-                            play_chord(instrument, chord_notes)
-                        # If finger is lowered and was previously raised, stop chord after sustain
-                        elif fingers_state[i] == 0 and prev_states[hand_type][finger] == 1:
-                            threading.Thread(target=stop_chord_after_delay, args=(chord_notes,), daemon=True).start()
-
-                        prev_states[hand_type][finger] = fingers_state[i]
+            log.debug("Hand(s) detected.")
+            masks = hand_masks(hands)
+            tracker.update({hand_side(hand): mask for hand, mask in zip(hands, masks)})
         else:
-            # If no hand is detected, stop all chords
-            print("No hand detected.")
-            for hand in chords:
-                for finger in chords[hand]:
-                    threading.Thread(target=stop_chord_after_delay, args=(chords[hand][finger]["notes"],), daemon=True).start()
-            prev_states = {hand: {finger: 0 for finger in chords[hand]} for hand in chords}
+            # If no hand is detected, release every chord that was still held.
+            # Lowered fingers already have their note-off scheduled, and
+            # rescheduling them on every empty frame would keep pushing it back.
+            log.debug("No hand detected.")
+            tracker.release_all()
 
+        midi.flush()  # One write for everything this frame triggered
         cv2.imshow("Hand Tracking MIDI Chords", img)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    voices.panic()
     cap.release()
     cv2.destroyAllWindows()
-    pygame.midi.quit()
+    player.drain()  # The device stays open so tracking can be started again
 
 
 # --------------------------
@@ -206,3 +191,5 @@ start_button.grid(row=2, column=0, columnspan=2, pady=10)
 
 # Run the Tkinter event loop
 root.mainloop()
+voices.close()
+player.close()
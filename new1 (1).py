@@ -1,66 +1,44 @@
 import cv2
+import logging
 import threading
-import pygame.midi
-import time
 import tkinter as tk
 from tkinter import ttk
 from cvzone.HandTrackingModule import HandDetector
+from capture import open_capture
+from finger_state import hand_masks
+from gestures import hand_side
+from midi_backend import AsyncMidiDevice, open_backend
+from midi_out import HAND_CHANNELS, MidiOutput
+from sequencer import SongSequencer, load_songs
+from voices import VoiceAllocator
 
-# Initialize Pygame MIDI
-pygame.midi.init()
-player = pygame.midi.Output(0)
-
-# Chord sets for songs
-song_chords = {
-    "Happy Birthday": [
-        ("left", "thumb"),
-        ("left", "index"),
-        ("right", "thumb"),
-        ("right", "index"),
-        ("left", "middle"),
-        ("right", "middle")
-    ],
-    "Twinkle Twinkle": [
-        ("left", "thumb"),
-        ("left", "ring"),
-        ("right", "index"),
-        ("right", "pinky"),
-    ]
-}
-
-# Chords mapping to MIDI notes
-chords = {
-    "left": {
-        "thumb": [60, 64, 67],
-        "index": [62, 65, 69],
-        "middle": [64, 67, 71],
-        "ring": [65, 69, 72],
-        "pinky": [67, 71, 74]
-    },
-    "right": {
-        "thumb": [60, 64, 67],
-        "index": [62, 65, 69],
-        "middle": [64, 67, 71],
-        "ring": [65, 69, 72],
-        "pinky": [67, 71, 74]
-    }
-}
-
-# Function to play chords
-def play_chord(hand, finger):
-    if hand in chords and finger in chords[hand]:
-        for note in chords[hand][finger]:
-            player.note_on(note, 127)
-        time.sleep(1)
-        for note in chords[hand][finger]:
-            player.note_off(note, 127)
+log = logging.getLogger(__name__)
+
+# Initialize MIDI (device 0; a silent sink if it is missing), sent from its own thread
+player = AsyncMidiDevice(open_backend(0))
+midi = MidiOutput(player, clock=player.clock)
+voices = VoiceAllocator(midi)  # Shared notes between hands don't cut each other off
+
+# Songs, loaded from songs/*.json (each names its chord mapping in mappings/)
+songs = load_songs()
+
+# Function to play chords: starts now, the note-offs are scheduled, nothing sleeps
+def play_chord(hand, notes):
+    channel = HAND_CHANNELS[hand]
+    for note in notes:
+        voices.press(channel, note, 127)
+    log.debug("Playing %s chord %s", hand, notes)
+
+def release_chord(hand, notes, delay):
+    channel = HAND_CHANNELS[hand]
+    for note in notes:
+        voices.release(channel, note, delay)
 
 # Hand Tracking Function
-def start_hand_tracking(selected_song):
-    cap = cv2.VideoCapture(0)
+def start_hand_tracking(selected_song, tempo=None, autoplay=False):
+    cap = open_capture(0)  # Newest frame from a grab thread; waits instead of spinning on failure
     detector = HandDetector(detectionCon=0.8)
-    sequence = song_chords[selected_song]
-    step = 0
+    sequencer = SongSequencer(songs[selected_song], play_chord, release_chord, tempo=tempo, autoplay=autoplay)
 
     while True:
         success, img = cap.read()
@@ -68,27 +46,33 @@ def start_hand_tracking(selected_song):
             continue
         hands, img = detector.findHands(img, draw=True)
 
-        if hands and step < len(sequence):
-            hand, finger = sequence[step]
-            play_chord(hand, finger)
-            step += 1
-            time.sleep(1)
-        
-        cv2.putText(img, f"Raise: {sequence[step-1][1]} on {sequence[step-1][0]}", (50, 50),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        # Live finger states go to the sequencer every frame; it only reacts
+        # when the expected finger goes up
+        sequencer.update({hand_side(hand): mask for hand, mask in zip(hands, hand_masks(hands))})
+        midi.flush()
+
+        cv2.putText(img, sequencer.prompt(), (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
 
         cv2.imshow("Hand Tracking MIDI", img)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    voices.panic()
     cap.release()
     cv2.destroyAllWindows()
-    pygame.midi.quit()
+    player.drain()  # The device stays open so another song can be started
 
 # Tkinter UI
 def start_tracking():
     selected_song = song_var.get()
-    threading.Thread(target=start_hand_tracking, args=(selected_song,), daemon=True).start()
+    try:
+        tempo = float(tempo_var.get())
+    except ValueError:
+        tempo = None
+    threading.Thread(target=start_hand_tracking, args=(selected_song, tempo, demo_var.get()), daemon=True).start()
+
+def song_selected(event=None):
+    tempo_var.set(f"{songs[song_var.get()].tempo:g}")
 
 root = tk.Tk()
 root.title("MIDI Hand Tracking - Song Mode")
@@ -98,11 +82,22 @@ frame.grid(row=0, column=0, sticky="W")
 ttk.Label(frame, text="Select a Song:").grid(row=0, column=0, sticky="W")
 song_var = tk.StringVar()
 song_dropdown = ttk.Combobox(frame, textvariable=song_var, state="readonly")
-song_dropdown['values'] = list(song_chords.keys())
+song_dropdown['values'] = list(songs.keys())
 song_dropdown.current(0)
 song_dropdown.grid(row=0, column=1, pady=5, sticky="W")
+song_dropdown.bind("<<ComboboxSelected>>", song_selected)
+
+ttk.Label(frame, text="Tempo (BPM):").grid(row=1, column=0, sticky="W")
+tempo_var = tk.StringVar()
+ttk.Spinbox(frame, from_=30, to=240, increment=5, textvariable=tempo_var, width=6).grid(row=1, column=1, pady=5, sticky="W")
+song_selected()
+
+demo_var = tk.BooleanVar(value=False)
+ttk.Checkbutton(frame, text="Demo (play the song by itself)", variable=demo_var).grid(row=2, column=0, columnspan=2, sticky="W")
 
 start_button = ttk.Button(frame, text="Start Playing", command=start_tracking)
-start_button.grid(row=1, column=0, columnspan=2, pady=10)
+start_button.grid(row=3, column=0, columnspan=2, pady=10)
 
 root.mainloop()
+voices.close()
+player.close()
@@ -0,0 +1,217 @@
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+import wave
+
+import numpy as np
+
+from debounce import FingerDebouncer
+from landmark_trace import TraceRecorder, TraceReplay, load_trace, replay_events
+from mapping import DEFAULT_MAPPING
+from midi_out import HAND_CHANNELS, NOTE_OFF, NOTE_ON, MidiOutput, NullOutput
+from performance_log import EVENT_DTYPE, export_midi
+from scheduler import VirtualScheduler
+from settings import DEFAULT_INSTRUMENT_LEFT, DEFAULT_INSTRUMENT_RIGHT, SUSTAIN_TIME
+from voices import VoiceAllocator
+
+# --------------------------
+# Offline render: trace or video -> MIDI (+ WAV)
+# --------------------------
+# Runs the same finger/chord decisions as main.start_hand_tracking (finger
+# debouncer included, unless debounce=False), but on a virtual clock taken
+# from the recorded timestamps, so nothing waits on a camera, a MIDI device
+# or wall time. Notes go through the same reference-counted VoiceAllocator:
+# a released chord rings for SUSTAIN_TIME unless the note is played again
+# or still held by another chord.
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+SAMPLE_RATE = 22050
+
+
+def video_to_trace(path, detection_con=0.8, max_hands=2):
+    # Detect hands in every frame of a video file; timestamps come from its fps
+    import cv2
+    from cvzone.HandTrackingModule import HandDetector
+
+    from roi import find_hands
+
+    detector = HandDetector(detectionCon=detection_con, maxHands=max_hands)
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    recorder = TraceRecorder(None)
+    frame = 0
+    while True:
+        success, img = cap.read()
+        if not success:
+            break
+        recorder.add(find_hands(detector, img), frame / fps)
+        frame += 1
+    cap.release()
+    return recorder.records
+
+
+def decisions_to_midi(events, frame_times, programs=None, sustain=None, limit=32):
+    """
+    Turns replay_events() output into a timed EVENT_DTYPE array, playing each
+    chord like main.play_chord / stop_chord_after_delay would: through a
+    VoiceAllocator (so chords sharing a note don't cut each other off), on a
+    VirtualScheduler driven by the frame times. Like the live loop on exit,
+    whatever still sounds after the last frame is silenced there.
+    """
+    programs = programs or {"left": DEFAULT_INSTRUMENT_LEFT, "right": DEFAULT_INSTRUMENT_RIGHT}
+    sustain = SUSTAIN_TIME if sustain is None else sustain
+    device = NullOutput()
+    midi = MidiOutput(device, clock=lambda: clock.now)   # Timestamps in trace seconds
+    voices = VoiceAllocator(midi, limit=limit, scheduler=VirtualScheduler)
+    clock = voices.scheduler
+
+    last = len(frame_times) - 1
+    for frame, kind, hand_type, notes in events:
+        clock.advance(float(frame_times[frame]))   # Sustains that ran out by this frame
+        channel = HAND_CHANNELS[hand_type]
+        if kind == "on":
+            midi.set_program(channel, programs[hand_type])
+            for note in notes:
+                voices.press(channel, note, 127)
+        else:
+            for note in notes:
+                voices.release(channel, note, sustain)
+        midi.flush()
+    if last >= 0:
+        clock.advance(float(frame_times[last]))
+    voices.close()
+
+    return np.array([(t, *(list(message) + [0, 0])[:3]) for message, t in device.events], dtype=EVENT_DTYPE)
+
+
+# --------------------------
+# Built-in synth
+# --------------------------
+def render_audio(midi_events, path, sample_rate=SAMPLE_RATE, attack=0.005, release=0.08, decay=1.5):
+    """Mono 16-bit WAV: one decaying sine (plus an octave partial) per note."""
+    if not len(midi_events):
+        duration = 0.0
+    else:
+        duration = float(midi_events["time"].max()) + release
+    audio = np.zeros(int(duration * sample_rate) + 1, dtype=np.float32)
+
+    started = {}
+    for t, status, note, velocity in zip(midi_events["time"].tolist(), midi_events["status"].tolist(),
+                                         midi_events["data1"].tolist(), midi_events["data2"].tolist()):
+        key = (status & 0x0F, note)
+        kind = status & 0xF0
+        if kind == NOTE_ON:
+            if key in started:
+                _add_note(audio, sample_rate, note, *started[key], t, attack, release, decay)
+            started[key] = (t, velocity)
+        elif kind == NOTE_OFF and key in started:
+            _add_note(audio, sample_rate, note, *started.pop(key), t, attack, release, decay)
+
+    peak = float(np.abs(audio).max()) if len(audio) else 0.0
+    if peak > 1.0:
+        audio /= peak
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((audio * 32767).astype("<i2").tobytes())
+    return duration
+
+
+def _add_note(audio, sample_rate, note, start, velocity, end, attack, release, decay):
+    first = int(start * sample_rate)
+    length = min(int((end - start + release) * sample_rate), len(audio) - first)
+    if length <= 0:
+        return
+    t = np.arange(length, dtype=np.float32) / sample_rate
+    freq = 440.0 * 2.0 ** ((note - 69) / 12.0)
+    wave_ = np.sin(2 * np.pi * freq * t) + 0.3 * np.sin(4 * np.pi * freq * t)
+    env = np.minimum(t / attack, 1.0) * np.exp(-t / decay)
+    held = end - start
+    env *= np.clip(1.0 - (t - held) / release, 0.0, 1.0)
+    audio[first:first + length] += 0.15 * (velocity / 127.0) * env * wave_
+
+
+# --------------------------
+# One file / a directory of files
+# --------------------------
+def render(path, out_dir=None, wav=False, mapping=DEFAULT_MAPPING, debounce=True):
+    """Renders one trace (.npy) or video file; returns a summary dict."""
+    start = time.perf_counter()
+    base = os.path.splitext(os.path.basename(path))[0]
+    out_dir = out_dir or os.path.dirname(path) or "."
+    if path.lower().endswith(VIDEO_EXTENSIONS):
+        trace = video_to_trace(path)
+    else:
+        trace = load_trace(path, mmap=False)
+
+    replay = TraceReplay(trace)
+    first_rows = [0] + replay.frame_bounds.tolist()
+    frame_times = trace["time"][first_rows] if len(trace) else np.zeros(0)
+    decisions, _ = replay_events(trace, chords=mapping, debouncer=FingerDebouncer() if debounce else None)
+    midi_events = decisions_to_midi(decisions, frame_times)
+
+    midi_path = os.path.join(out_dir, base + ".mid")
+    export_midi(midi_events, midi_path)
+    wav_path = None
+    if wav:
+        wav_path = os.path.join(out_dir, base + ".wav")
+        render_audio(midi_events, wav_path)
+
+    elapsed = time.perf_counter() - start
+    duration = float(trace["time"][-1]) if len(trace) else 0.0
+    return {
+        "input": path,
+        "midi": midi_path,
+        "wav": wav_path,
+        "frames": len(replay),
+        "events": len(midi_events),
+        "duration_s": duration,
+        "elapsed_s": elapsed,
+        "realtime_factor": duration / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+def _render_job(job):
+    path, options = job
+    return render(path, **options)
+
+
+def render_directory(directory, jobs=None, **options):
+    inputs = sorted(p for p in glob.glob(os.path.join(directory, "*"))
+                    if p.endswith(".npy") or p.lower().endswith(VIDEO_EXTENSIONS))
+    with mp.get_context("spawn").Pool(jobs) as pool:
+        return pool.map(_render_job, [(p, options) for p in inputs])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render landmark traces or videos to MIDI/WAV without a camera")
+    parser.add_argument("input", help="trace .npy, video file, or a directory of them")
+    parser.add_argument("--out-dir", help="where to write .mid/.wav (default: next to the input)")
+    parser.add_argument("--wav", action="store_true", help="also render audio with the built-in synth")
+    parser.add_argument("--mapping", default=DEFAULT_MAPPING, help="chord mapping file")
+    parser.add_argument("--raw-fingers", action="store_true", help="skip the finger debouncer the live loop uses")
+    parser.add_argument("--jobs", type=int, help="worker processes for a directory (default: CPU count)")
+    args = parser.parse_args()
+
+    options = {"out_dir": args.out_dir, "wav": args.wav, "mapping": args.mapping, "debounce": not args.raw_fingers}
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    start = time.perf_counter()
+    if os.path.isdir(args.input):
+        results = render_directory(args.input, jobs=args.jobs, **options)
+    else:
+        results = [render(args.input, **options)]
+    elapsed = time.perf_counter() - start
+    for result in results:
+        print(json.dumps(result))
+    total = sum(r["duration_s"] for r in results)
+    print(f"{len(results)} file(s), {total:.1f}s of performance in {elapsed:.2f}s "
+          f"({total / elapsed if elapsed else float('inf'):.1f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
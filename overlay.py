@@ -0,0 +1,289 @@
+import argparse
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from instrumentation import RingHistogram
+from mapping import HANDS
+from roi import HAND_CONNECTIONS
+
+# --------------------------
+# Overlay compositor
+# --------------------------
+# The preview used to be annotated in place: cvzone drew the skeleton onto the
+# full-resolution capture buffer and every label was re-rasterized with
+# cv2.putText each frame. Here text is rasterized once into a sprite (pixels
+# plus mask) and cached, each overlay element is a named layer that is only
+# re-rasterized when its text changes, and a frame only touches the sprite
+# rectangles of a downscaled copy of the capture. The capture buffer is never
+# written to.
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# (font scale, BGR color, thickness) at full resolution, as main.py drew them
+LABEL_STYLE = (0.8, (0, 255, 0), 2)
+SARGAM_STYLE = (1.5, (255, 0, 0), 3)
+PROMPT_STYLE = (1.0, (0, 255, 0), 2)
+HUD_STYLE = (0.5, (0, 255, 255), 1)
+HUD_LINE_HEIGHT = 18
+SKELETON_COLOR = (255, 0, 255)
+MIN_FONT_SCALE = 0.35  # Small previews keep the HUD readable
+
+
+class Sprite:
+    __slots__ = ("pixels", "mask", "dx", "dy")
+
+    def __init__(self, pixels, mask, dx, dy):
+        self.pixels = pixels
+        self.mask = mask
+        self.dx = dx          # offset of the top-left corner from the text origin
+        self.dy = dy
+
+
+def render_text(lines, scale, color, thickness, line_height=0):
+    """
+    Rasterizes one or more lines of text (cv2.putText, left aligned) into a
+    Sprite. Its (dx, dy) offset places the first baseline at the origin, as
+    putText's org does.
+    """
+    if isinstance(lines, str):
+        lines = [lines]
+    sizes = [cv2.getTextSize(line, FONT, scale, thickness) for line in lines]
+    ascent = max(h for (_, h), _ in sizes)
+    descent = max(b for _, b in sizes) + thickness
+    width = max(w for (w, _), _ in sizes) + 2 * thickness
+    height = ascent + descent + line_height * (len(lines) - 1)
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    for i, line in enumerate(lines):
+        cv2.putText(pixels, line, (thickness, ascent + i * line_height), FONT, scale, (255, 255, 255), thickness)
+    mask = pixels[:, :, 0] > 0
+    pixels[mask] = color
+    return Sprite(pixels, mask.view(np.uint8), -thickness, -ascent)
+
+
+class SpriteCache:
+    """Text sprites by (text, style); least recently used ones are dropped past max_size."""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._sprites = OrderedDict()
+        self.rasterized = 0
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def get(self, text, scale, color, thickness, line_height=0):
+        key = (text, scale, color, thickness, line_height)
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = self._sprites[key] = render_text(text, scale, color, thickness, line_height)
+            self.rasterized += 1
+            if len(self._sprites) > self.max_size:
+                self._sprites.popitem(last=False)
+        else:
+            self._sprites.move_to_end(key)
+        return sprite
+
+
+class OverlayCompositor:
+    """
+    Renders the annotated preview: render(frame, ...) resizes the frame into a
+    reused preview buffer (scale of the first frame's size) and composites the
+    hand skeletons, hand labels, sargam name and HUD onto it. Coordinates are
+    given in frame pixels. render_time holds the seconds spent per frame.
+    """
+
+    def __init__(self, scale=0.5, mapping=None, interpolation=cv2.INTER_LINEAR):
+        self.scale = scale
+        self.interpolation = interpolation
+        self.sprites = SpriteCache()
+        self.size = None
+        self.preview = None
+        self.render_time = RingHistogram()
+        self.changes = 0
+        self._layers = {}     # name -> (key, sprite, x, y) in preview pixels
+        self._connections = np.array(HAND_CONNECTIONS)
+        self._dots = np.repeat(np.arange(21)[:, None], 2, axis=1)
+        self.preload(mapping)
+
+    def _style(self, style):
+        scale, color, thickness = style
+        return max(round(scale * self.scale, 2), MIN_FONT_SCALE), color, max(round(thickness * self.scale), 1)
+
+    def preload(self, mapping=None):
+        # Rasterize the labels known up front so the first chord doesn't pay for it
+        for hand in HANDS:
+            self.sprites.get(f"{hand.capitalize()} Hand", *self._style(LABEL_STYLE))
+        if mapping is not None:
+            for label in set(mapping.sargam.values()):
+                self.sprites.get(label, *self._style(SARGAM_STYLE))
+
+    def set_text(self, name, text, origin, style, line_height=0):
+        """Shows text at origin (preview pixels) on layer `name`; None hides it."""
+        if not text:
+            self._layers.pop(name, None)
+            return
+        key = (text, origin)
+        layer = self._layers.get(name)
+        if layer is not None and layer[0] == key:
+            return
+        if layer is None or layer[0][0] != text:
+            sprite = self.sprites.get(text, *self._style(style), line_height)
+        else:
+            sprite = layer[1]  # Only moved
+        self._layers[name] = (key, sprite, origin[0] + sprite.dx, origin[1] + sprite.dy)
+        self.changes += 1
+
+    def _resize(self, frame):
+        height, width = frame.shape[:2]
+        if self.size is None:
+            self.size = (max(int(width * self.scale), 1), max(int(height * self.scale), 1))
+            self.preview = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+        if (width, height) == self.size:
+            np.copyto(self.preview, frame)
+        else:
+            cv2.resize(frame, self.size, dst=self.preview, interpolation=self.interpolation)
+        return width, height
+
+    def _blit(self, layer):
+        _, sprite, x, y = layer
+        height, width = self.preview.shape[:2]
+        h, w = sprite.mask.shape
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + w, width), min(y + h, height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        # cv2.copyTo writes through the view; a masked np.copyto is ~10x slower on sprites this small
+        cv2.copyTo(sprite.pixels[y0 - y:y1 - y, x0 - x:x1 - x], sprite.mask[y0 - y:y1 - y, x0 - x:x1 - x],
+                   self.preview[y0:y1, x0:x1])
+
+    def _draw_skeleton(self, hand, fx, fy):
+        points = np.asarray(hand["lmList"], dtype=np.float32)[:, :2] * (fx, fy)
+        points = points.astype(np.int32)
+        radius = max(int(4 * self.scale), 1)
+        cv2.polylines(self.preview, points[self._connections], False, (255, 255, 255), 1)
+        # Zero-length thick segments are filled discs: all 21 dots in one call
+        cv2.polylines(self.preview, points[self._dots], False, SKELETON_COLOR, 2 * radius)
+        x, y, w, h = hand["bbox"]
+        cv2.rectangle(self.preview, (int((x - 20) * fx), int((y - 20) * fy)),
+                      (int((x + w + 20) * fx), int((y + h + 20) * fy)), SKELETON_COLOR, 1)
+
+    def render(self, frame, hands=None, sargam=None, hud=None, skeleton=True, prompt=None):
+        """
+        hands: {"left"/"right": cvzone hand dict} (bbox/lmList in frame pixels);
+        sargam: label to show, or None; hud: list of text lines, or None;
+        prompt: a line shown at the top (e.g. the next song step), or None.
+        Returns the preview image (reused between calls).
+        """
+        start = time.perf_counter()
+        width, height = self._resize(frame)
+        fx, fy = self.size[0] / width, self.size[1] / height
+        hands = hands or {}
+        for hand_type in HANDS:
+            hand = hands.get(hand_type)
+            if hand is None:
+                self.set_text(hand_type, None, None, LABEL_STYLE)
+                continue
+            if skeleton:
+                self._draw_skeleton(hand, fx, fy)
+            x, y = hand["bbox"][:2]
+            self.set_text(hand_type, f"{hand_type.capitalize()} Hand", (int(x * fx), int((y - 10) * fy)), LABEL_STYLE)
+        self.set_text("sargam", sargam, (int(50 * fx), int(100 * fy)), SARGAM_STYLE)
+        self.set_text("prompt", prompt, (int(50 * fx), int(50 * fy)), PROMPT_STYLE)
+        hud_style = self._style(HUD_STYLE)
+        line_height = max(int(HUD_LINE_HEIGHT * hud_style[0] / HUD_STYLE[0]), 8)
+        self.set_text("hud", tuple(hud) if hud else None,
+                      (int(10 * fx), self.size[1] - line_height * len(hud or ()) - 2), HUD_STYLE, line_height)
+        for layer in self._layers.values():
+            self._blit(layer)
+        self.render_time.add(time.perf_counter() - start)
+        return self.preview
+
+    def report(self):
+        report = self.render_time.summary()
+        report.update({"sprites": len(self.sprites), "rasterized": self.sprites.rasterized, "layer_changes": self.changes})
+        return report
+
+
+# --------------------------
+# Benchmark: the baseline in-place drawing vs compositor
+# --------------------------
+def _synthetic_hands(frames, width, height, seed=0):
+    # Two hands drifting around the frame, cvzone-style dicts
+    rng = np.random.default_rng(seed)
+    template = rng.integers(0, 150, size=(21, 3))
+    positions = np.array([[width * 0.2, height * 0.4], [width * 0.6, height * 0.4]])
+    for _ in range(frames):
+        positions = np.clip(positions + rng.normal(0, 4, positions.shape), 20, (width - 170, height - 170))
+        hands = {}
+        for hand_type, (x, y) in zip(HANDS, positions.astype(int).tolist()):
+            lm = template + (x, y, 0)
+            x0, y0 = lm[:, :2].min(axis=0).tolist()
+            x1, y1 = lm[:, :2].max(axis=0).tolist()
+            hands[hand_type] = {"lmList": lm.tolist(), "bbox": (x0, y0, x1 - x0, y1 - y0), "type": hand_type.capitalize()}
+        yield hands
+
+
+def _legacy_render(img, hands, sargam):
+    # What the baseline main.py drew per frame on the capture buffer: cvzone's
+    # findHands(draw=True) (mediapipe's draw_landmarks with its default specs,
+    # the bbox and the hand type), then main.py's hand labels and sargam name
+    for hand in hands.values():
+        lm_list = hand["lmList"]
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(img, tuple(lm_list[a][:2]), tuple(lm_list[b][:2]), (224, 224, 224), 2)
+        for x, y, _ in lm_list:
+            cv2.circle(img, (x, y), 3, (255, 255, 255), 2)
+            cv2.circle(img, (x, y), 2, (0, 0, 255), 2)
+        x, y, w, h = hand["bbox"]
+        cv2.rectangle(img, (x - 20, y - 20), (x + w + 20, y + h + 20), (255, 0, 255), 2)
+        cv2.putText(img, hand["type"], (x - 30, y - 30), cv2.FONT_HERSHEY_PLAIN, 2, (255, 0, 255), 2)
+    for hand_type, hand in hands.items():
+        cv2.putText(img, f"{hand_type.capitalize()} Hand", (hand["bbox"][0], hand["bbox"][1] - 10),
+                    FONT, 0.8, (0, 255, 0), 2)
+    if sargam:
+        cv2.putText(img, sargam, (50, 100), FONT, 1.5, (255, 0, 0), 3)
+    return img
+
+
+def _benchmark(frames=600, width=640, height=480, scale=0.5):
+    from mapping import DEFAULT_MAPPING, load_mapping
+
+    mapping = load_mapping(DEFAULT_MAPPING)
+    labels = sorted(set(mapping.sargam.values()))
+    frame = np.random.default_rng(1).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    results = {}
+    for mode in ("legacy", "compositor"):
+        compositor = OverlayCompositor(scale, mapping=mapping) if mode == "compositor" else None
+        times = np.zeros(frames)
+        for i, hands in enumerate(_synthetic_hands(frames, width, height)):
+            img = frame.copy()  # A fresh capture, outside the timed section
+            sargam = labels[(i // 15) % len(labels)]   # A new chord twice a second
+            start = time.perf_counter()
+            if compositor:
+                compositor.render(img, hands, sargam)
+            else:
+                _legacy_render(img, hands, sargam)
+            times[i] = time.perf_counter() - start
+        shown = compositor.size if compositor else (width, height)
+        results[mode] = {"mean_ms": float(times.mean() * 1000), "p99_ms": float(np.percentile(times, 99) * 1000),
+                         "display_pixels": shown[0] * shown[1]}  # What imshow then has to push to the window
+        if compositor:
+            results[mode].update(sprites=len(compositor.sprites), rasterized=compositor.sprites.rasterized)
+    results["speedup"] = results["legacy"]["mean_ms"] / results["compositor"]["mean_ms"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark overlay rendering")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--size", type=int, nargs=2, default=(640, 480), metavar=("W", "H"))
+    parser.add_argument("--scale", type=float, default=0.5, help="preview scale")
+    args = parser.parse_args()
+    for mode, result in _benchmark(args.frames, *args.size, scale=args.scale).items():
+        print(mode, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import argparse
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# --------------------------
+# Event-sourced performance log
+# --------------------------
+# Every MIDI message that goes out is appended to a preallocated chunk of a
+# structured array: (seconds since the log started, status, data1, data2).
+# Full chunks are handed to a writer thread that appends them to a raw
+# .events file in one tofile() call and gives the chunk back to the pool, so
+# memory stays at `chunks * chunk_size` events however long the performance.
+#
+# append() never blocks on disk: if the writer falls behind and the pool is
+# empty, events are counted in `dropped` instead, and a warning is logged
+# when a run of drops starts. Without a path the log keeps only the most
+# recent chunks in memory.
+
+EVENT_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("status", "u1"),
+    ("data1", "u1"),
+    ("data2", "u1"),
+])
+
+
+class PerformanceLog:
+    def __init__(self, path=None, chunk_size=4096, chunks=8, flush_interval=2.0, clock=time.perf_counter):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.clock = clock
+        self.start = clock()
+        self.flush_interval = flush_interval
+        self.appended = 0
+        self.written = 0
+        self.dropped = 0
+        self._dropping = False
+        self._pool = queue.SimpleQueue()
+        for _ in range(chunks - 1):
+            self._pool.put(np.zeros(chunk_size, dtype=EVENT_DTYPE))
+        self._chunk = np.zeros(chunk_size, dtype=EVENT_DTYPE)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._full = queue.Queue()
+        self._kept = []          # in-memory mode: most recent full chunks
+        self._swap = False
+        self._file = None
+        self._writer = None
+        if path:
+            self._file = open(path, "wb")
+            self._writer = threading.Thread(target=self._write_loop, name="performance-log", daemon=True)
+            self._writer.start()
+
+    def append(self, status, data1=0, data2=0, timestamp=None):
+        t = (self.clock() if timestamp is None else timestamp) - self.start
+        with self._lock:
+            if self._chunk is None and not self._next_chunk():
+                self.dropped += 1
+                if not self._dropping:
+                    self._dropping = True
+                    log.warning("Performance log writer is behind: dropping MIDI events (%d so far)", self.dropped)
+                return
+            event = self._chunk[self._size]
+            event["time"] = t
+            event["status"] = status
+            event["data1"] = data1
+            event["data2"] = data2
+            self._size += 1
+            self.appended += 1
+            if self._size == self.chunk_size or self._swap:
+                self._hand_off()
+
+    def _next_chunk(self):
+        try:
+            self._chunk = self._pool.get_nowait()
+            self._dropping = False
+            return True
+        except queue.Empty:
+            return False
+
+    def _hand_off(self):
+        # Caller holds the lock
+        chunk, size = self._chunk, self._size
+        self._chunk, self._size, self._swap = None, 0, False
+        if self._file:
+            self._full.put((chunk, size))
+            self._next_chunk()
+            return
+        self._kept.append((chunk, size))
+        if not self._next_chunk():
+            self._chunk = self._kept.pop(0)[0]  # Recycle the oldest chunk
+
+    def _write_loop(self):
+        while True:
+            try:
+                item = self._full.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._swap = True  # Hand over the partial chunk on the next append
+                continue
+            if item is None:
+                break
+            chunk, size = item
+            chunk[:size].tofile(self._file)
+            self._file.flush()
+            self.written += size
+            self._pool.put(chunk)
+
+    def events(self):
+        # In-memory mode: everything still held, oldest first
+        with self._lock:
+            parts = [chunk[:size] for chunk, size in self._kept]
+            if self._chunk is not None:
+                parts.append(self._chunk[:self._size])
+            return np.concatenate(parts) if parts else np.zeros(0, dtype=EVENT_DTYPE)
+
+    def close(self):
+        with self._lock:
+            if self._chunk is not None and self._size:
+                self._hand_off()
+        if self._writer:
+            self._full.put(None)
+            self._writer.join()
+            self._file.close()
+            self._writer = None
+
+    def report(self):
+        return {"appended": self.appended, "written": self.written, "dropped": self.dropped}
+
+
+def load_events(path):
+    return np.fromfile(path, dtype=EVENT_DTYPE)
+
+
+# --------------------------
+# Standard MIDI File export
+# --------------------------
+def _var_len(value):
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append(0x80 | (value & 0x7F))
+        value >>= 7
+    return bytes(reversed(out))
+
+
+def _data_bytes(status):
+    # Program change and channel pressure carry one data byte, the rest two
+    return 1 if status & 0xF0 in (0xC0, 0xD0) else 2
+
+
+def export_midi(events, path, ppq=480, tempo=500000):
+    """Writes events (an EVENT_DTYPE array or .events file) as a format 0 .mid file."""
+    if isinstance(events, str):
+        events = load_events(events)
+    events = events[np.argsort(events["time"], kind="stable")]
+    ticks = np.round(events["time"] * (ppq * 1e6 / tempo)).astype(np.int64)
+    ticks -= ticks[0] if len(ticks) else 0
+
+    track = bytearray(b"\x00\xff\x51\x03" + tempo.to_bytes(3, "big"))
+    last = 0
+    for tick, status, data1, data2 in zip(ticks.tolist(), events["status"].tolist(),
+                                         events["data1"].tolist(), events["data2"].tolist()):
+        track += _var_len(tick - last)
+        track.append(status)
+        track.append(data1 & 0x7F)
+        if _data_bytes(status) == 2:
+            track.append(data2 & 0x7F)
+        last = tick
+    track += b"\x00\xff\x2f\x00"
+
+    with open(path, "wb") as f:
+        f.write(b"MThd" + struct.pack(">IHHH", 6, 0, 1, ppq))
+        f.write(b"MTrk" + struct.pack(">I", len(track)))
+        f.write(track)
+    return len(events)
+
+
+def _benchmark(events=1_000_000, path="bench.events"):
+    log = PerformanceLog(path, chunk_size=4096, chunks=4)
+    worst = 0.0
+    start = time.perf_counter()
+    for i in range(events):
+        t0 = time.perf_counter()
+        log.append(0x90, 60 + i % 12, 127)
+        worst = max(worst, time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    log.close()
+    print(f"{events} events in {elapsed:.2f}s ({elapsed / events * 1e6:.2f} us/append, worst {worst * 1e6:.0f} us)")
+    print(f"{log.report()}, resident {4 * 4096 * EVENT_DTYPE.itemsize / 1024:.0f} KiB")
+    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a performance .events log to a Standard MIDI File")
+    parser.add_argument("events", nargs="?", help="log written with main.py --save-midi")
+    parser.add_argument("midi", nargs="?", help="output .mid (default: next to the log)")
+    parser.add_argument("--bench", action="store_true", help="measure append cost and memory instead")
+    args = parser.parse_args()
+    if args.bench:
+        _benchmark()
+        return
+    if not args.events:
+        parser.error("an .events file is required")
+    out = args.midi or os.path.splitext(args.events)[0] + ".mid"
+    count = export_midi(args.events, out)
+    print(f"Wrote {count} events to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import json
+
+import numpy as np
+
+from debounce import FingerDebouncer
+from finger_state import finger_extension
+from landmark_trace import TraceReplay, load_trace
+
+# --------------------------
+# Predictive finger trigger
+# --------------------------
+# fingersUp only flips once a finger has crossed its threshold, one or two
+# frames after the raise was obviously underway. This tracker keeps the last
+# three extension samples per finger (hand-size units, see finger_extension),
+# estimates velocity and acceleration from them and extrapolates `lead`
+# seconds ahead. When a finger is moving up fast enough and the
+# extrapolation crosses the up threshold, the note fires early.
+#
+# An early fire must be confirmed by the real extension crossing the
+# threshold within confirm_time, without the finger turning back down;
+# otherwise it is retracted (the finger reads down again, so the chord is
+# released) and counted as a false trigger.
+# The upward speed at the moment of firing becomes the MIDI velocity.
+#
+# With a FingerDebouncer chained in (debouncer=...), only the early note-on
+# comes from the prediction: confirmations, plain rises and every fall are
+# the debouncer's states, so min_hold, hysteresis and smoothing still apply.
+
+def velocity_curve(speed, slow=0.5, fast=6.0, min_velocity=40, max_velocity=127):
+    """Strike speed (hand-size units per second) -> MIDI velocity."""
+    x = np.clip((np.asarray(speed, dtype=np.float32) - slow) / (fast - slow), 0.0, 1.0)
+    return (min_velocity + np.sqrt(x) * (max_velocity - min_velocity)).astype(np.uint8)
+
+
+class PredictiveTrigger:
+    """
+    Drop-in for FingerDebouncer.update(): (N, 5) finger states per frame, with
+    note-ons moved earlier. Thresholds are (thumb, other fingers) pairs.
+    After each update, strike_velocity(side) is the MIDI velocity of the
+    fingers that went up on that hand in this frame. Without a `debouncer`
+    the raw extension is compared with the thresholds instead.
+    """
+
+    def __init__(self, up_threshold=(0.05, 0.15), down_threshold=(0.0, 0.05), lead=0.05, min_speed=3.0,
+                 arm=0.15, confirm_time=0.12, velocity_range=(0.5, 6.0), debouncer=None):
+        self.up = np.array([up_threshold[0]] + [up_threshold[1]] * 4, dtype=np.float32)
+        self.down = np.array([down_threshold[0]] + [down_threshold[1]] * 4, dtype=np.float32)
+        self.lead = lead
+        self.min_speed = min_speed
+        self.arm = arm
+        self.confirm_time = confirm_time
+        self.velocity_range = velocity_range
+        self.debouncer = debouncer
+        self.reset()
+
+    def reset(self):
+        if self.debouncer:
+            self.debouncer.reset()
+        self.states = np.zeros((2, 5), dtype=np.uint8)
+        self.velocities = np.full((2, 5), 127, dtype=np.uint8)
+        self.rose = np.zeros((2, 5), dtype=bool)          # went up in the last update
+        self.fired_at = np.full((2, 5), np.nan)           # early fire awaiting confirmation
+        self._ext = np.zeros((2, 3, 5), dtype=np.float32)  # last three samples, oldest first
+        self._t = np.zeros((2, 3))
+        self._samples = [0, 0]
+        self.rises = 0
+        self.early = 0
+        self.false_triggers = 0
+        self.gains = []                                   # seconds gained per confirmed early fire
+
+    def lost(self, side):
+        self._samples[side] = 0
+        self.fired_at[side] = np.nan
+
+    def strike_velocity(self, side):
+        rose = self.rose[side]
+        return int(self.velocities[side][rose].max()) if rose.any() else 127
+
+    def _kinematics(self, side):
+        # Velocity and acceleration from the last two/three samples
+        n = self._samples[side]
+        ext, t = self._ext[side], self._t[side]
+        if n < 2:
+            return np.zeros(5, np.float32), np.zeros(5, np.float32)
+        dt1 = max(t[2] - t[1], 1e-6)
+        v1 = (ext[2] - ext[1]) / dt1
+        if n < 3:
+            return v1, np.zeros(5, np.float32)
+        dt0 = max(t[1] - t[0], 1e-6)
+        v0 = (ext[1] - ext[0]) / dt0
+        return v1, (v1 - v0) / (0.5 * (dt0 + dt1))
+
+    def _update_hand(self, side, ext, timestamp, settled):
+        # settled: the debouncer's states for this hand, or None
+        self._ext[side, :2] = self._ext[side, 1:]
+        self._ext[side, 2] = ext
+        self._t[side, :2] = self._t[side, 1:]
+        self._t[side, 2] = timestamp
+        self._samples[side] = min(self._samples[side] + 1, 3)
+        v, a = self._kinematics(side)
+
+        state = self.states[side]
+        fired = self.fired_at[side]
+        pending = ~np.isnan(fired)
+        rose = np.zeros(5, dtype=bool)
+
+        # Pending early fires: confirmed by the real crossing, retracted on timeout
+        above = ext > self.up if settled is None else settled == 1
+        confirmed = pending & above
+        if confirmed.any():
+            self.gains.extend((timestamp - fired[confirmed]).tolist())
+            fired[confirmed] = np.nan
+        expired = pending & ~confirmed & ((timestamp - fired > self.confirm_time) | (v < 0))
+        if expired.any():
+            state[expired] = 0
+            fired[expired] = np.nan
+            self.false_triggers += int(np.count_nonzero(expired))
+
+        down = state == 0
+        plain = down & above
+        h = self.lead
+        predicted = ext + v * h + 0.5 * np.maximum(a, 0.0) * h * h
+        early = down & ~plain & (v > self.min_speed) & (ext > self.down - self.arm) & (predicted > self.up)
+        rose = plain | early
+        if rose.any():
+            state[rose] = 1
+            fired[early] = timestamp
+            self.velocities[side][rose] = velocity_curve(np.maximum(v[rose], 0.0), *self.velocity_range)
+            self.rises += int(np.count_nonzero(rose))
+            self.early += int(np.count_nonzero(early))
+
+        below = ext < self.down if settled is None else settled == 0
+        fall = (state == 1) & below & np.isnan(fired)  # Pending fires resolve above
+        state[fall] = 0
+        self.rose[side] = rose
+        return state
+
+    def update(self, lm, is_right, timestamp):
+        """Returns (N, 5) states aligned with the input hands."""
+        lm = np.asarray(lm, dtype=np.float32)
+        is_right = np.asarray(is_right, dtype=bool)
+        ext = finger_extension(lm, is_right, normalize=True)
+        settled = self.debouncer.update(lm, is_right, timestamp) if self.debouncer else None
+        out = np.zeros((len(lm), 5), dtype=np.uint8)
+        self.rose[:] = False
+        seen = set()
+        for i in range(len(lm)):
+            side = int(is_right[i])
+            seen.add(side)
+            out[i] = self._update_hand(side, ext[i], timestamp, None if settled is None else settled[i])
+        for side in range(2):
+            if side not in seen:
+                self.lost(side)
+        return out
+
+    def report(self):
+        gains = np.array(self.gains) if self.gains else np.zeros(1)
+        early = max(self.early, 1)
+        return {
+            "rises": self.rises,
+            "early": self.early,
+            "false_triggers": self.false_triggers,
+            "false_trigger_rate": self.false_triggers / early,
+            "mean_gain_ms": float(gains.mean() * 1000),
+            "p90_gain_ms": float(np.percentile(gains, 90) * 1000),
+        }
+
+
+# --------------------------
+# Evaluation on recorded traces
+# --------------------------
+def evaluate(trace, debounce=True, **options):
+    """
+    Replays a trace through the predictive trigger and through the same
+    thresholds without prediction (both chained after a FingerDebouncer
+    unless debounce=False, as in main.py); returns the trigger report plus
+    the latency gain in frames and how many reference rises were never fired.
+    """
+    trace = load_trace(trace) if isinstance(trace, str) else trace
+    predictive = PredictiveTrigger(debouncer=FingerDebouncer() if debounce else None, **options)
+    reference = PredictiveTrigger(**dict(options, lead=0.0, min_speed=np.inf,
+                                         debouncer=FingerDebouncer() if debounce else None))
+    bounds = [0] + TraceReplay(trace).frame_bounds.tolist() + [len(trace)]
+    times = trace["time"]
+    reference_rises = 0
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        rows = [i for i in range(lo, hi) if trace["present"][i]]
+        lm, is_right = trace["lm"][rows], trace["right"][rows]
+        predictive.update(lm, is_right, float(times[lo]))
+        reference.update(lm, is_right, float(times[lo]))
+        reference_rises += int(reference.rose.sum())
+
+    report = predictive.report()
+    frame_time = float(np.median(np.diff(times[bounds[:-1]]))) if len(bounds) > 2 else 0.0
+    report["mean_gain_frames"] = report["mean_gain_ms"] / 1000 / frame_time if frame_time else 0.0
+    report["reference_rises"] = reference_rises
+    report["missed"] = max(reference_rises - (predictive.rises - predictive.false_triggers), 0)
+    return report
+
+
+def synthetic_trace(frames=3000, fps=30.0, noise=0.01, feints=0.15, seed=0):
+    """
+    A right hand whose fingers rise and fall with smooth 5-8 frame motions, a
+    fraction of which stop halfway (feints), plus landmark jitter. Useful for
+    checking the trigger where no camera recording is at hand.
+    """
+    from landmark_trace import TRACE_DTYPE
+
+    rng = np.random.default_rng(seed)
+    ext = np.full((frames, 5), -0.4, dtype=np.float32)
+    for finger in range(5):
+        f = int(rng.integers(0, 20))
+        while f < frames - 40:
+            rise = int(rng.integers(5, 9))
+            # A feint stops between the down and up thresholds
+            top = (0.025 if finger == 0 else 0.1) if rng.random() < feints else 0.7
+            ramp = -0.4 + (top + 0.4) * (1 - np.cos(np.linspace(0, np.pi, rise))) / 2
+            hold = int(rng.integers(8, 20))
+            ext[f:f + rise, finger] = ramp
+            ext[f + rise:f + rise + hold, finger] = top
+            ext[f + rise + hold:f + 2 * rise + hold, finger] = ramp[::-1]
+            f += 2 * rise + hold + int(rng.integers(5, 30))
+    ext += rng.normal(0, noise, ext.shape).astype(np.float32)
+
+    records = np.zeros(frames, dtype=TRACE_DTYPE)
+    records["frame"] = np.arange(frames)
+    records["time"] = np.arange(frames) / fps
+    records["present"] = 1
+    records["right"] = 1
+    lm = records["lm"]
+    lm[:, :, :2] = (100, 200)
+    lm[:, 0] = (100, 300, 0)       # wrist: hand scale is 100 px
+    lm[:, 3, 0] = 100
+    lm[:, 4, 0] = np.round(100 + ext[:, 0] * 100)
+    for i, tip in enumerate((8, 12, 16, 20), start=1):
+        lm[:, tip - 2, 1] = 200
+        lm[:, tip, 1] = np.round(200 - ext[:, i] * 100)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the predictive trigger's latency gain on a trace")
+    parser.add_argument("trace", nargs="?", help="landmark trace (.npy); omit for a synthetic one")
+    parser.add_argument("--lead", type=float, default=0.05, help="extrapolation horizon in seconds")
+    parser.add_argument("--min-speed", type=float, default=3.0, help="hand-size units per second")
+    parser.add_argument("--arm", type=float, default=0.15, help="how far below the down threshold a raise may fire")
+    parser.add_argument("--raw-fingers", action="store_true", help="compare against raw thresholds, no debouncer")
+    args = parser.parse_args()
+    trace = args.trace if args.trace else synthetic_trace()
+    report = evaluate(trace, debounce=not args.raw_fingers, lead=args.lead, min_speed=args.min_speed, arm=args.arm)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import math
+import random
+import threading
+import time
+
+import numpy as np
+
+from instrumentation import RingHistogram
+from midi_out import NOTE_OFF, NOTE_ON, MidiOutput
+
+log = logging.getLogger(__name__)
+
+# --------------------------
+# Quantized, tempo-synced note output
+# --------------------------
+# Without quantization a note goes out the moment its finger flips, so the
+# frame loop's timing jitter (tens of ms under load) ends up in the music.
+# With it, note-ons and note-offs are snapped to the next point of a tempo
+# grid and handed to a lookahead scheduler:
+#   - TempoClock: bpm, grid division and beat <-> time conversion
+#   - LookaheadScheduler: one thread and a heap of (due, message); events are
+#     written `lookahead` seconds early, stamped with their due time, when the
+#     backend plays timestamps (pygame.midi opened with latency > 0), and
+#     exactly at their due time otherwise. Optionally sends MIDI clock
+#     (24 ticks per beat, Start/Stop) so other gear can follow the tempo.
+#   - QuantizedOutput: a MidiOutput whose note events go through the two
+#     above; program and control changes are still sent on flush().
+# A gesture that comes at most `tolerance` seconds after a grid point plays
+# at once instead of waiting a whole step: detection is always a little late.
+
+CLOCK_TICK = 0xF8
+CLOCK_START = 0xFA
+CLOCK_STOP = 0xFC
+TICKS_PER_BEAT = 24   # MIDI clock resolution
+
+
+def _is_note_off(message):
+    return message[0] & 0xF0 == NOTE_OFF or (message[0] & 0xF0 == NOTE_ON and not message[2])
+
+
+def device_latency(device):
+    # pygame.midi only honours timestamps when the Output was opened with latency > 0
+    return getattr(getattr(device, "backend", device), "latency", 0)
+
+
+class TempoClock:
+    """
+    Beat position from perf_counter time. `division` is grid steps per beat
+    (1 quarter notes, 2 eighths, 3 triplets, 4 sixteenths). set_bpm() keeps
+    the current beat where it is, so a tempo change doesn't jump.
+    """
+
+    def __init__(self, bpm=100.0, division=4, origin=None):
+        if bpm <= 0 or division <= 0:
+            raise ValueError("bpm and division must be positive")
+        self.division = division
+        self._lock = threading.Lock()
+        # (time, beat, bpm): replaced as a whole, so readers on other threads never mix two tempos
+        self._state = (time.perf_counter() if origin is None else origin, 0.0, float(bpm))
+
+    @property
+    def bpm(self):
+        return self._state[2]
+
+    @property
+    def step(self):
+        return 60.0 / self.bpm / self.division
+
+    @staticmethod
+    def _beat(state, t):
+        origin, beat, bpm = state
+        return beat + (t - origin) * bpm / 60.0
+
+    @staticmethod
+    def _time(state, beat):
+        origin, anchor_beat, bpm = state
+        return origin + (beat - anchor_beat) * 60.0 / bpm
+
+    def beat_at(self, t):
+        return self._beat(self._state, t)
+
+    def time_of(self, beat):
+        return self._time(self._state, beat)
+
+    def set_bpm(self, bpm, now=None):
+        if bpm <= 0:
+            raise ValueError("bpm must be positive")
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            self._state = (now, self._beat(self._state, now), float(bpm))
+
+    def next_step(self, t, tolerance=0.0):
+        """The grid time a gesture at t plays at: the next grid point, or t if one just passed."""
+        state = self._state
+        steps = self._beat(state, t) * self.division
+        if (steps - math.floor(steps)) * 60.0 / state[2] / self.division <= tolerance:
+            return t
+        return self._time(state, math.ceil(steps) / self.division)
+
+
+class LookaheadScheduler:
+    """
+    Sends MIDI messages at their due time (perf_counter seconds) from one
+    thread. Messages due within the same moment go out in one write().
+    `late` holds how far behind its target each write happened; `lead` how
+    far ahead of its due time each message was written.
+    """
+
+    def __init__(self, device, tempo=None, lookahead=0.02, midi_clock=False, name="midi-lookahead"):
+        self.device = device
+        self.tempo = tempo
+        self.latency = device_latency(device)
+        self.lookahead = lookahead if self.latency else 0.0   # Sending early only helps if the device waits
+        clock = getattr(device, "clock", None)
+        # Device clock (ms) = perf_counter ms + offset; our own clock when the device has none
+        self._offset = clock() - time.perf_counter() * 1000 if clock else 0.0
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.sent = 0
+        self.writes = 0
+        self.late = RingHistogram()
+        self.lead = RingHistogram()
+        self.midi_clock = midi_clock and tempo is not None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        if self.midi_clock:
+            # Start on the next beat; ticks then follow the tempo, changes included
+            beat = math.ceil(tempo.beat_at(time.perf_counter()))
+            self.schedule([CLOCK_START], tempo.time_of(beat))
+            self._push_tick(beat * TICKS_PER_BEAT)
+
+    def _push_tick(self, tick):
+        with self._cond:
+            heapq.heappush(self._heap, (self.tempo.time_of(tick / TICKS_PER_BEAT), next(self._seq), tick))
+            self._cond.notify()
+
+    def schedule(self, message, due):
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), message))
+            if self._heap[0][2] is message:
+                self._cond.notify()
+
+    def cancel(self, drop=lambda message, due: True):
+        # Drops pending messages that `drop` accepts (clock ticks are never dropped); returns how many
+        with self._cond:
+            kept = [entry for entry in self._heap if isinstance(entry[2], int) or not drop(entry[2], entry[0])]
+            dropped = len(self._heap) - len(kept)
+            self._heap = kept
+            heapq.heapify(self._heap)
+            return dropped
+
+    def __len__(self):
+        return sum(1 for entry in self._heap if not isinstance(entry[2], int))
+
+    def pending(self):
+        # (due, message) of every message still waiting, in due order
+        with self._cond:
+            return [(due, message) for due, _, message in sorted(self._heap) if not isinstance(message, int)]
+
+    def _stamp(self, due):
+        return int(round(due * 1000 + self._offset)) - self.latency
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - self.lookahead - time.perf_counter()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                else:
+                    return
+                now = time.perf_counter()
+                due_entries = []
+                while self._heap and self._heap[0][0] - self.lookahead <= now:
+                    due_entries.append(heapq.heappop(self._heap))
+            events = []
+            for due, _, message in due_entries:
+                if isinstance(message, int):
+                    self._push_tick(message + 1)
+                    message = [CLOCK_TICK]
+                events.append([message, self._stamp(due)])
+                self.late.add(now - (due - self.lookahead))
+                self.lead.add(due - now)
+            self.device.write(events)
+            self.writes += 1
+            self.sent += len(events)
+
+    def close(self, flush=True):
+        # flush=True sends whatever is still pending right away (note-offs must not get lost)
+        with self._cond:
+            self._closed = True
+            pending = sorted(entry for entry in self._heap if not isinstance(entry[2], int))
+            self._heap = []
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+        events = [[message, self._stamp(time.perf_counter())] for _, _, message in pending] if flush else []
+        if self.midi_clock:
+            events.append([[CLOCK_STOP], self._stamp(time.perf_counter())])
+        if events:
+            self.device.write(events)
+
+    def report(self):
+        late, lead = self.late.summary(), self.lead.summary()
+        return {"sent": self.sent, "writes": self.writes, "pending": len(self), "lookahead_ms": self.lookahead * 1000,
+                "late_p50_ms": late["p50_ms"], "late_p99_ms": late["p99_ms"], "lead_p50_ms": lead["p50_ms"]}
+
+
+class QuantizedOutput(MidiOutput):
+    """
+    MidiOutput that snaps note-ons and note-offs to the tempo grid and hands
+    them to a LookaheadScheduler. A note-off never lands on or before its
+    note-on's grid point, so a quick tap still sounds for one step.
+    Everything else (program changes, all-notes-off) goes out on flush().
+    `timer` gives the perf_counter-style time a gesture happens at.
+    """
+
+    def __init__(self, device, tempo, tolerance=0.03, lookahead=0.02, midi_clock=False, timer=time.perf_counter,
+                 **options):
+        super().__init__(device, **options)
+        self.tempo = tempo
+        self.timer = timer
+        self.tolerance = tolerance
+        self.scheduler = LookaheadScheduler(device, tempo, lookahead, midi_clock)
+        self._on_due = {}      # (channel, note) -> due time of its latest note-on
+
+    def _queue(self, message):
+        # Caller holds the lock
+        kind = message[0] & 0xF0
+        if kind not in (NOTE_ON, NOTE_OFF):
+            return super()._queue(message)
+        due = self.tempo.next_step(self.timer(), self.tolerance)
+        key = (message[0] & 0x0F, message[1])
+        if kind == NOTE_ON and message[2]:
+            self._on_due[key] = due
+            # A release still waiting (possibly pushed a step past its note-on) would
+            # cut this new strike short, while the voices still count the note as held
+            self.scheduler.cancel(lambda pending, at: at >= due and _is_note_off(pending)
+                                  and (pending[0] & 0x0F, pending[1]) == key)
+        else:
+            started = self._on_due.pop(key, None)
+            if started is not None and due <= started:
+                due = started + self.tempo.step
+        self.scheduler.schedule(message, due)
+        self.messages += 1
+        if self.event_log is not None:
+            self.event_log.append(*message, timestamp=due)
+
+    def all_notes_off(self):
+        # Notes still waiting for their grid point would sound after the panic
+        with self._lock:
+            self.scheduler.cancel(lambda message, due: message[0] & 0xF0 == NOTE_ON and not _is_note_off(message))
+            self._on_due.clear()
+        super().all_notes_off()
+
+    def close(self):
+        self.scheduler.close()
+
+    def report(self):
+        return dict(self.scheduler.report(), bpm=self.tempo.bpm, division=self.tempo.division)
+
+
+# --------------------------
+# Jitter check against the loopback sink
+# --------------------------
+def _grid_error(times, tempo):
+    # Distance of each time from its nearest grid point, in ms
+    steps = np.array([tempo.beat_at(t) * tempo.division for t in times])
+    return np.abs(steps - np.round(steps)) * tempo.step * 1000
+
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {"p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"p50_ms": float(p50), "p99_ms": float(p99), "max_ms": float(values.max())}
+
+
+def measure_jitter(bpm=120.0, division=4, seconds=8.0, fps=30.0, frame_jitter_ms=15.0, midi_clock=True, seed=0):
+    """
+    Plays a gesture on every grid step through a frame loop with random
+    per-frame delays, unquantized and quantized, into an async loopback sink.
+    Reports how far each note-on arrived from its grid point, and the spacing
+    of MIDI clock ticks.
+    """
+    from midi_backend import AsyncMidiDevice, RecordingBackend
+
+    results = {}
+    for mode in ("direct", "quantized"):
+        rng = random.Random(seed)
+        backend = RecordingBackend()
+        device = AsyncMidiDevice(backend)
+        tempo = TempoClock(bpm, division)
+        if mode == "quantized":
+            midi = QuantizedOutput(device, tempo, tolerance=0.0, midi_clock=midi_clock, clock=device.clock)
+        else:
+            midi = MidiOutput(device, clock=device.clock)
+        start = time.perf_counter()
+        next_gesture = tempo.time_of(math.ceil(tempo.beat_at(start)))
+        frame = 0
+        note = 60
+        while time.perf_counter() - start < seconds:
+            # Each frame is delivered late by a random amount, like a loaded detection loop
+            due = start + frame / fps + rng.uniform(0, frame_jitter_ms / 1000)
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            frame += 1
+            if time.perf_counter() >= next_gesture:
+                midi.note_off(0, note)
+                note = 60 + (note - 59) % 12
+                midi.note_on(0, note)
+                next_gesture += tempo.step
+            midi.flush()
+        midi.note_off(0, note)
+        midi.flush()
+        time.sleep(0.1)
+        if mode == "quantized":
+            report = midi.report()
+            midi.close()
+        device.close()
+
+        ons = [at for at, message in backend.received if message[0] & 0xF0 == NOTE_ON]
+        ticks = [at for at, message in backend.received if message[0] == CLOCK_TICK]
+        result = {"mode": mode, "note_ons": len(ons), "grid_error": _percentiles(_grid_error(ons, tempo))}
+        if ticks:
+            interval = np.diff(ticks) * 1000
+            expected = 60000.0 / bpm / TICKS_PER_BEAT
+            result["clock"] = {"ticks": len(ticks), "interval_ms": expected,
+                               "jitter": _percentiles(np.abs(interval - expected))}
+        if mode == "quantized":
+            result["scheduler"] = report
+        results[mode] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure note timing against the tempo grid, with and without quantization")
+    parser.add_argument("--bpm", type=float, default=120.0)
+    parser.add_argument("--division", type=int, default=4, help="grid steps per beat")
+    parser.add_argument("--seconds", type=float, default=8.0)
+    parser.add_argument("--fps", type=float, default=30.0, help="simulated frame rate")
+    parser.add_argument("--frame-jitter-ms", type=float, default=15.0, help="random extra delay per frame")
+    parser.add_argument("--no-clock", action="store_true", help="don't send MIDI clock")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    print(json.dumps(measure_jitter(args.bpm, args.division, args.seconds, args.fps, args.frame_jitter_ms,
+                                    not args.no_clock), indent=2))
+
+
+if __name__ == "__main__":
+    main()
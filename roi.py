@@ -0,0 +1,139 @@
+import time
+
+import cv2
+
+# MediaPipe hand skeleton, for drawing landmarks that were detected on a crop
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+]
+
+
+def find_hands(detector, img, draw=False):
+    # cvzone < 1.6 returns only the hands list when draw=False
+    result = detector.findHands(img, draw=draw)
+    if isinstance(result, tuple):
+        return result[0]
+    return result
+
+
+def draw_landmarks(img, hands, color=(255, 0, 255)):
+    for hand in hands:
+        lm_list = hand["lmList"]
+        for a, b in HAND_CONNECTIONS:
+            cv2.line(img, tuple(lm_list[a][:2]), tuple(lm_list[b][:2]), (255, 255, 255), 2)
+        for x, y, _ in lm_list:
+            cv2.circle(img, (x, y), 4, color, cv2.FILLED)
+        x, y, w, h = hand["bbox"]
+        cv2.rectangle(img, (x - 20, y - 20), (x + w + 20, y + h + 20), color, 2)
+    return img
+
+
+# --------------------------
+# Region-of-interest hand tracker
+# --------------------------
+class RoiTracker:
+    """
+    Wraps a cvzone HandDetector. After a full-frame detection it only searches
+    a downscaled crop around the last known hands, and falls back to the full
+    frame every full_every frames, when a hand goes missing, or when a hand
+    touches the crop border (it probably extends past the crop).
+    """
+
+    def __init__(self, detector, max_hands=2, full_every=10, margin=0.35, max_side=320):
+        self.detector = detector
+        self.max_hands = max_hands
+        self.full_every = full_every
+        self.margin = margin
+        self.max_side = max_side
+        self._last_bboxes = []
+        self._since_full = 0
+        self.stats = {
+            "full": {"count": 0, "total": 0.0, "pixels": 0},
+            "roi": {"count": 0, "total": 0.0, "pixels": 0},
+        }
+        self.fallbacks = 0
+
+    def reset(self):
+        # Forget the last hands, e.g. after the frame size changed
+        self._last_bboxes = []
+
+    def _roi(self, shape):
+        height, width = shape[:2]
+        x0 = min(b[0] for b in self._last_bboxes)
+        y0 = min(b[1] for b in self._last_bboxes)
+        x1 = max(b[0] + b[2] for b in self._last_bboxes)
+        y1 = max(b[1] + b[3] for b in self._last_bboxes)
+        pad = int(max(x1 - x0, y1 - y0) * self.margin)
+        return max(x0 - pad, 0), max(y0 - pad, 0), min(x1 + pad, width), min(y1 + pad, height)
+
+    def _record(self, kind, seconds, pixels):
+        stats = self.stats[kind]
+        stats["count"] += 1
+        stats["total"] += seconds
+        stats["pixels"] += pixels
+
+    def _full(self, img):
+        start = time.perf_counter()
+        hands = find_hands(self.detector, img)
+        self._record("full", time.perf_counter() - start, img.shape[0] * img.shape[1])
+        self._since_full = 0
+        return hands
+
+    def _in_roi(self, img):
+        x0, y0, x1, y1 = self._roi(img.shape)
+        crop = img[y0:y1, x0:x1]
+        scale = min(1.0, self.max_side / max(crop.shape[0], crop.shape[1], 1))
+        if scale < 1.0:
+            crop = cv2.resize(crop, (int(crop.shape[1] * scale), int(crop.shape[0] * scale)),
+                              interpolation=cv2.INTER_AREA)
+        start = time.perf_counter()
+        hands = find_hands(self.detector, crop)
+        self._record("roi", time.perf_counter() - start, crop.shape[0] * crop.shape[1])
+
+        inv = 1.0 / scale
+        crop_w, crop_h = crop.shape[1], crop.shape[0]
+        mapped = []
+        for hand in hands:
+            bx, by, bw, bh = hand["bbox"]
+            if bx <= 1 or by <= 1 or bx + bw >= crop_w - 1 or by + bh >= crop_h - 1:
+                return None  # Clipped by the crop
+            mapped.append({
+                "lmList": [[int(x * inv) + x0, int(y * inv) + y0, int(z * inv)] for x, y, z in hand["lmList"]],
+                "bbox": (int(bx * inv) + x0, int(by * inv) + y0, int(bw * inv), int(bh * inv)),
+                "center": (int(hand["center"][0] * inv) + x0, int(hand["center"][1] * inv) + y0),
+                "type": hand["type"],
+            })
+        if len(mapped) < len(self._last_bboxes):
+            return None  # Lost a hand
+        return mapped
+
+    def find(self, img):
+        hands = None
+        self._since_full += 1
+        if self._last_bboxes and self._since_full < self.full_every:
+            hands = self._in_roi(img)
+            if hands is None:
+                self.fallbacks += 1
+        if hands is None:
+            hands = self._full(img)
+        self._last_bboxes = [hand["bbox"] for hand in hands[:self.max_hands]]
+        return hands
+
+    def report(self):
+        report = {"fallbacks": self.fallbacks}
+        for kind, stats in self.stats.items():
+            count = stats["count"] or 1
+            report[kind] = {
+                "count": stats["count"],
+                "mean_ms": stats["total"] / count * 1000,
+                "mean_pixels": stats["pixels"] // count,
+            }
+        frames = self.stats["full"]["count"] + self.stats["roi"]["count"]
+        if frames:
+            total = self.stats["full"]["total"] + self.stats["roi"]["total"]
+            report["mean_detect_ms"] = total / frames * 1000
+        return report
@@ -0,0 +1,144 @@
+import importlib
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# --------------------------
+# Lazily created, shared MIDI + detector runtime
+# --------------------------
+# Importing this module is cheap: cv2, cvzone/mediapipe and pygame are only
+# imported when warm_up() runs, which GUIs start in the background while
+# their splash/window is already on screen.
+
+COLD, WARMING, READY, FAILED = "cold", "warming", "ready", "failed"
+
+
+class Runtime:
+    def __init__(self, midi_device=0, detection_con=0.8, max_hands=2):
+        self.midi_device = midi_device    # midi_backend.open_backend spec: device id, "null", "osc://host:port", a backend...
+        self.quantize = None              # quantize.TempoClock to snap notes to its grid, or None
+        self.quantize_options = {}        # QuantizedOutput options: tolerance, lookahead, midi_clock
+        self.detection_con = detection_con
+        self.max_hands = max_hands
+        self.load_detector = True         # False in processes that only play MIDI (the multi-performer mixer)
+        self.state = COLD
+        self.error = None
+        self.timings = {}                 # step -> seconds since the runtime was created
+        self.created_at = time.perf_counter()
+        self.player = None
+        self.midi = None
+        self.note_offs = None
+        self.voices = None
+        self.detector = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def _mark(self, step):
+        self.timings[step] = time.perf_counter() - self.created_at
+
+    def on_ready(self, callback):
+        # callback(runtime) runs on the warm-up thread, or immediately if already done
+        with self._lock:
+            if self.state not in (READY, FAILED):
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def warm_up(self, background=True, preload=()):
+        with self._lock:
+            if self.state != COLD:
+                return
+            self.state = WARMING
+        if background:
+            threading.Thread(target=self._warm_up, args=(preload,), name="warm-up", daemon=True).start()
+        else:
+            self._warm_up(preload)
+
+    def _warm_up(self, preload):
+        try:
+            from midi_backend import AsyncMidiDevice, open_backend
+            from midi_out import MidiOutput
+            from voices import VoiceAllocator
+
+            # Sends happen on their own thread; a missing device falls back to a silent sink
+            if self.quantize is not None:
+                from quantize import QuantizedOutput
+
+                # 1 ms of PortMidi latency makes pygame.midi play our timestamps
+                self.player = AsyncMidiDevice(open_backend(self.midi_device, latency=1))
+                self.midi = QuantizedOutput(self.player, self.quantize, clock=self.player.clock, **self.quantize_options)
+            else:
+                self.player = AsyncMidiDevice(open_backend(self.midi_device))
+                self.midi = MidiOutput(self.player, clock=self.player.clock)
+            # Reference-counted voices; their scheduler also serves plain (channel, note) note-offs
+            self.voices = VoiceAllocator(self.midi)
+            self.note_offs = self.voices.scheduler
+            self._mark("midi_open")
+
+            if self.load_detector and self.detector is None:  # The model is loaded once per process
+                import numpy as np
+                from cvzone.HandTrackingModule import HandDetector
+
+                self._mark("detector_import")
+                self.detector = HandDetector(detectionCon=self.detection_con, maxHands=self.max_hands)
+                # Run one blank frame so the model graph is loaded before the first real frame
+                self.detector.findHands(np.zeros((240, 320, 3), dtype=np.uint8), draw=False)
+                self._mark("detector_ready")
+
+            for module in preload:
+                importlib.import_module(module)
+            self._mark("ready")
+            self.state = READY
+        except Exception as e:
+            log.exception("Runtime warm-up failed")
+            self.error = e
+            self.state = FAILED
+        finally:
+            self._ready.set()
+            with self._lock:
+                callbacks, self._callbacks = self._callbacks, []
+            for callback in callbacks:
+                callback(self)
+
+    def wait(self, timeout=None):
+        # Warms up synchronously if nobody started it yet
+        if self.state == COLD:
+            self.warm_up(background=False)
+        self._ready.wait(timeout)
+        if self.state == FAILED:
+            raise RuntimeError(f"MIDI/detector runtime failed to start: {self.error}")
+        return self.ready
+
+    def close(self):
+        # Silence everything and release the MIDI device; the next wait() warms up again
+        with self._lock:
+            if self.state != READY:
+                return
+            self.state = COLD
+            self._ready.clear()
+        self.voices.close()
+        self.midi.all_notes_off()
+        if hasattr(self.midi, "close"):
+            self.midi.close()
+        self.player.close()
+        self.player = self.midi = self.note_offs = self.voices = None
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime(**options):
+    """Returns the process-wide Runtime, creating it (but not warming it) on first use."""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = Runtime(**options)
+        return _runtime
@@ -0,0 +1,211 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+# --------------------------
+# Single-thread note-off scheduler
+# --------------------------
+class NoteOffScheduler:
+    """
+    One background thread and a heap of pending note-offs.
+
+    Keys are whatever the caller uses to identify a sounding note (a MIDI note
+    number, or a (channel, note) pair). Scheduling a key again replaces its
+    pending note-off, and cancel() drops it, so re-striking a note before its
+    sustain runs out no longer gets cut off by the older release.
+    """
+
+    clock = staticmethod(time.perf_counter)   # The time base delays are relative to
+
+    def __init__(self, send_off, name="midi-scheduler"):
+        self.send_off = send_off
+        self._heap = []          # (due, seq, key); stale entries are skipped lazily
+        self._pending = {}       # key -> seq of its live heap entry
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.fired = 0
+        self.max_lateness = 0.0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def schedule(self, key, delay):
+        due = time.perf_counter() + delay
+        with self._cond:
+            seq = next(self._seq)
+            self._pending[key] = seq
+            heapq.heappush(self._heap, (due, seq, key))
+            # Keep memory bounded when keys are rescheduled/cancelled at a high rate
+            if len(self._heap) > 2 * len(self._pending) + 64:
+                self._heap = [entry for entry in self._heap if self._pending.get(entry[2]) == entry[1]]
+                heapq.heapify(self._heap)
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def cancel(self, key):
+        with self._cond:
+            return self._pending.pop(key, None) is not None
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self):
+        # Fire every pending note-off right now (e.g. on shutdown)
+        with self._cond:
+            keys = list(self._pending)
+            self._pending.clear()
+            self._heap.clear()
+        for key in keys:
+            self.send_off(key)
+
+    def close(self, flush=True):
+        if flush:
+            self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    due, seq, key = self._heap[0]
+                    wait = due - time.perf_counter()
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                    heapq.heappop(self._heap)
+                    if self._pending.get(key) == seq:
+                        del self._pending[key]
+                        break
+                else:
+                    return
+            lateness = time.perf_counter() - due
+            if lateness > self.max_lateness:
+                self.max_lateness = lateness
+            self.fired += 1
+            self.send_off(key)
+
+
+# --------------------------
+# Virtual-time scheduler (offline renders)
+# --------------------------
+class VirtualScheduler:
+    """
+    NoteOffScheduler's interface on a clock that only moves when advance() is
+    called, with no thread: note-offs fire in due order, each with `now` set
+    to its due time, so whatever they send is timestamped where it belongs.
+    """
+
+    def __init__(self, send_off, start=0.0):
+        self.send_off = send_off
+        self.now = start
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self.fired = 0
+
+    def clock(self):
+        return self.now
+
+    def schedule(self, key, delay):
+        seq = next(self._seq)
+        self._pending[key] = seq
+        heapq.heappush(self._heap, (self.now + delay, seq, key))
+
+    def cancel(self, key):
+        return self._pending.pop(key, None) is not None
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def __len__(self):
+        return len(self._pending)
+
+    def advance(self, until):
+        # Fires everything due up to `until`, then leaves the clock there
+        while self._heap and self._heap[0][0] <= until:
+            due, seq, key = heapq.heappop(self._heap)
+            if self._pending.get(key) != seq:
+                continue
+            del self._pending[key]
+            self.now = max(self.now, due)
+            self.fired += 1
+            self.send_off(key)
+        self.now = max(self.now, until)
+
+    def flush(self):
+        keys = list(self._pending)
+        self._pending.clear()
+        self._heap.clear()
+        for key in keys:
+            self.send_off(key)
+
+    def close(self, flush=True):
+        if flush:
+            self.flush()
+
+
+# --------------------------
+# Benchmark: scheduler vs. one sleeping thread per note-off
+# --------------------------
+def _drive(schedule_off, lateness, expected, events, rate, delay):
+    peak_threads = threading.active_count()
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    for i in range(events):
+        schedule_off(i, time.perf_counter() + delay)  # Distinct keys: every off fires on both sides
+        peak_threads = max(peak_threads, threading.active_count())
+        sleep_for = start + (i + 1) * interval - time.perf_counter()
+        if sleep_for > 0:
+            time.sleep(sleep_for)
+    deadline = time.perf_counter() + delay + 2.0
+    while len(lateness) < expected and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    lateness = sorted(lateness)
+    return {
+        "peak_threads": peak_threads,
+        "fired": len(lateness),
+        "p50_ms": lateness[len(lateness) // 2] * 1000 if lateness else 0.0,
+        "p99_ms": lateness[int(len(lateness) * 0.99)] * 1000 if lateness else 0.0,
+    }
+
+
+def _benchmark(events=3000, rate=1000, delay=0.5):
+    # Thread-per-note, as stop_chord_after_delay does it: every event fires
+    lateness = []
+
+    def thread_per_note(note, due):
+        def worker():
+            time.sleep(delay)
+            lateness.append(time.perf_counter() - due)
+        threading.Thread(target=worker, daemon=True).start()
+
+    print("thread-per-note:", _drive(thread_per_note, lateness, events, events, rate, delay))
+
+    # Scheduler: the same number of distinct note-offs on one thread
+    lateness = []
+    dues = {}
+    scheduler = NoteOffScheduler(lambda note: lateness.append(time.perf_counter() - dues[note]))
+
+    def scheduled(note, due):
+        dues[note] = due
+        scheduler.schedule(note, delay)
+
+    stats = _drive(scheduled, lateness, events, events, rate, delay)
+    stats["heap_entries"] = len(scheduler._heap)
+    scheduler.close(flush=False)
+    print("scheduler:", stats)
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,162 @@
+import glob
+import json
+import os
+import time
+
+from mapping import FINGER_NAMES, HANDS, as_mapping
+
+# --------------------------
+# Song files
+# --------------------------
+# songs/*.json look like:
+#   {
+#     "name": "Happy Birthday",
+#     "tempo": 90,                  beats per minute
+#     "mapping": "song.json",       chord mapping in mappings/
+#     "steps": [["left", "thumb"], ["right", "middle", 2], ...]
+#   }
+# Each step is the (hand, finger) the player has to raise next, optionally
+# with its length in beats (default 1). {"hand", "finger", "beats"} objects
+# work too.
+
+SONGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "songs")
+
+
+class Song:
+    def __init__(self, name, steps, tempo=90.0, mapping="song.json"):
+        self.name = name
+        self.steps = steps    # [(hand, finger, beats)]
+        self.tempo = tempo
+        self.mapping = mapping
+
+    def __len__(self):
+        return len(self.steps)
+
+
+def _step(value):
+    if isinstance(value, dict):
+        hand, finger, beats = value["hand"], value["finger"], value.get("beats", 1)
+    else:
+        hand, finger, beats = (list(value) + [1])[:3]
+    if hand not in HANDS or finger not in FINGER_NAMES:
+        raise ValueError(f"Unknown step {value!r}")
+    return hand, finger, float(beats)
+
+
+def load_song(path):
+    if not os.path.exists(path) and not os.path.isabs(path):
+        path = os.path.join(SONGS_DIR, path)
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    name = config.get("name") or os.path.splitext(os.path.basename(path))[0]
+    return Song(name, [_step(s) for s in config["steps"]], float(config.get("tempo", 90)),
+                config.get("mapping", "song.json"))
+
+
+def load_songs(directory=SONGS_DIR):
+    # {name: Song} for every file in the directory, in file name order
+    songs = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        song = load_song(path)
+        songs[song.name] = song
+    return songs
+
+
+# --------------------------
+# Gesture-following sequencer
+# --------------------------
+class SongSequencer:
+    """
+    Steps through a song as the player raises the expected finger on the
+    expected hand. Nothing here blocks: update() is called once per frame with
+    the live finger bitmasks, the step's chord starts immediately through
+    play(hand, notes) and its end is handed to release(hand, notes, delay),
+    which should schedule the note-off (e.g. on a NoteOffScheduler).
+
+    A step is triggered by the finger going *up* (a rising edge), so a repeated
+    step needs the finger lowered and raised again. With autoplay=True the
+    song plays itself on the tempo grid instead, for previews.
+    """
+
+    def __init__(self, song, play, release, mapping=None, tempo=None, autoplay=False, clock=time.perf_counter):
+        self.song = song
+        self.mapping = as_mapping(mapping or song.mapping)
+        self.play = play
+        self.release = release
+        self.tempo = tempo or song.tempo
+        self.autoplay = autoplay
+        self.clock = clock
+        self.step = 0
+        self.masks = [0] * len(HANDS)
+        self.hits = 0
+        self.wrong = 0        # rising edges on a finger other than the expected one
+        self.started_at = None
+        self._next_at = None  # autoplay: when the next step is due
+
+    @property
+    def beat(self):
+        return 60.0 / self.tempo
+
+    @property
+    def finished(self):
+        return self.step >= len(self.song.steps)
+
+    @property
+    def expected(self):
+        return None if self.finished else self.song.steps[self.step][:2]
+
+    def prompt(self):
+        if self.finished:
+            return f"{self.song.name}: done ({self.hits} steps, {self.wrong} wrong)"
+        hand, finger = self.expected
+        return f"Raise: {finger} on {hand} ({self.step + 1}/{len(self.song.steps)})"
+
+    def restart(self):
+        self.step = 0
+        self.hits = self.wrong = 0
+        self.started_at = self._next_at = None
+
+    def _trigger(self, now):
+        hand, finger, beats = self.song.steps[self.step]
+        notes = self.mapping.notes_for(hand, finger)
+        if self.started_at is None:
+            self.started_at = now
+        if notes:
+            self.play(hand, notes)
+            self.release(hand, notes, beats * self.beat)
+        self.step += 1
+        return beats * self.beat
+
+    def update(self, masks_by_hand, now=None):
+        # masks_by_hand: {"left"/"right": finger bitmask}; missing hands keep their last state
+        now = self.clock() if now is None else now
+        rising = 0
+        expected = self.expected
+        for h, hand in enumerate(HANDS):
+            mask = masks_by_hand.get(hand)
+            if mask is None:
+                continue
+            edges = mask & ~self.masks[h]
+            self.masks[h] = mask
+            if not edges or self.autoplay or expected is None:
+                continue
+            bit = 1 << FINGER_NAMES.index(expected[1])
+            if hand == expected[0] and edges & bit:
+                rising = 1
+                edges &= ~bit
+            if edges:
+                self.wrong += 1
+        if rising:
+            self.hits += 1
+            self._trigger(now)
+        return self.tick(now)
+
+    def tick(self, now=None):
+        # Autoplay: play every step that is due. Returns True once the song is over.
+        if self.autoplay and not self.finished:
+            now = self.clock() if now is None else now
+            if self._next_at is None:
+                self._next_at = now
+            while not self.finished and now >= self._next_at:
+                self._next_at += self._trigger(self._next_at)
+        return self.finished
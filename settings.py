@@ -0,0 +1,18 @@
+# --------------------------
+# Shared performance settings
+# --------------------------
+# Read by the live loop (main.py) and by everything that reproduces it off
+# the camera path: offline renders (and their pool workers), the
+# multi-performer mixer and the harmonium trace check. This module imports
+# nothing, so reading a constant doesn't load cv2 or open a device.
+
+DEFAULT_INSTRUMENT_LEFT = 0    # Acoustic Grand Piano
+DEFAULT_INSTRUMENT_RIGHT = 24  # Acoustic Guitar (nylon)
+
+# Seconds a chord rings on after its finger comes down
+SUSTAIN_TIME = 2.0
+
+# Hands unseen this long have their chords released; with no frames at all for
+# CAMERA_TIMEOUT every held note is released
+HAND_LOST_TIME = 0.5
+CAMERA_TIMEOUT = 1.0
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from capture import GrabSource
+
+
+class RecordingStop(threading.Event):
+    # The grab loop sleeps between failed grabs with _stop.wait(delay)
+    def __init__(self):
+        super().__init__()
+        self.waits = []
+
+    def wait(self, timeout=None):
+        self.waits.append(timeout)
+        return super().wait(timeout)
+
+
+class FakeCapture(GrabSource):
+    """Fails `failures` grabs, then delivers `frames` numbered frames and ends."""
+
+    def __init__(self, failures, frames, **options):
+        super().__init__("fake", **options)
+        self.failures_left = failures
+        self.frames_left = frames
+        self.frame = 0
+        self.attempts = []
+        self.opens = 0
+        self._stop = RecordingStop()
+
+    def _open(self):
+        self.opens += 1
+        return True
+
+    def _grab(self):
+        self.attempts.append(time.perf_counter())
+        if self.failures_left:
+            self.failures_left -= 1
+            return False
+        if not self.frames_left:
+            return None
+        self.frames_left -= 1
+        self.frame += 1
+        return True
+
+    def _retrieve(self, image):
+        return True, self.frame
+
+    def _close(self):
+        pass
+
+
+@pytest.fixture
+def failing():
+    source = FakeCapture(6, 10, backoff=(0.01, 0.04), reopen_after=5).start()
+    source._thread.join(timeout=2.0)
+    yield source
+    source.release()
+
+
+def test_failed_grabs_back_off_exponentially_and_reopen(failing):
+    assert failing.failures == 6
+    assert failing._stop.waits == [0.01, 0.02, 0.04, 0.04, 0.04, 0.04]
+    gaps = [b - a for a, b in zip(failing.attempts, failing.attempts[1:7])]
+    assert all(gap >= wait for gap, wait in zip(gaps, failing._stop.waits))
+    assert failing.reopens == 1 and failing.opens == 1
+    # 6 failures, 10 frames, then the end of the source
+    assert len(failing.attempts) == 17
+
+
+def test_read_returns_the_newest_frame(failing):
+    assert failing.grabbed == 10
+    ok, frame = failing.read()
+    assert ok and frame == 10
+    # Nothing newer: the ended source reports no frame and closes
+    assert failing.read() == (False, None)
+    assert not failing.isOpened()
+    assert failing.delivered == 1
+
+
+def test_a_waiting_reader_gets_the_frame_and_later_ones_are_dropped():
+    # The first grab fails, so read() is already waiting when frame 1 arrives:
+    # the grab thread holds off until it is read, then grabs 2..5 with no reader
+    source = FakeCapture(1, 5, backoff=(0.2, 0.2)).start()
+    try:
+        assert source.read() == (True, 1)
+        source._thread.join(timeout=2.0)
+        assert source.read() == (True, 5)
+        assert source.dropped == 3
+        assert source.report()["delivered"] == 2
+    finally:
+        source.release()
@@ -0,0 +1,69 @@
+import numpy as np
+
+from debounce import FingerDebouncer
+
+FRAME = 1 / 60
+
+
+def hand(index=0.0, thumb=0.0):
+    # Right hand with a hand scale of 100 px (wrist to middle knuckle), so the
+    # index and thumb extensions are given directly in hand-size units
+    lm = np.zeros((21, 3), dtype=np.float32)
+    lm[9, 1] = 100
+    lm[6, 1] = lm[10, 1] = lm[14, 1] = lm[18, 1] = 200
+    lm[8, 1] = 200 - index * 100
+    lm[12, 1] = lm[16, 1] = lm[20, 1] = 250
+    lm[3, 0] = 300
+    lm[4, 0] = 300 + thumb * 100
+    return lm
+
+
+def run(debouncer, extensions, start=0.0, thumb=False):
+    states = []
+    for i, ext in enumerate(extensions):
+        frame = hand(thumb=ext) if thumb else hand(index=ext)
+        states.append(int(debouncer.update([frame], [True], start + i * FRAME)[0, 0 if thumb else 1]))
+    return states
+
+
+def test_flicker_around_the_raw_threshold_is_suppressed():
+    # The raw rule (ext > 0) flips on every frame, starting with "up"; both
+    # values sit inside the hysteresis band, so the debounced finger never moves
+    debouncer = FingerDebouncer(smoothing=False)
+    assert run(debouncer, [0.03, -0.02] * 30) == [0] * 60
+    assert debouncer.raw_transitions == 60
+    assert debouncer.transitions == 0
+    assert debouncer.suppressed == 60
+
+
+def test_finger_goes_up_above_up_threshold_and_down_below_down_threshold():
+    debouncer = FingerDebouncer(smoothing=False, min_hold=0.0)
+    # 0.10 is "up" for the raw rule but below up_threshold (0.15); once up,
+    # it is above down_threshold (0.05) and the finger stays up
+    assert run(debouncer, [0.10, 0.20, 0.10, 0.06, 0.04, 0.10]) == [0, 1, 1, 1, 0, 0]
+    assert debouncer.transitions == 2
+
+
+def test_thumb_uses_its_own_thresholds():
+    debouncer = FingerDebouncer(smoothing=False, min_hold=0.0)
+    # Thumb: up above 0.05, down below 0.0
+    assert run(debouncer, [0.04, 0.06, 0.01, -0.01], thumb=True) == [0, 1, 1, 0]
+
+
+def test_a_flip_is_held_for_min_hold():
+    debouncer = FingerDebouncer(smoothing=False, min_hold=0.06)
+    # Clear up/down every frame: after each flip the finger stays put until
+    # min_hold has passed, so it changes at most every 4th frame (0.0667 s)
+    states = run(debouncer, [0.3, -0.1] * 12)
+    flips = [i for i in range(1, len(states)) if states[i] != states[i - 1]]
+    assert states[0] == 1
+    assert all(b - a >= 0.06 / FRAME for a, b in zip([0] + flips, flips))
+    assert debouncer.raw_transitions == 24
+    assert debouncer.transitions == len(flips) + 1
+
+
+def test_a_real_change_is_followed_after_min_hold():
+    debouncer = FingerDebouncer(smoothing=False, min_hold=0.06)
+    states = run(debouncer, [0.3] * 2 + [-0.1] * 6)
+    # Up at frame 0; the finger comes down at frame 2 but may not flip before 0.06 s
+    assert states == [1, 1, 1, 1, 0, 0, 0, 0]
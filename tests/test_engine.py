@@ -0,0 +1,47 @@
+import time
+
+from engine import FrameEngine, LatestQueue, SyntheticSource
+
+
+def test_latest_queue_drops_the_oldest_item():
+    dropped = []
+    queue = LatestQueue(1, on_drop=dropped.append)
+    for item in range(3):
+        queue.put(item)
+    assert queue.get(timeout=0) == 2
+    assert dropped == [0, 1] and queue.dropped == 2
+
+
+def test_slow_detection_drops_stale_frames_instead_of_queueing_them():
+    source = SyntheticSource(num_frames=120, fps=240)
+    outputs = []
+
+    def detect(frame):
+        time.sleep(0.02)          # ~5 frame intervals
+        return frame
+
+    engine = FrameEngine(source.read, detect, lambda frame, result: outputs.append((frame, result)))
+    engine.run()
+    report = engine.report()
+    assert report["capture"]["count"] == 120
+    assert report["dropped"]["captured"] > 0
+    assert 0 < len(outputs) < 120
+    # Frames come out in order, and each output sees the detection of its own frame
+    frames = [frame for frame, _ in outputs]
+    assert frames == sorted(frames) and all(frame == result for frame, result in outputs)
+    # The newest frame was never dropped in favour of an old one
+    assert frames[-1] >= 110
+
+
+def test_stage_timings_and_stopping_from_the_output_stage():
+    source = SyntheticSource(fps=200)   # Endless: only the output stage can stop it
+    latencies = []
+    engine = FrameEngine(source.read, lambda frame: time.sleep(0.002), lambda frame, result: frame < 20,
+                         on_latency=latencies.append)
+    engine.run()
+    report = engine.report()
+    for stage in ("capture", "detect", "output", "latency"):
+        assert report[stage]["count"] > 0
+    assert report["detect"]["mean_ms"] >= 2.0
+    assert len(latencies) == report["latency"]["count"]
+    assert not engine.running
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from finger_state import finger_masks, fingers_up_batch, hand_masks, hands_to_arrays
+from gestures import fingers_up
+from mapping import fingers_to_mask
+
+TIP_IDS = [4, 8, 12, 16, 20]
+
+
+def cvzone_fingers_up(lm_list, hand_type):
+    # HandDetector.fingersUp as the baseline called it
+    fingers = []
+    if hand_type == "Right":
+        fingers.append(1 if lm_list[TIP_IDS[0]][0] > lm_list[TIP_IDS[0] - 1][0] else 0)
+    else:
+        fingers.append(1 if lm_list[TIP_IDS[0]][0] < lm_list[TIP_IDS[0] - 1][0] else 0)
+    for tip in TIP_IDS[1:]:
+        fingers.append(1 if lm_list[tip][1] < lm_list[tip - 2][1] else 0)
+    return fingers
+
+
+@pytest.mark.parametrize("hand_type", ["Left", "Right"])
+@pytest.mark.parametrize("spread", [480, 4])   # A small range makes ties (never "up") common
+def test_batch_and_scalar_match_cvzone(hand_type, spread):
+    rng = np.random.default_rng(spread)
+    hands = [{"lmList": rng.integers(0, spread, size=(21, 3)).tolist(), "type": hand_type} for _ in range(500)]
+    expected = [cvzone_fingers_up(hand["lmList"], hand_type) for hand in hands]
+
+    lm, is_right = hands_to_arrays(hands)
+    assert fingers_up_batch(lm, is_right).tolist() == expected
+    assert [fingers_up(hand) for hand in hands] == expected
+    assert hand_masks(hands) == [fingers_to_mask(fingers) for fingers in expected]
+    assert finger_masks(expected).tolist() == hand_masks(hands)
+
+
+def test_mixed_hands_in_one_batch():
+    rng = np.random.default_rng(1)
+    hands = [{"lmList": rng.integers(0, 480, size=(21, 3)).tolist(), "type": "Right" if i % 3 else "Left"}
+             for i in range(300)]
+    lm, is_right = hands_to_arrays(hands)
+    assert fingers_up_batch(lm, is_right).tolist() == [cvzone_fingers_up(h["lmList"], h["type"]) for h in hands]
+
+
+def test_thumb_direction_depends_on_handedness():
+    lm = np.zeros((21, 3), dtype=int)
+    lm[4, 0], lm[3, 0] = 120, 100        # Thumb tip right of its IP joint
+    right = {"lmList": lm.tolist(), "type": "Right"}
+    left = {"lmList": lm.tolist(), "type": "Left"}
+    assert hand_masks([right, left]) == [0b00001, 0]
+
+
+def test_no_hands():
+    assert hand_masks([]) == []
+    lm, is_right = hands_to_arrays([])
+    assert fingers_up_batch(lm, is_right).shape == (0, 5)
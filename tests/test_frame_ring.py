@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+
+from engine import FrameEngine
+from frame_ring import FrameRing, RingCapture
+
+
+class CountingCamera:
+    """Paced stand-in for a capture source: every pixel of frame i is i % 256."""
+
+    def __init__(self, frames, fps=120.0):
+        self.frames = frames
+        self.fps = fps
+        self.index = 0
+
+    def read(self, image=None):
+        time.sleep(1.0 / self.fps)
+        if image is None:
+            image = np.empty((24, 32, 3), dtype=np.uint8)
+        image[:] = self.index % 256
+        self.index += 1
+        return True, image
+
+    def isOpened(self):
+        return self.index < self.frames
+
+    def release(self):
+        pass
+
+
+def test_acquire_skips_busy_slots_and_reports_full():
+    ring = FrameRing((2, 2), slots=3)
+    try:
+        assert ring.acquire(busy={0, 1}) == 2
+        ring.commit(2)
+        assert ring.acquire(busy={0, 1}) is None   # 2 is the latest published frame
+    finally:
+        ring.close()
+
+
+def test_slow_stages_never_see_their_frame_overwritten():
+    cap = RingCapture(CountingCamera(60))
+    torn = []
+
+    def read():
+        if not cap.cap.isOpened():
+            raise EOFError
+        return cap.read()
+
+    def detect(frame):
+        value = int(frame[0, 0, 0])
+        time.sleep(0.1)   # Many frame intervals: the camera keeps writing meanwhile
+        return value
+
+    def output(frame, value):
+        time.sleep(0.02)
+        if int(frame[0, 0, 0]) != value or int(frame[-1, -1, 0]) != value:
+            torn.append(value)
+
+    engine = FrameEngine(read, detect, output, release=cap.release_frame)
+    engine.run()
+    try:
+        assert engine.stats["output"].count > 0
+        assert torn == []
+        assert not cap._held     # Every slot given back once the engine stopped
+    finally:
+        cap.release()
@@ -0,0 +1,45 @@
+from governor import DEFAULT_LEVELS, LatencyGovernor
+
+
+def feed(governor, latency, frames):
+    for _ in range(frames):
+        governor.observe(latency)
+
+
+def test_steps_down_once_over_budget_for_patience_frames():
+    governor = LatencyGovernor(budget=0.040, patience=5, smoothing=1.0)
+    feed(governor, 0.050, 4)
+    assert governor.level == 0
+    feed(governor, 0.050, 1)
+    assert governor.level == 1
+    assert governor.settings == DEFAULT_LEVELS[1]
+
+
+def test_recovers_one_level_after_comfortably_under_budget():
+    governor = LatencyGovernor(budget=0.040, patience=5, recover=60, headroom=0.6, smoothing=1.0)
+    feed(governor, 0.050, 10)
+    assert governor.level == 2
+    feed(governor, 0.030, 200)   # Under budget but above the headroom: stays put
+    assert governor.level == 2
+    feed(governor, 0.020, 59)
+    assert governor.level == 2
+    feed(governor, 0.020, 1)
+    assert governor.level == 1
+    feed(governor, 0.020, 60)
+    assert governor.level == 0
+    assert governor.metrics()["level_changes"] == 4
+
+
+def test_never_steps_past_the_cheapest_level_and_history_is_bounded():
+    governor = LatencyGovernor(budget=0.040, patience=1, recover=1, smoothing=1.0)
+    feed(governor, 1.0, 100)
+    assert governor.level == len(DEFAULT_LEVELS) - 1
+    for _ in range(100):
+        feed(governor, 1.0, 1)
+        feed(governor, 0.0, 1)
+    assert governor.level_changes > len(governor.decisions) == governor.decisions.maxlen
+
+
+def test_detect_every_skips_frames():
+    governor = LatencyGovernor(levels=[{"scale": 0.5, "detect_every": 3, "overlay": False}])
+    assert [governor.should_detect() for _ in range(6)] == [False, False, True, False, False, True]
@@ -0,0 +1,76 @@
+import time
+
+import numpy as np
+import pytest
+
+from debounce import FingerDebouncer
+from gestures import ChordTracker
+from harmonium import HARMONIUM_MAPPING, check_threads
+from midi_out import HAND_CHANNELS, MidiOutput, NullOutput
+from landmark_trace import replay_events
+from predictive import synthetic_trace
+from voices import VoiceAllocator, _replay
+
+
+@pytest.fixture(scope="module")
+def two_hand_trace():
+    # Right hand from the synthetic trace, left hand a mirrored one with its own fingering
+    right = synthetic_trace(600, seed=0)
+    left = synthetic_trace(600, seed=1)
+    left["right"] = 0
+    left["lm"][:, :, 0] = 200 - left["lm"][:, :, 0]
+    trace = np.empty(len(right) * 2, dtype=right.dtype)
+    trace[0::2] = left
+    trace[1::2] = right
+    return trace
+
+
+@pytest.mark.parametrize("drone", [True, False])
+def test_thread_count_stays_constant_and_nothing_hangs(two_hand_trace, drone):
+    report = check_threads(two_hand_trace, drone=drone, speed=20.0)
+    assert report["note_ons"] > 50
+    assert report["threads_min"] == report["threads_max"]
+    assert report["hanging_voices"] == 0
+    # The old script started a thread per note-on, dozens alive at once
+    assert report["legacy_peak_threads"] > report["threads_max"]
+
+
+def test_check_plays_the_debounced_decisions(two_hand_trace):
+    # Without the drone latch the check must make the same decisions as a
+    # debounced replay of the trace, not the raw finger states
+    report = check_threads(two_hand_trace, drone=False, speed=50.0)
+    events, _ = replay_events(two_hand_trace, HARMONIUM_MAPPING, debouncer=FingerDebouncer())
+    assert report["note_ons"] == sum(len(notes) for _, kind, _, notes in events if kind == "on")
+
+
+def test_drone_starts_again_after_the_watchdog_released_it():
+    device = NullOutput()
+    midi = MidiOutput(device)
+    voices = VoiceAllocator(midi)
+    left = HAND_CHANNELS["left"]
+
+    def play(hand_type, notes):
+        for note in notes:
+            voices.press(HAND_CHANNELS[hand_type], note)
+
+    def stop(hand_type, notes):
+        for note in notes:
+            voices.release(HAND_CHANNELS[hand_type], note)
+
+    tracker = ChordTracker(HARMONIUM_MAPPING, play, stop, latch=("left",))
+    voices.on_watchdog = tracker.reset
+    try:
+        tracker.update({"left": 0b00001})    # thumb up: drone on
+        tracker.update({"left": 0})          # lowering a latched finger does nothing
+        midi.flush()
+        assert _replay(device.events)[0] == {(left, 48)}
+
+        voices.watchdog(0.02)                # camera stalls
+        time.sleep(0.1)
+        assert _replay(device.events)[0] == set()
+
+        tracker.update({"left": 0b00001})    # next raise starts the drone again
+        midi.flush()
+        assert _replay(device.events)[0] == {(left, 48)}
+    finally:
+        voices.close()
@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+import main
+from bench_latency import FixtureDetector, FixtureSource, fixture_hand
+from headless import HandMidiService, serve_stdin
+from midi_backend import RecordingBackend
+from midi_out import HAND_CHANNELS
+
+FPS = 30.0
+FRAMES = int(FPS * 60)   # Longer than any test: tracking runs until stopped
+
+
+def until(condition, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # The left index goes up and down every 6 frames; the right hand rests
+    hands = [[fixture_hand("left", 0b00010 if (i // 6) % 2 == 0 else 0, 150), fixture_hand("right", 0, 450)]
+             for i in range(FRAMES)]
+    backend = RecordingBackend()
+    monkeypatch.setattr(main.runtime, "detector", FixtureDetector(hands))
+    monkeypatch.setattr(main.runtime, "midi_device", main.runtime.midi_device)   # Restored after the test
+    service = HandMidiService(midi_device=backend, source=FixtureSource(FRAMES, FPS), use_roi=False)
+    service.backend = backend
+    yield service
+    service.close()
+
+
+def programs(service, hand):
+    status = 0xC0 | HAND_CHANNELS[hand]
+    return [message[1] for _, message in list(service.backend.received) if message[0] == status]
+
+
+def test_stdin_commands(service, monkeypatch, capsys):
+    def script():
+        yield "status\n"
+        yield "start 5 6\n"
+        until(lambda: 5 in programs(service, "left"))
+        yield "status\n"
+        yield "instrument left 40\n"
+        # The running loop plays the next chord with the new program
+        until(lambda: 40 in programs(service, "left"))
+        yield "instrument middle 3\n"
+        yield "instrument right 128\n"
+        yield "start\n"
+        yield "bogus\n"
+        yield "\n"
+        yield "stop\n"
+        yield "status\n"
+        yield "quit\n"
+        yield "status\n"   # Never read: the service shut down
+
+    monkeypatch.setattr("sys.stdin", script())
+    serve_stdin(service)
+    assert capsys.readouterr().out.splitlines() == [
+        "ok stopped left=0 right=24",
+        "ok started",
+        "ok running left=5 right=6",
+        "ok left=40",
+        "error usage: instrument left|right 0-127",
+        "error usage: instrument left|right 0-127",
+        "ok already running",
+        "error commands: start [LEFT RIGHT] | stop | instrument left|right N | status | quit",
+        "error empty command; commands: start [LEFT RIGHT] | stop | instrument left|right N | status | quit",
+        "ok stopped",
+        "ok stopped left=40 right=6",
+        "ok bye",
+    ]
+    assert service.shutdown_requested.is_set()
+    assert not service.running
+    assert programs(service, "left")[:2] == [5, 40]
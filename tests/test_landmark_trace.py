@@ -0,0 +1,41 @@
+import numpy as np
+
+from debounce import FingerDebouncer
+from landmark_trace import TraceRecorder, replay_events
+
+
+def hand(index_up, right=True):
+    # Only the index finger can be up: its tip above (smaller y than) its pip joint
+    lm = np.zeros((21, 3), dtype=int)
+    lm[6, 1] = 100
+    lm[8, 1] = 50 if index_up else 150
+    return {"lmList": lm.tolist(), "bbox": (0, 0, 10, 10), "center": (5, 5), "type": "Right" if right else "Left"}
+
+
+def trace(frames):
+    recorder = TraceRecorder(None)
+    for i, hands in enumerate(frames):
+        recorder.add(hands, i * 0.25)
+    return recorder.records
+
+
+def test_a_hand_that_leaves_the_frame_releases_after_the_lost_time():
+    # Index up for two frames, then the hand is gone: released once it has been
+    # missing for more than HAND_LOST_TIME (0.5 s) of trace time, at t=1.0
+    records = trace([[hand(True)]] * 2 + [[]] * 6)
+    events, _ = replay_events(records)
+    assert events == [(0, "on", "right", (62, 66, 71)), (4, "off", "right", (62, 66, 71))]
+
+
+def test_a_short_dropout_keeps_the_chord():
+    records = trace([[hand(True)]] * 2 + [[]] * 2 + [[hand(True)]] * 2)
+    events, _ = replay_events(records)
+    assert events == [(0, "on", "right", (62, 66, 71))]
+
+
+def test_lost_hand_releases_through_the_debouncer_too():
+    records = trace([[hand(True)]] * 4 + [[]] * 6)
+    events, _ = replay_events(records, debouncer=FingerDebouncer())
+    kinds = [kind for _, kind, _, _ in events]
+    assert kinds == ["on", "off"]
+    assert events[1][0] == 6    # Last seen at 0.75 s, missing for more than 0.5 s at 1.5 s
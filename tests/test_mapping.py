@@ -0,0 +1,91 @@
+import pytest
+
+from gestures import ChordTracker
+from mapping import FINGER_NAMES, HANDS, as_mapping, compile_mapping, load_mapping, pattern_to_mask
+
+# The chords and sargam names the baseline main.py had inline
+BASELINE_CHORDS = {
+    "left": {
+        "thumb": {"notes": [60, 64]},
+        "index": {"notes": [62, 67]},
+        "middle": {"notes": [64, 71]},
+        "ring": {"notes": [65, 69]},
+        "pinky": {"notes": [67, 72]},
+    },
+    "right": {
+        "thumb": {"notes": [60, 64, 67]},
+        "index": {"notes": [62, 66, 71]},
+        "middle": {"notes": [64, 69, 74]},
+        "ring": {"notes": [65, 70, 76]},
+        "pinky": {"notes": [67, 72, 79]},
+    },
+}
+BASELINE_SARGAM = {60: "Sa", 62: "Re", 64: "Ga", 65: "Ma", 67: "Pa", 69: "Dha", 71: "Ni", 72: "Sa"}
+
+INDEX, MIDDLE, THUMB = 0b00010, 0b00100, 0b00001
+
+
+class Calls:
+    def __init__(self, mapping, latch=()):
+        self.calls = []
+        self.tracker = ChordTracker(mapping, lambda h, notes: self.calls.append(("on", h, notes)),
+                                    lambda h, notes: self.calls.append(("off", h, notes)), latch=latch)
+
+    def update(self, masks):
+        self.calls.clear()
+        self.tracker.update(masks)
+        return list(self.calls)
+
+
+def test_main_json_compiles_to_the_baseline_chords():
+    mapping = load_mapping("main.json")
+    for hand in HANDS:
+        for finger in FINGER_NAMES:
+            assert mapping.notes_for(hand, finger) == tuple(BASELINE_CHORDS[hand][finger]["notes"])
+    assert mapping.sargam == BASELINE_SARGAM
+    assert mapping.mapped == [0b11111, 0b11111]
+    assert all(notes is None for hand in mapping.pattern_notes for notes in hand)
+    # The old inline dict compiles to the same tables
+    assert as_mapping(BASELINE_CHORDS).finger_notes == mapping.finger_notes
+
+
+def test_bad_patterns_are_rejected():
+    with pytest.raises(ValueError):
+        pattern_to_mask("index+elbow")
+    with pytest.raises(ValueError):
+        compile_mapping({"fingers": {}, "patterns": {"right": {"index": [60]}}})
+
+
+def test_single_fingers_play_and_release_their_own_chords():
+    calls = Calls("main.json")
+    assert calls.update({"right": INDEX}) == [("on", "right", (62, 66, 71))]
+    assert calls.update({"right": INDEX | MIDDLE}) == [("on", "right", (64, 69, 74))]
+    assert calls.update({"right": INDEX | MIDDLE}) == []          # Unchanged mask: nothing
+    assert calls.update({}) == []                                  # Missing hand keeps its state
+    assert calls.update({"right": 0}) == [("off", "right", (62, 66, 71)), ("off", "right", (64, 69, 74))]
+
+
+def test_a_two_finger_pattern_wins_over_single_fingers():
+    calls = Calls("sargam_patterns.json")
+    assert calls.update({"right": INDEX}) == [("on", "right", (62, 66, 71))]
+    # index+middle is a pattern: the index chord stops, only the pattern chord plays
+    assert calls.update({"right": INDEX | MIDDLE}) == [("off", "right", (62, 66, 71)), ("on", "right", (69, 72, 76))]
+    # Leaving the pattern restarts the chord of the finger still up
+    assert calls.update({"right": MIDDLE}) == [("off", "right", (69, 72, 76)), ("on", "right", (64, 69, 74))]
+    # Straight into a pattern from nothing: no single-finger chords at all
+    calls.update({"right": 0})
+    assert calls.update({"right": INDEX | MIDDLE}) == [("on", "right", (69, 72, 76))]
+
+
+def test_latched_hand_toggles_on_the_rising_edge():
+    calls = Calls("main.json", latch=("left",))
+    assert calls.update({"left": THUMB}) == [("on", "left", (60, 64))]
+    assert calls.update({"left": 0}) == []                         # Lowering does nothing
+    assert calls.update({"left": THUMB}) == [("off", "left", (60, 64))]
+    assert calls.update({"left": THUMB}) == []                     # Held up: no new edge
+    assert calls.update({"left": 0}) == []
+    # Patterns don't apply to a latched hand; each raised finger toggles
+    assert calls.update({"left": INDEX | MIDDLE}) == [("on", "left", (62, 67)), ("on", "left", (64, 71))]
+    calls.calls.clear()
+    calls.tracker.release_all()
+    assert calls.calls == [("off", "left", (62, 67)), ("off", "left", (64, 71))]
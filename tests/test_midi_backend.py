@@ -0,0 +1,95 @@
+import socket
+import struct
+
+import pytest
+
+from midi_backend import AsyncMidiDevice, NullBackend, RecordingBackend, UdpBackend, open_backend
+
+BATCH = [[[0x90, 60, 100], 0], [[0xC1, 24], 0], [[0x80, 60, 0], 0]]
+
+
+@pytest.fixture
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(2.0)
+    yield sock
+    sock.close()
+
+
+def osc_string(data, pos):
+    end = data.index(b"\0", pos)
+    return data[pos:end].decode(), end + 1 + (-(end + 1 - pos) % 4)
+
+
+def decode_osc_bundle(data):
+    # -> [(address, [(status, data1, data2)])] for a bundle of 'm'-typed messages
+    assert data[:8] == b"#bundle\0"
+    assert struct.unpack(">Q", data[8:16])[0] == 1
+    pos, messages = 16, []
+    while pos < len(data):
+        size = struct.unpack(">i", data[pos:pos + 4])[0]
+        element = data[pos + 4:pos + 4 + size]
+        address, at = osc_string(element, 0)
+        tags, at = osc_string(element, at)
+        assert tags == ",m" and size == at + 4
+        port, status, data1, data2 = element[at:at + 4]
+        assert port == 0
+        messages.append((address, (status, data1, data2)))
+        pos += 4 + size
+    return messages
+
+
+def test_udp_sends_one_datagram_of_raw_midi_per_batch(receiver):
+    port = receiver.getsockname()[1]
+    backend = open_backend(f"udp://127.0.0.1:{port}")
+    assert isinstance(backend, UdpBackend) and not backend.osc
+    backend.write(BATCH)
+    backend.close()
+    assert receiver.recv(4096) == bytes([0x90, 60, 100, 0xC1, 24, 0x80, 60, 0])
+
+
+def test_osc_bundle_decodes_to_the_batch(receiver):
+    port = receiver.getsockname()[1]
+    device = AsyncMidiDevice(open_backend(f"osc://127.0.0.1:{port}"))
+    device.write(BATCH)
+    device.close()
+    assert decode_osc_bundle(receiver.recv(4096)) == [
+        ("/midi", (0x90, 60, 100)), ("/midi", (0xC1, 24, 0)), ("/midi", (0x80, 60, 0))]
+
+
+def test_unknown_device_falls_back_to_the_null_sink():
+    backend = open_backend("pygame:9999")
+    assert isinstance(backend, NullBackend)
+    backend.write(BATCH)
+    assert (backend.writes, backend.messages) == (1, 3)
+    with pytest.raises(Exception):
+        open_backend("pygame:9999", fallback=False)
+
+
+def test_specs_and_objects():
+    assert isinstance(open_backend("null"), NullBackend)
+    recording = RecordingBackend()
+    assert open_backend(recording) is recording
+
+
+class FlakyBackend(RecordingBackend):
+    # Fails on one batch; the sender thread must carry on with the next ones
+    def write(self, events):
+        if events[0][0][1] == 13:
+            raise OSError("device unplugged")
+        super().write(events)
+
+
+def test_async_device_sends_in_order_and_survives_errors():
+    backend = FlakyBackend()
+    device = AsyncMidiDevice(backend)
+    for i in range(200):
+        device.write([[[0x90, i % 128, 100], i], [[0x80, i % 128, 0], i]])
+    assert device.drain(2.0)
+    device.close()
+    notes = [message[1] for _, message in backend.received]
+    expected = [i % 128 for i in range(200) if i % 128 != 13 for _ in range(2)]
+    assert notes == expected
+    assert device.errors == 2               # Batches 13 and 141 both carry note 13
+    assert device.sent == 400 and device.depth == 0
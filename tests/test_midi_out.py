@@ -0,0 +1,43 @@
+from midi_out import HAND_CHANNELS, MAX_EVENTS_PER_WRITE, NOTE_ON, PROGRAM_CHANGE, MidiOutput, NullOutput
+
+
+def test_one_write_per_frame_with_a_channel_per_hand():
+    device = NullOutput()
+    midi = MidiOutput(device, clock=lambda: 42)
+    midi.set_program(HAND_CHANNELS["left"], 0)
+    midi.set_program(HAND_CHANNELS["right"], 24)
+    for hand, chord in (("left", [60, 64]), ("right", [60, 64, 67])):
+        for note in chord:
+            midi.note_on(HAND_CHANNELS[hand], note)
+    assert device.writes == 0          # Nothing is sent before the frame's flush
+    assert midi.flush() == 7
+    assert device.writes == 1
+    statuses = [message[0] for message, _ in device.events]
+    assert statuses[:2] == [PROGRAM_CHANGE | 0, PROGRAM_CHANGE | 1]
+    assert statuses[2:] == [NOTE_ON | 0] * 2 + [NOTE_ON | 1] * 3
+    assert all(timestamp == 42 for _, timestamp in device.events)
+
+
+def test_program_change_only_when_the_program_differs():
+    device = NullOutput()
+    midi = MidiOutput(device)
+    for _ in range(100):
+        midi.set_program(0, 5)
+        midi.note_on(0, 60)
+        midi.flush()
+    midi.set_program(0, 6)
+    midi.flush()
+    programs = [message for message, _ in device.events if message[0] & 0xF0 == PROGRAM_CHANGE]
+    assert programs == [[PROGRAM_CHANGE, 5], [PROGRAM_CHANGE, 6]]
+    assert device.writes == 101
+    assert midi.flush() == 0 and device.writes == 101   # An empty frame costs no write
+
+
+def test_large_batches_are_split_at_the_write_limit():
+    device = NullOutput()
+    midi = MidiOutput(device)
+    for i in range(MAX_EVENTS_PER_WRITE + 10):
+        midi.note_on(0, i % 128)
+    midi.flush()
+    assert [len(batch) for batch in device.batches] == [MAX_EVENTS_PER_WRITE, 10]
+    assert midi.messages == MAX_EVENTS_PER_WRITE + 10
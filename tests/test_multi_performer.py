@@ -0,0 +1,70 @@
+import pytest
+
+from midi_out import NOTE_OFF, MidiOutput, NullOutput
+from multi_performer import Mixer, StateBoard, performer_channels
+from voices import _replay
+
+INDEX = 0b00010   # Right index: (62, 66, 71) in mappings/main.json
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def mixer():
+    board = StateBoard(2)
+    clock = FakeClock()
+    device = NullOutput()
+    mixer = Mixer(board, 2, MidiOutput(device), clock=clock)
+    mixer.device = device
+    yield mixer
+    mixer.close()
+    board.close()
+
+
+def sounding(mixer):
+    return _replay(mixer.device.events)[0]
+
+
+def publish(mixer, p, right_mask=None):
+    present = [0, int(right_mask is not None)]
+    mixer.board.publish(p, present, [0, right_mask or 0], mixer.clock.now)
+    mixer.poll()
+
+
+def test_a_hand_that_leaves_the_frame_releases_its_chord(mixer):
+    channel = performer_channels(0)["right"]
+    publish(mixer, 0, INDEX)
+    assert sounding(mixer) == {(channel, 62), (channel, 66), (channel, 71)}
+
+    mixer.clock.now = 0.3
+    publish(mixer, 0)              # present=0, not yet lost
+    assert len(sounding(mixer)) == 3
+    mixer.clock.now = 0.6
+    publish(mixer, 0)              # missing for more than HAND_LOST_TIME
+    offs = [message[:2] for message, _ in mixer.device.events if message[0] & 0xF0 == NOTE_OFF]
+    assert offs == [[NOTE_OFF | channel, 62], [NOTE_OFF | channel, 66], [NOTE_OFF | channel, 71]]
+    assert sounding(mixer) == set()
+
+
+def test_a_stalled_performer_is_silenced_and_resumes(mixer):
+    first, second = performer_channels(0)["right"], performer_channels(1)["right"]
+    publish(mixer, 0, INDEX)
+    publish(mixer, 1, INDEX)
+    assert len(sounding(mixer)) == 6
+
+    # Performer 1 keeps publishing, performer 0's worker stops
+    for now in (0.5, 1.0, 1.5):
+        mixer.clock.now = now
+        publish(mixer, 1, INDEX)
+    assert sounding(mixer) == {(second, 62), (second, 66), (second, 71)}
+    assert mixer.stalls == 1
+
+    mixer.clock.now = 1.6
+    publish(mixer, 0, INDEX)       # Frames are back, finger still up: replayed
+    assert {(first, 62), (first, 66), (first, 71)} <= sounding(mixer)
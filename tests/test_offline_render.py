@@ -0,0 +1,40 @@
+import numpy as np
+
+from midi_out import NOTE_OFF, NOTE_ON
+from offline_render import decisions_to_midi
+from voices import _replay
+
+PROGRAMS = {"left": 0, "right": 24}
+
+
+def note_events(midi_events, kind):
+    rows = midi_events[(midi_events["status"] & 0xF0) == kind]
+    return [(float(t), int(note)) for t, note in zip(rows["time"], rows["data1"])]
+
+
+def test_chords_sharing_a_note_dont_cut_each_other_off():
+    times = np.arange(5) * 1.0
+    decisions = [
+        (0, "on", "left", (60, 64)),    # thumb
+        (1, "on", "left", (64, 71)),    # middle, shares 64
+        (2, "off", "left", (60, 64)),   # thumb down: 64 is still held
+        (3, "off", "left", (64, 71)),
+    ]
+    midi_events = decisions_to_midi(decisions, times, PROGRAMS, sustain=0.5)
+    offs = note_events(midi_events, NOTE_OFF)
+    assert (2.5, 60) in offs
+    assert (3.5, 64) in offs and (2.5, 64) not in offs
+    assert (3.5, 71) in offs
+
+
+def test_render_leaves_nothing_hanging_and_stays_in_time_order():
+    times = np.arange(4) * 0.25
+    decisions = [(0, "on", "right", (60, 64, 67)), (1, "off", "right", (60, 64, 67)),
+                 (2, "on", "right", (60, 64, 67))]    # Re-struck before its sustain ran out; held at the end
+    midi_events = decisions_to_midi(decisions, times, PROGRAMS, sustain=2.0)
+    assert np.all(np.diff(midi_events["time"]) >= 0)
+    assert len(note_events(midi_events, NOTE_ON)) == 6
+    # Still sounding after the last frame: silenced there, like the live loop on exit
+    assert set(note_events(midi_events, NOTE_OFF)) == {(0.75, 60), (0.75, 64), (0.75, 67)}
+    stream = [[[int(s), int(a), int(b)], t] for t, s, a, b in midi_events.tolist()]
+    assert _replay(stream)[0] == set()
@@ -0,0 +1,112 @@
+import logging
+import struct
+import threading
+
+import numpy as np
+
+from performance_log import PerformanceLog, export_midi, load_events
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def parse_smf(path):
+    # Format 0 file as export_midi writes it -> [(seconds, status, data1, data2)]
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:4] == b"MThd"
+    _, fmt, tracks, ppq = struct.unpack(">IHHH", data[4:14])
+    assert (fmt, tracks) == (0, 1) and data[14:18] == b"MTrk"
+    end = 22 + struct.unpack(">I", data[18:22])[0]
+    pos, tick, tempo, out = 22, 0, 500000, []
+    while pos < end:
+        delta = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            delta = delta << 7 | byte & 0x7F
+            if not byte & 0x80:
+                break
+        tick += delta
+        status = data[pos]
+        if status == 0xFF:
+            kind, length = data[pos + 1], data[pos + 2]
+            if kind == 0x51:
+                tempo = int.from_bytes(data[pos + 3:pos + 6], "big")
+            pos += 3 + length
+            continue
+        size = 1 if status & 0xF0 in (0xC0, 0xD0) else 2
+        values = list(data[pos + 1:pos + 1 + size]) + [0]
+        out.append((tick * tempo / 1e6 / ppq, status, values[0], values[1] if size == 2 else 0))
+        pos += 1 + size
+    return out
+
+
+def test_log_to_midi_file_round_trip(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "take.events")
+    log = PerformanceLog(path, chunk_size=4, chunks=8, clock=clock)
+    sent = []
+    for i in range(25):              # Several full chunks plus a partial one
+        clock.now = 100.0 + i * 0.25
+        status = 0x90 if i % 2 == 0 else 0x80
+        log.append(status | 1, 60 + i % 12, 100)
+        sent.append((i * 0.25, status | 1, 60 + i % 12, 100))
+    log.append(0xC1, 24, timestamp=100.0 + 25 * 0.25)
+    sent.append((25 * 0.25, 0xC1, 24, 0))
+    log.close()
+    assert log.report() == {"appended": 26, "written": 26, "dropped": 0}
+
+    events = load_events(path)
+    assert len(events) == 26
+    assert np.allclose(events["time"], [t for t, _, _, _ in sent])
+
+    midi_path = str(tmp_path / "take.mid")
+    assert export_midi(path, midi_path) == 26
+    parsed = parse_smf(midi_path)
+    assert [event[1:] for event in parsed] == [event[1:] for event in sent]
+    # 480 ticks per beat at 120 bpm: times survive to within a tick
+    assert np.allclose([t for t, _, _, _ in parsed], [t for t, _, _, _ in sent], atol=1 / 960)
+
+
+def test_in_memory_log_keeps_only_the_newest_chunks():
+    log = PerformanceLog(None, chunk_size=4, chunks=3)
+    for i in range(100):
+        log.append(0x90, i % 128, 1, timestamp=log.start + i)
+    events = log.events()
+    assert len(events) <= 3 * 4
+    assert events["data1"][-1] == 99 and np.all(np.diff(events["time"]) > 0)
+    assert log.dropped == 0
+
+
+class StalledLog(PerformanceLog):
+    # The writer thread doesn't start writing until resume is set
+    def __init__(self, *args, **kwargs):
+        self.resume = threading.Event()
+        super().__init__(*args, **kwargs)
+
+    def _write_loop(self):
+        self.resume.wait()
+        super()._write_loop()
+
+
+def test_events_are_dropped_and_counted_when_the_writer_falls_behind(tmp_path, caplog):
+    path = str(tmp_path / "take.events")
+    log = StalledLog(path, chunk_size=4, chunks=2)
+    with caplog.at_level(logging.WARNING, logger="performance_log"):
+        for i in range(20):
+            log.append(0x90, i, 100)
+    # Two chunks in memory, then nothing left to write into: memory stays bounded
+    assert log.appended == 8
+    assert log.dropped == 12
+    assert sum("dropping MIDI events" in record.getMessage() for record in caplog.records) == 1
+
+    log.resume.set()
+    log.close()
+    assert log.report() == {"appended": 8, "written": 8, "dropped": 12}
+    assert load_events(path)["data1"].tolist() == list(range(8))
@@ -0,0 +1,34 @@
+import numpy as np
+
+from predictive import evaluate, synthetic_trace, velocity_curve
+
+
+def test_velocity_curve_is_monotonic_and_clamped():
+    speeds = np.linspace(0.0, 10.0, 101)
+    velocities = velocity_curve(speeds).astype(int)
+    assert np.all(np.diff(velocities) >= 0)
+    assert velocities[0] == 40 and velocities[-1] == 127
+    assert velocity_curve(0.5) == 40 and velocity_curve(6.0) == 127
+
+
+def test_clean_raises_fire_a_frame_early_without_false_triggers():
+    report = evaluate(synthetic_trace(feints=0.0))
+    assert report["false_triggers"] == 0
+    assert report["missed"] == 0
+    assert report["mean_gain_frames"] >= 1.0
+
+
+def test_false_triggers_stay_within_the_feints():
+    # 15% of the synthetic raises stop between the thresholds; no more than
+    # those may be fired and retracted, and every real raise still fires
+    report = evaluate(synthetic_trace(feints=0.15))
+    assert report["false_trigger_rate"] <= 0.15
+    assert report["missed"] == 0
+    assert report["mean_gain_frames"] >= 1.0
+
+
+def test_debounced_chain_gains_on_the_debounced_path():
+    chained = evaluate(synthetic_trace(feints=0.0))
+    raw = evaluate(synthetic_trace(feints=0.0), debounce=False)
+    # The debouncer's smoothing delays the plain rise, so firing early gains more there
+    assert chained["mean_gain_ms"] >= raw["mean_gain_ms"]
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+from midi_out import NOTE_OFF, NOTE_ON, NullOutput
+from quantize import QuantizedOutput, TempoClock
+
+# Gesture times far enough ahead that the scheduler thread sends nothing during a test
+T0 = time.perf_counter() + 1000.0
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = T0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def quantized():
+    timer = FakeTimer()
+    tempo = TempoClock(120.0, 4, origin=T0)     # A sixteenth is 0.125 s
+    midi = QuantizedOutput(NullOutput(), tempo, tolerance=0.03, timer=timer)
+    yield midi
+    midi.scheduler.close(flush=False)
+
+
+def at(midi, offset):
+    midi.timer.now = T0 + offset
+
+
+def pending(midi):
+    return [(round(due - T0, 6), message[0] & 0xF0, message[1]) for due, message in midi.scheduler.pending()]
+
+
+def test_next_step_snaps_forward_unless_a_step_just_passed():
+    tempo = TempoClock(120.0, 4, origin=10.0)
+    assert tempo.step == 0.125
+    assert tempo.next_step(10.01) == pytest.approx(10.125)
+    assert tempo.next_step(10.01, tolerance=0.03) == 10.01      # Just after a grid point: plays at once
+    assert tempo.next_step(10.05, tolerance=0.03) == pytest.approx(10.125)
+    assert tempo.next_step(10.125) == pytest.approx(10.125)
+
+
+def test_tempo_change_keeps_the_beat_and_moves_the_grid():
+    tempo = TempoClock(120.0, 4, origin=0.0)
+    assert tempo.beat_at(0.5) == pytest.approx(1.0)
+    tempo.set_bpm(60.0, now=0.5)
+    assert tempo.beat_at(0.5) == pytest.approx(1.0)              # No jump
+    assert tempo.step == 0.25
+    assert tempo.next_step(0.6) == pytest.approx(0.75)           # Beat 1.1 -> next sixteenth at beat 1.25
+    assert tempo.time_of(2.0) == pytest.approx(1.5)
+    with pytest.raises(ValueError):
+        tempo.set_bpm(0)
+
+
+def test_notes_wait_for_the_grid(quantized):
+    at(quantized, 0.05)
+    quantized.note_on(0, 60)
+    at(quantized, 0.26)                  # 10 ms after a grid point: within tolerance
+    quantized.note_off(0, 60)
+    assert pending(quantized) == [(0.125, NOTE_ON, 60), (0.26, NOTE_OFF, 60)]
+
+
+def test_quick_tap_sounds_for_a_step(quantized):
+    at(quantized, 0.05)
+    quantized.note_on(0, 60)
+    at(quantized, 0.06)                  # Released before its note-on went out
+    quantized.note_off(0, 60)
+    assert pending(quantized) == [(0.125, NOTE_ON, 60), (0.25, NOTE_OFF, 60)]
+
+
+def test_re_press_cancels_the_pending_release(quantized):
+    at(quantized, 0.05)
+    quantized.note_on(0, 60)
+    at(quantized, 0.06)
+    quantized.note_off(0, 60)            # Pushed to 0.25
+    at(quantized, 0.1)
+    quantized.note_on(0, 60)             # Struck again, lands at 0.125
+    assert pending(quantized) == [(0.125, NOTE_ON, 60), (0.125, NOTE_ON, 60)]
+    at(quantized, 0.45)
+    quantized.note_off(0, 60)
+    assert pending(quantized)[-1] == (0.5, NOTE_OFF, 60)
+
+
+def test_re_press_leaves_other_notes_alone(quantized):
+    at(quantized, 0.05)
+    quantized.note_on(0, 60)
+    quantized.note_on(0, 64)
+    at(quantized, 0.06)
+    quantized.note_off(0, 64)
+    at(quantized, 0.1)
+    quantized.note_on(0, 60)
+    assert (0.25, NOTE_OFF, 64) in pending(quantized)
+
+
+def test_tempo_change_applies_to_the_next_note(quantized):
+    at(quantized, 0.5)
+    quantized.tempo.set_bpm(60.0, now=T0 + 0.5)
+    at(quantized, 0.6)
+    quantized.note_on(0, 60)
+    assert pending(quantized) == [(0.75, NOTE_ON, 60)]
+
+
+def test_all_notes_off_drops_waiting_note_ons(quantized):
+    at(quantized, 0.05)
+    quantized.note_on(0, 60)
+    quantized.all_notes_off()
+    assert pending(quantized) == []
@@ -0,0 +1,64 @@
+import numpy as np
+
+from roi import RoiTracker
+
+
+class FakeDetector:
+    """Finds the bright rectangle that frame() paints as the hand, unless hidden."""
+
+    def __init__(self):
+        self.hidden = False
+        self.sizes = []
+
+    def findHands(self, img, draw=False):
+        height, width = img.shape[:2]
+        self.sizes.append((width, height))
+        ys, xs = np.nonzero(img[:, :, 0] > 127)
+        if self.hidden or not len(xs):
+            return [], img
+        x, y, w, h = int(xs.min()), int(ys.min()), int(xs.max() - xs.min()), int(ys.max() - ys.min())
+        lm = [[x + w // 2, y + h // 2, 0]] * 21
+        return [{"lmList": lm, "bbox": (x, y, w, h), "center": (x + w // 2, y + h // 2), "type": "Right"}], img
+
+
+def frame(x=260, y=180, size=120):
+    img = np.zeros((480, 640, 3), dtype=np.uint8)
+    img[y:y + size, x:x + size] = 255
+    return img
+
+
+def test_full_frame_every_full_every_frames():
+    detector = FakeDetector()
+    roi = RoiTracker(detector, full_every=10)
+    for _ in range(30):
+        hands = roi.find(frame())
+        assert len(hands) == 1
+    assert roi.stats["full"]["count"] == 3
+    assert roi.stats["roi"]["count"] == 27
+    # Frames 1, 11 and 21 ran on the full 640x480 frame, the others on a crop
+    full = [i for i, size in enumerate(detector.sizes) if size == (640, 480)]
+    assert full == [0, 10, 20]
+    assert max(max(size) for i, size in enumerate(detector.sizes) if i not in full) <= roi.max_side
+
+
+def test_roi_hands_are_mapped_back_to_frame_pixels():
+    roi = RoiTracker(FakeDetector())
+    full = roi.find(frame())[0]
+    cropped = roi.find(frame())[0]
+    assert roi.stats["roi"]["count"] == 1
+    assert np.allclose(cropped["center"], full["center"], atol=4)
+    assert np.allclose(cropped["bbox"], full["bbox"], atol=4)
+
+
+def test_reset_and_lost_hands_fall_back_to_the_full_frame():
+    detector = FakeDetector()
+    roi = RoiTracker(detector)
+    roi.find(frame())
+    roi.reset()
+    roi.find(frame())
+    assert roi.stats["full"]["count"] == 2
+
+    detector.hidden = True
+    assert roi.find(frame()) == []
+    assert roi.fallbacks == 1
+    assert roi.stats["full"]["count"] == 3
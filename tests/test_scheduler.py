@@ -0,0 +1,100 @@
+import threading
+import time
+
+from scheduler import NoteOffScheduler, VirtualScheduler
+
+
+class Recorder:
+    def __init__(self):
+        self.keys = []
+        self.done = threading.Event()
+        self.expected = None
+
+    def __call__(self, key):
+        self.keys.append(key)
+        if self.expected is not None and len(self.keys) >= self.expected:
+            self.done.set()
+
+
+def test_note_offs_fire_in_due_order():
+    fired = Recorder()
+    fired.expected = 3
+    scheduler = NoteOffScheduler(fired)
+    try:
+        scheduler.schedule("c", 0.06)
+        scheduler.schedule("a", 0.02)
+        scheduler.schedule("b", 0.04)
+        assert fired.done.wait(1.0)
+        assert fired.keys == ["a", "b", "c"]
+        assert scheduler.fired == 3 and len(scheduler) == 0
+    finally:
+        scheduler.close(flush=False)
+
+
+def test_cancel_and_reschedule_replace_the_pending_off():
+    fired = Recorder()
+    scheduler = NoteOffScheduler(fired)
+    try:
+        scheduler.schedule(60, 0.02)
+        assert scheduler.cancel(60)
+        assert not scheduler.cancel(60)
+        scheduler.schedule(62, 0.02)
+        scheduler.schedule(62, 0.08)       # Re-struck: only the later off fires
+        time.sleep(0.05)
+        assert fired.keys == []
+        assert scheduler.is_pending(62)
+        time.sleep(0.1)
+        assert fired.keys == [62]
+    finally:
+        scheduler.close(flush=False)
+
+
+def test_stale_entries_are_compacted():
+    scheduler = NoteOffScheduler(lambda key: None)
+    try:
+        for i in range(5000):
+            scheduler.schedule(i % 8, 10.0)     # Rescheduled over and over, never due
+        assert len(scheduler) == 8
+        assert len(scheduler._heap) <= 2 * len(scheduler) + 64 + 1
+    finally:
+        scheduler.close(flush=False)
+
+
+def test_close_flushes_pending_offs_unless_told_not_to():
+    fired = Recorder()
+    scheduler = NoteOffScheduler(fired)
+    scheduler.schedule(1, 10.0)
+    scheduler.schedule(2, 10.0)
+    scheduler.close(flush=True)
+    assert sorted(fired.keys) == [1, 2]
+
+    fired = Recorder()
+    scheduler = NoteOffScheduler(fired)
+    scheduler.schedule(1, 10.0)
+    scheduler.close(flush=False)
+    assert fired.keys == []
+
+
+def test_virtual_scheduler_fires_in_order_at_their_due_time():
+    fired = []
+    scheduler = VirtualScheduler(lambda key: fired.append((key, scheduler.now)))
+    scheduler.schedule("late", 2.0)
+    scheduler.schedule("early", 0.5)
+    scheduler.schedule("gone", 1.0)
+    scheduler.cancel("gone")
+    scheduler.advance(1.0)
+    assert fired == [("early", 0.5)]
+    assert scheduler.now == 1.0
+    scheduler.schedule("early", 0.5)       # Due at 1.5, before "late"
+    scheduler.advance(3.0)
+    assert fired == [("early", 0.5), ("early", 1.5), ("late", 2.0)]
+    assert scheduler.fired == 3
+
+
+def test_virtual_scheduler_close_flushes_at_the_current_time():
+    fired = []
+    scheduler = VirtualScheduler(lambda key: fired.append((key, scheduler.now)), start=4.0)
+    scheduler.schedule(60, 1.0)
+    scheduler.close(flush=True)
+    assert fired == [(60, 4.0)]
+    assert len(scheduler) == 0
@@ -0,0 +1,112 @@
+import pytest
+
+from mapping import FINGER_NAMES, HANDS
+from sequencer import SongSequencer, load_song, load_songs
+
+
+def bit(finger):
+    return 1 << FINGER_NAMES.index(finger)
+
+
+class Recorder:
+    def __init__(self):
+        self.played = []
+        self.released = []
+
+    def play(self, hand, notes):
+        self.played.append((hand, notes))
+
+    def release(self, hand, notes, delay):
+        self.released.append((hand, notes, delay))
+
+
+@pytest.fixture
+def birthday():
+    return load_song("happy_birthday.json")
+
+
+def test_every_song_loads():
+    songs = load_songs()
+    assert set(songs) == {"Happy Birthday", "Ode to Joy", "Twinkle Twinkle"}
+    for song in songs.values():
+        assert song.steps
+        assert all(hand in HANDS and finger in FINGER_NAMES and beats > 0 for hand, finger, beats in song.steps)
+
+
+def test_a_song_is_played_step_by_step_on_rising_edges(birthday):
+    out = Recorder()
+    seq = SongSequencer(birthday, out.play, out.release)
+    beat = 60.0 / 90
+    now = 0.0
+    for hand, finger, beats in birthday.steps:
+        assert seq.expected == (hand, finger)
+        now += 1
+        seq.update({hand: bit(finger)}, now)
+        now += 1
+        seq.update({hand: 0}, now)
+    assert seq.finished
+    assert seq.hits == len(birthday) and seq.wrong == 0
+    assert [hand for hand, _ in out.played] == [hand for hand, _, _ in birthday.steps]
+    assert out.played[0] == ("left", (60, 64, 67))
+    assert [delay for _, _, delay in out.released] == [beats * beat for _, _, beats in birthday.steps]
+
+
+def test_a_held_finger_triggers_only_once():
+    out = Recorder()
+    seq = SongSequencer(load_song("ode_to_joy.json"), out.play, out.release)
+    assert seq.song.steps[0][:2] == seq.song.steps[1][:2] == ("right", "middle")
+    for now in range(5):
+        seq.update({"right": bit("middle")}, now)
+    assert seq.step == 1 and len(out.played) == 1
+    seq.update({"right": 0}, 5)
+    seq.update({"right": bit("middle")}, 6)
+    assert seq.step == 2 and len(out.played) == 2
+
+
+def test_wrong_fingers_are_counted_and_do_not_advance(birthday):
+    out = Recorder()
+    seq = SongSequencer(birthday, out.play, out.release)
+    seq.update({"left": bit("index")}, 0)       # Expected: left thumb
+    seq.update({"right": bit("thumb")}, 1)      # Right hand, same finger
+    assert seq.step == 0 and seq.wrong == 2 and not out.played
+    seq.update({"left": bit("index") | bit("thumb")}, 2)
+    assert seq.step == 1 and seq.hits == 1
+
+
+def test_autoplay_follows_the_tempo_grid(birthday):
+    out = Recorder()
+    times = []
+    seq = SongSequencer(birthday, lambda hand, notes: times.append(now), out.release, autoplay=True)
+    beat = 60.0 / 90
+    now = 10.0
+    while not seq.tick(now):
+        now += 0.01
+    # Each step starts when the previous one's beats have run out
+    expected, due = [], 10.0
+    for _, _, beats in birthday.steps:
+        expected.append(due)
+        due += beats * beat
+    assert times == pytest.approx(expected, abs=0.01)
+    assert all(t >= e for t, e in zip(times, expected))
+
+
+def test_autoplay_ignores_the_player(birthday):
+    out = Recorder()
+    seq = SongSequencer(birthday, out.play, out.release, autoplay=True, tempo=60)
+    seq.update({"left": bit("thumb")}, 0.0)     # Starts the clock and plays step 1
+    seq.update({"left": 0}, 0.5)
+    seq.update({"left": bit("index")}, 0.9)
+    assert seq.step == 1 and seq.hits == 0 and seq.wrong == 0
+    seq.update({}, 1.0)                         # One beat at 60 bpm
+    assert seq.step == 2
+
+
+def test_restart(birthday):
+    out = Recorder()
+    seq = SongSequencer(birthday, out.play, out.release, autoplay=True)
+    seq.tick(0.0)
+    seq.tick(100.0)
+    assert seq.finished
+    assert seq.prompt() == "Happy Birthday: done (0 steps, 0 wrong)"
+    seq.restart()
+    assert seq.step == 0 and seq.prompt() == "Raise: thumb on left (1/6)"
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from midi_out import MidiOutput, NullOutput
+from multi_performer import Mixer, performer_channels
+from voices import STEAL_POLICIES, VoiceAllocator, _replay, _stress
+
+
+@pytest.fixture
+def loopback():
+    device = NullOutput()
+    midi = MidiOutput(device)
+    voices = VoiceAllocator(midi, limit=8)
+    yield device, midi, voices
+    voices.close()
+
+
+def sounding(device):
+    return _replay(device.events)[0]
+
+
+def test_shared_note_survives_the_other_chords_release(loopback):
+    device, midi, voices = loopback
+    for note in (60, 64):        # left thumb
+        voices.press(0, note)
+    for note in (64, 71):        # left middle shares 64
+        voices.press(0, note)
+    for note in (60, 64):
+        voices.release(0, note)
+    midi.flush()
+    assert sounding(device) == {(0, 64), (0, 71)}
+    for note in (64, 71):
+        voices.release(0, note)
+    midi.flush()
+    assert sounding(device) == set()
+
+
+def test_watchdog_releases_held_notes_when_frames_stop(loopback):
+    device, midi, voices = loopback
+    voices.press(1, 60)
+    voices.press(1, 67)
+    midi.flush()
+    voices.watchdog(0.02)        # ...and no further frame arrives
+    time.sleep(0.1)
+    assert sounding(device) == set()
+    assert voices.held == 0
+
+
+@pytest.mark.parametrize("steal", STEAL_POLICIES)
+def test_thousands_of_overlapping_triggers_leave_nothing_hanging(steal):
+    report = _stress(triggers=5000, limit=12, steal=steal)   # Asserts no hanging notes and the limit itself
+    assert report["peak_in_stream"] <= 12
+
+
+class FakeBoard:
+    """One performer whose finger masks are set directly."""
+
+    def __init__(self):
+        self.seq = 0
+        self.masks = [0, 0]
+
+    def set(self, left, right=0):
+        self.seq += 2
+        self.masks = [left, right]
+
+    def read(self, index):
+        return self.seq, [1, 1], list(self.masks)
+
+
+def test_mixer_chords_sharing_a_note_dont_cut_each_other_off():
+    board = FakeBoard()
+    device = NullOutput()
+    mixer = Mixer(board, 1, MidiOutput(device))
+    left = performer_channels(0)["left"]
+    try:
+        board.set(0b00101)           # thumb [60, 64] + middle [64, 71]
+        mixer.poll()
+        board.set(0b00100)           # thumb down: 64 is still held by the middle finger
+        mixer.poll()
+        assert sounding(device) == {(left, 64), (left, 71)}
+        board.set(0)
+        mixer.poll()
+        assert sounding(device) == set()
+    finally:
+        mixer.close()
@@ -0,0 +1,220 @@
+import random
+import threading
+import time
+
+from scheduler import NoteOffScheduler
+
+# --------------------------
+# Polyphony manager
+# --------------------------
+# Chords overlap: two fingers (or a finger and a pattern) can map to chords
+# that share a note on the same channel, so a plain note_off for one chord
+# would cut the other. Every (channel, note) therefore carries a reference
+# count: press() adds a holder and only sounds the note if it is silent,
+# release() drops one and the note-off goes out (after its sustain) only when
+# the last holder lets go.
+#
+# At most `limit` voices sound at once. A new voice first steals the oldest
+# voice that is only ringing out its sustain, then the oldest (or quietest)
+# held one.
+
+STEAL_POLICIES = ("oldest", "quietest")
+_WATCHDOG = "watchdog"
+
+
+class VoiceAllocator:
+    """
+    Reference-counted voices on top of a MidiOutput. The caller still flushes
+    the MidiOutput once per frame; delayed note-offs are sent and flushed from
+    the scheduler thread.
+
+    Keys scheduled directly on `scheduler` by code that doesn't use press()
+    (the plain NoteOffScheduler style) still get a note-off when they fire.
+    `scheduler` may also be a scheduler class, built with this allocator's
+    expiry callback (e.g. scheduler.VirtualScheduler for offline renders);
+    voice ages follow its clock.
+    """
+
+    def __init__(self, midi, limit=32, steal="oldest", scheduler=None):
+        if steal not in STEAL_POLICIES:
+            raise ValueError(f"steal must be one of {STEAL_POLICIES}")
+        self.midi = midi
+        self.limit = limit
+        self.steal = steal
+        if scheduler is None:
+            scheduler = NoteOffScheduler(self._expire, name="voices")
+        elif isinstance(scheduler, type):
+            scheduler = scheduler(self._expire)
+        self.scheduler = scheduler
+        self.clock = getattr(scheduler, "clock", time.perf_counter)
+        self.voices = {}      # (channel, note) -> [started, velocity], while sounding
+        self.refs = {}        # (channel, note) -> holders; 0 while the sustain runs
+        self._lock = threading.RLock()
+        self.peak = 0
+        self.stolen = 0
+        self.retriggers = 0
+        self.on_watchdog = None   # Called on the scheduler thread after the watchdog released everything
+
+    @property
+    def active(self):
+        return len(self.voices)
+
+    @property
+    def held(self):
+        return sum(1 for count in self.refs.values() if count)
+
+    def press(self, channel, note, velocity=127):
+        key = (channel, note)
+        with self._lock:
+            self.refs[key] = self.refs.get(key, 0) + 1
+            self.scheduler.cancel(key)
+            if key in self.voices:
+                self.retriggers += 1    # Re-struck while sounding: no new voice
+            elif len(self.voices) >= self.limit:
+                self._steal()
+            self.voices[key] = [self.clock(), velocity]
+            self.midi.note_on(channel, note, velocity)
+            self.peak = max(self.peak, len(self.voices))
+
+    def release(self, channel, note, sustain=0.0):
+        key = (channel, note)
+        with self._lock:
+            count = self.refs.get(key, 0)
+            if count > 1:
+                self.refs[key] = count - 1
+                return
+            self.refs[key] = 0
+            if sustain > 0:
+                self.scheduler.schedule(key, sustain)
+                return
+            self._silence(key)
+
+    def _silence(self, key, flush=False):
+        # Caller holds the lock
+        self.refs.pop(key, None)
+        if self.voices.pop(key, None) is not None:
+            self.midi.note_off(*key, flush=flush)
+
+    def _steal(self):
+        # Caller holds the lock
+        releasing = [key for key in self.voices if not self.refs.get(key)]
+        if releasing:
+            victim = min(releasing, key=lambda key: self.voices[key][0])
+        elif self.steal == "quietest":
+            victim = min(self.voices, key=lambda key: (self.voices[key][1], self.voices[key][0]))
+        else:
+            victim = min(self.voices, key=lambda key: self.voices[key][0])
+        self.scheduler.cancel(victim)
+        self.voices.pop(victim)
+        if not self.refs.get(victim):
+            self.refs.pop(victim, None)
+        self.midi.note_off(*victim)
+        self.stolen += 1
+        # Holders keep their count, so their release() later is still balanced
+
+    def _expire(self, key):
+        # Scheduler thread: sustain ran out (or a plain scheduled note-off)
+        if key == _WATCHDOG:
+            self.release_all()
+            self.midi.flush()
+            if self.on_watchdog:
+                self.on_watchdog()
+            return
+        with self._lock:
+            if key not in self.refs:
+                self.midi.note_off(*key, flush=True)
+            elif not self.refs[key]:
+                self._silence(key, flush=True)
+
+    def release_all(self, sustain=0.0, channels=None):
+        # Drop every holder (on `channels` only, if given), e.g. when the camera
+        # or a hand drops out
+        with self._lock:
+            for key in [key for key, count in self.refs.items() if count and (channels is None or key[0] in channels)]:
+                self.refs[key] = 1
+                self.release(*key, sustain=sustain)
+
+    def watchdog(self, timeout):
+        # Call once per frame: if no frame arrives for `timeout` seconds (camera
+        # stalled or unplugged), every held note is released and on_watchdog runs
+        self.scheduler.schedule(_WATCHDOG, timeout)
+
+    def panic(self):
+        # Silence everything now, including voices still ringing out
+        with self._lock:
+            for key in list(self.voices):
+                self.scheduler.cancel(key)
+                self._silence(key)
+            self.refs.clear()
+        self.midi.flush()
+
+    def close(self):
+        self.scheduler.cancel(_WATCHDOG)
+        self.panic()
+        self.scheduler.close(flush=True)  # Plain scheduled note-offs still go out
+
+    def report(self):
+        return {"active": self.active, "held": self.held, "peak": self.peak, "limit": self.limit,
+                "stolen": self.stolen, "retriggers": self.retriggers}
+
+
+# --------------------------
+# Stress test: thousands of overlapping chords
+# --------------------------
+def _replay(events):
+    # Sounding (channel, note) set after each message in the MIDI stream
+    sounding = set()
+    peak = 0
+    for (status, *data), _ in events:
+        key = (status & 0x0F, data[0])
+        if status & 0xF0 == 0x90:
+            sounding.add(key)
+        elif status & 0xF0 == 0x80:
+            sounding.discard(key)
+        peak = max(peak, len(sounding))
+    return sounding, peak
+
+
+def _stress(triggers=20000, limit=16, steal="oldest", seed=0):
+    from midi_out import MidiOutput, NullOutput
+
+    rng = random.Random(seed)
+    device = NullOutput()
+    midi = MidiOutput(device)
+    voices = VoiceAllocator(midi, limit=limit, steal=steal)
+    chords = [[60, 64], [60, 64, 67], [62, 65, 69], [64, 67, 71], [65, 69, 72], [67, 71, 74]]
+    held = []
+    for i in range(triggers):
+        if held and (rng.random() < 0.5 or len(held) > 40):
+            channel, chord = held.pop(rng.randrange(len(held)))
+            for note in chord:
+                voices.release(channel, note, sustain=rng.choice((0.0, 0.0, 0.002)))
+        else:
+            channel, chord = rng.randrange(2), rng.choice(chords)
+            velocity = rng.randrange(40, 128)
+            for note in chord:
+                voices.press(channel, note, velocity)
+            held.append((channel, chord))
+        if i % 8 == 0:
+            midi.flush()
+        assert voices.active <= limit
+    for channel, chord in held:
+        for note in chord:
+            voices.release(channel, note, sustain=0.001)
+    midi.flush()
+    time.sleep(0.05)  # Let the last sustains expire
+    midi.flush()
+
+    sounding, peak = _replay(device.events)
+    report = voices.report()
+    voices.close()
+    assert not sounding, f"hanging notes: {sorted(sounding)}"
+    assert peak <= limit, f"{peak} voices sounded at once (limit {limit})"
+    assert not any(voices.refs.values())
+    report.update({"triggers": triggers, "messages": len(device.events), "peak_in_stream": peak})
+    return report
+
+
+if __name__ == "__main__":
+    for policy in STEAL_POLICIES:
+        print(policy, _stress(steal=policy))